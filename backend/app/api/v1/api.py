@@ -2,7 +2,7 @@ from fastapi import APIRouter
 from api.v1.endpoints import (
     auth, users, products, orders, field_data, dashboard, ai,
     categories, notifications, delivery_zones, reviews, transactions, harvests,
-    payments, webhooks, fields, crops, weather
+    payments, webhooks, fields, crops, weather, media, sync, yields, stock
 )
 
 api_router = APIRouter()
@@ -15,6 +15,8 @@ api_router.include_router(users.router, prefix="/users", tags=["users"])
 api_router.include_router(products.router, prefix="/products", tags=["products"])
 api_router.include_router(categories.router, prefix="/categories", tags=["categories"])
 api_router.include_router(reviews.router, prefix="/reviews", tags=["reviews"])
+api_router.include_router(media.router, prefix="/media", tags=["media"])
+api_router.include_router(stock.router, prefix="/stock", tags=["stock"])
 
 # Orders & logistics
 api_router.include_router(orders.router, prefix="/orders", tags=["orders"])
@@ -26,9 +28,11 @@ api_router.include_router(webhooks.router, prefix="/webhooks", tags=["webhooks"]
 # Field & agriculture
 api_router.include_router(field_data.router, prefix="/field-data", tags=["field-data"])
 api_router.include_router(harvests.router, prefix="/harvests", tags=["harvests"])
+api_router.include_router(yields.router, prefix="/yields", tags=["yields"])
 api_router.include_router(fields.router, prefix="/fields", tags=["fields"])
 api_router.include_router(crops.router, prefix="/crops", tags=["crops"])
 api_router.include_router(weather.router, prefix="/weather", tags=["weather"])
+api_router.include_router(sync.router, prefix="/sync", tags=["sync"])
 
 # Platform
 api_router.include_router(dashboard.router, prefix="/dashboard", tags=["dashboard"])
@@ -1,25 +1,32 @@
 from typing import Any, List
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlmodel import Session, select
 from api import deps
 from core.db import get_session
 from models.user import User
 from models.category import Category, CategoryCreate, CategoryRead, CategoryUpdate
+from services.product_suggest_service import product_suggest
+from services.catalogue_cache_service import catalogue_cache
+from services.category_tree_service import category_tree
 
 router = APIRouter()
 
 
 @router.get("/", response_model=List[CategoryRead])
 def read_categories(
+    request: Request,
     session: Session = Depends(get_session),
     skip: int = 0,
     limit: int = 100,
 ) -> Any:
-    """List all categories — public endpoint."""
-    cats = session.exec(
-        select(Category).where(Category.is_active == True).offset(skip).limit(limit)
-    ).all()
-    return cats
+    """List all categories — public endpoint. Cached; supports If-None-Match."""
+    def build():
+        cats = session.exec(
+            select(Category).where(Category.is_active == True).offset(skip).limit(limit)
+        ).all()
+        return [CategoryRead.from_orm(c) for c in cats]
+
+    return catalogue_cache.respond(request, ("categories", skip, limit), build)
 
 
 @router.get("/{id}", response_model=CategoryRead)
@@ -48,6 +55,9 @@ def create_category(
     session.add(db_cat)
     session.commit()
     session.refresh(db_cat)
+    product_suggest.update_category(db_cat)
+    catalogue_cache.bump()
+    category_tree.invalidate()
     return db_cat
 
 
@@ -68,6 +78,9 @@ def update_category(
     session.add(cat)
     session.commit()
     session.refresh(cat)
+    product_suggest.update_category(cat)
+    catalogue_cache.bump()
+    category_tree.invalidate()
     return cat
 
 
@@ -84,4 +97,7 @@ def delete_category(
         raise HTTPException(status_code=404, detail="Catégorie non trouvée")
     session.delete(cat)
     session.commit()
+    product_suggest.remove_category(id)
+    catalogue_cache.bump()
+    category_tree.invalidate()
     return cat
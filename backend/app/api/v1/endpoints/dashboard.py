@@ -5,6 +5,7 @@ from fastapi import APIRouter, Depends
 from sqlmodel import Session, select, func
 from api import deps
 from core.db import get_session
+from core.http_gateway import http_gateway
 from models.user import User
 from models.product import Product
 from models.order import Order, OrderStatus
@@ -98,11 +99,12 @@ def get_summary(
         ).one()
         low_stock_items = session.exec(
             select(Product)
+            .where(Product.is_low_stock == True)
             .where(Product.producer_id == current_user.id)
-            .where(Product.stock_quantity < 50)
         ).all()
         stats["low_stock_products"] = [
-            {"id": p.id, "name": p.name, "stock": p.stock_quantity} for p in low_stock_items
+            {"id": p.id, "name": p.name, "stock": p.stock_quantity, "threshold": p.low_stock_threshold}
+            for p in low_stock_items
         ]
 
     # ── Agent terrain ─────────────────────────────────────────────────────
@@ -127,3 +129,11 @@ def get_summary(
         ).one()
 
     return stats
+
+
+@router.get("/outbound-http")
+def get_outbound_http_metrics(
+    current_user: User = Depends(deps.get_current_active_admin),
+) -> Any:
+    """Latency histograms, error counts and circuit state per external upstream. Admin only."""
+    return http_gateway.metrics()
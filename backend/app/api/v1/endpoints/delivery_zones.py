@@ -1,21 +1,25 @@
 from typing import Any, List
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlmodel import Session, select
 from api import deps
 from core.db import get_session
 from models.user import User
 from models.delivery_zone import DeliveryZone, DeliveryZoneCreate, DeliveryZoneRead, DeliveryZoneUpdate
+from services.catalogue_cache_service import catalogue_cache
 
 router = APIRouter()
 
 
 @router.get("/", response_model=List[DeliveryZoneRead])
-def read_delivery_zones(session: Session = Depends(get_session)) -> Any:
-    """List all active delivery zones — public."""
-    zones = session.exec(
-        select(DeliveryZone).where(DeliveryZone.is_active == True)
-    ).all()
-    return zones
+def read_delivery_zones(request: Request, session: Session = Depends(get_session)) -> Any:
+    """List all active delivery zones — public. Cached; supports If-None-Match."""
+    def build():
+        zones = session.exec(
+            select(DeliveryZone).where(DeliveryZone.is_active == True)
+        ).all()
+        return [DeliveryZoneRead.from_orm(z) for z in zones]
+
+    return catalogue_cache.respond(request, ("delivery_zones",), build)
 
 
 @router.get("/all", response_model=List[DeliveryZoneRead])
@@ -44,6 +48,7 @@ def create_delivery_zone(
     session.add(db_zone)
     session.commit()
     session.refresh(db_zone)
+    catalogue_cache.bump()
     return db_zone
 
 
@@ -64,6 +69,7 @@ def update_delivery_zone(
     session.add(zone)
     session.commit()
     session.refresh(zone)
+    catalogue_cache.bump()
     return zone
 
 
@@ -80,4 +86,5 @@ def delete_delivery_zone(
         raise HTTPException(status_code=404, detail="Zone non trouvée")
     session.delete(zone)
     session.commit()
+    catalogue_cache.bump()
     return zone
@@ -5,6 +5,8 @@ from api import deps
 from core.db import get_session
 from models.user import User
 from models.field_data import FieldData, FieldDataCreate, FieldDataRead, FieldDataUpdate
+from services.yield_analytics_service import yield_analytics
+from services.yield_prediction_service import yield_predictions
 
 router = APIRouter()
 
@@ -32,6 +34,8 @@ def create_field_data(
     session.add(db_obj)
     session.commit()
     session.refresh(db_obj)
+    yield_analytics.invalidate([db_obj.season])
+    yield_predictions.refresh_plots([db_obj.id])
     return db_obj
 
 
@@ -88,10 +92,13 @@ def update_field_data(
         raise HTTPException(status_code=403, detail="Accès refusé")
     if current_user.role not in ["agent", "admin", "gestionnaire"]:
         raise HTTPException(status_code=403, detail="Accès refusé")
+    seasons = {fd.season}
     for key, value in field_in.dict(exclude_unset=True).items():
         setattr(fd, key, value)
     fd.updated_at = datetime.utcnow()
     session.add(fd)
     session.commit()
     session.refresh(fd)
+    yield_analytics.invalidate(seasons | {fd.season})
+    yield_predictions.refresh_plots([fd.id])
     return fd
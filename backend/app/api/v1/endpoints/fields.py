@@ -1,10 +1,12 @@
-from typing import Any, List
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Any, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlmodel import Session, select
 from api import deps
+from core.config import settings
 from core.db import get_session
 from models.user import User
-from models.field import Field, FieldCreate, FieldRead, FieldUpdate
+from models.field import Field, FieldCreate, FieldNearby, FieldRead, FieldUpdate
+from services.field_geo_service import cell, field_geo
 
 router = APIRouter()
 
@@ -20,6 +22,7 @@ def create_field(
         raise HTTPException(status_code=403, detail="Permissions insuffisantes")
     
     db_obj = Field(**field_in.dict(), owner_id=current_user.id)
+    db_obj.geo_cell = cell(db_obj.latitude, db_obj.longitude)
     session.add(db_obj)
     session.commit()
     session.refresh(db_obj)
@@ -38,3 +41,39 @@ def read_fields(
         statement = statement.where(Field.owner_id == current_user.id)
     
     return session.exec(statement.offset(skip).limit(limit)).all()
+
+
+def _visible_owner(current_user: User) -> Optional[int]:
+    """Same visibility as the field list: staff see every field, others their own."""
+    return None if current_user.role in ["admin", "gestionnaire"] else current_user.id
+
+
+@router.get("/nearby", response_model=List[FieldNearby])
+def read_fields_nearby(
+    session: Session = Depends(get_session),
+    latitude: float = Query(..., ge=-90, le=90),
+    longitude: float = Query(..., ge=-180, le=180),
+    radius_km: float = Query(10, gt=0),
+    limit: int = Query(100, ge=1, le=1000),
+    current_user: User = Depends(deps.get_current_user),
+) -> Any:
+    """Fields within radius_km of a point, nearest first, with their distance."""
+    if radius_km > settings.GEO_MAX_RADIUS_KM:
+        raise HTTPException(status_code=400, detail=f"Le rayon ne peut pas dépasser {settings.GEO_MAX_RADIUS_KM:g} km")
+    return field_geo.within_radius(session, latitude, longitude, radius_km, _visible_owner(current_user), limit)
+
+
+@router.get("/within", response_model=List[FieldNearby])
+def read_fields_within(
+    session: Session = Depends(get_session),
+    min_lat: float = Query(..., ge=-90, le=90),
+    min_lon: float = Query(..., ge=-180, le=180),
+    max_lat: float = Query(..., ge=-90, le=90),
+    max_lon: float = Query(..., ge=-180, le=180),
+    limit: int = Query(100, ge=1, le=1000),
+    current_user: User = Depends(deps.get_current_user),
+) -> Any:
+    """Fields inside a bounding box (e.g. a weather grid cell), by id."""
+    if min_lat > max_lat or min_lon > max_lon:
+        raise HTTPException(status_code=400, detail="Zone invalide : les minimums doivent être inférieurs aux maximums")
+    return field_geo.within_box(session, min_lat, min_lon, max_lat, max_lon, _visible_owner(current_user), limit)
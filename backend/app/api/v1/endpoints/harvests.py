@@ -1,14 +1,26 @@
+from datetime import datetime
 from typing import Any, List
 from fastapi import APIRouter, Depends, HTTPException
 from sqlmodel import Session, select
 from api import deps
 from core.db import get_session
 from models.user import User
+from models.field_data import FieldData
 from models.harvest import Harvest, HarvestCreate, HarvestRead, HarvestUpdate
+from services.harvest_intake_service import INTAKE_STATUSES, harvest_intake
+from services.yield_analytics_service import yield_analytics
+from services.yield_prediction_service import yield_predictions
 
 router = APIRouter()
 
 
+def _harvest_changed(session: Session, field_data_id: int) -> None:
+    """Drops cached yield analytics of the harvest's season and updates the plot's prediction."""
+    fd = session.get(FieldData, field_data_id)
+    yield_analytics.invalidate([fd.season] if fd else None)
+    yield_predictions.refresh_plots([field_data_id])
+
+
 @router.get("/", response_model=List[HarvestRead])
 def read_harvests(
     session: Session = Depends(get_session),
@@ -51,6 +63,7 @@ def create_harvest(
     session.add(db_harvest)
     session.commit()
     session.refresh(db_harvest)
+    _harvest_changed(session, db_harvest.field_data_id)
     return db_harvest
 
 
@@ -71,11 +84,19 @@ def update_harvest(
     if current_user.role not in ["agent", "admin", "gestionnaire"]:
         raise HTTPException(status_code=403, detail="Accès refusé")
 
+    was_verified = harvest.status in INTAKE_STATUSES
     for key, value in harvest_in.dict(exclude_unset=True).items():
         setattr(harvest, key, value)
+    if harvest.status not in INTAKE_STATUSES:
+        harvest.verified_at = None
+    elif not was_verified:
+        harvest.verified_at = datetime.utcnow()
     session.add(harvest)
     session.commit()
     session.refresh(harvest)
+    _harvest_changed(session, harvest.field_data_id)
+    if harvest.status in INTAKE_STATUSES:
+        harvest_intake.process([harvest.id])
     return harvest
 
 
@@ -93,4 +114,5 @@ def delete_harvest(
         raise HTTPException(status_code=404, detail="Récolte non trouvée")
     session.delete(harvest)
     session.commit()
+    _harvest_changed(session, harvest.field_data_id)
     return {"deleted": True}
@@ -0,0 +1,30 @@
+import os
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.responses import FileResponse
+from core.http_cache import etag_matches
+from services.image_processing_service import IMAGE_CONTENT_TYPES
+from services.local_storage_service import local_storage
+
+router = APIRouter()
+
+# Stored objects are content-addressed, so a given URL never changes content
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+@router.get("/{path:path}")
+def get_media(path: str, request: Request) -> Response:
+    """
+    Serve an image stored by the local storage backend — public. Only image types are
+    served, with nosniff: nothing under /media can run as a page on the app's origin.
+    """
+    media_type = IMAGE_CONTENT_TYPES.get(os.path.splitext(path)[1].lstrip(".").lower())
+    full_path = local_storage.resolve(path)
+    if not media_type or not full_path or not os.path.isfile(full_path):
+        raise HTTPException(status_code=404, detail="Fichier non trouvé")
+
+    etag = local_storage.etag(path, full_path)
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL, "X-Content-Type-Options": "nosniff"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    return FileResponse(full_path, media_type=media_type, headers=headers)
@@ -9,6 +9,9 @@ from models.order import (
     Order, OrderCreate, OrderRead, OrderUpdate, OrderItem,
     OrderStatus, OrderStatusUpdate, PaymentMethod
 )
+from models.stock import StockMovementKind
+from services.catalogue_cache_service import catalogue_cache
+from services.stock_ledger_service import stock_ledger
 
 router = APIRouter()
 
@@ -38,9 +41,15 @@ def create_order(
     session.refresh(db_order)
 
     from models.product import Product
+    movements = []
     for item in order_in.items:
         product = session.get(Product, item.product_id)
         product_name = product.name if product else "Produit"
+        if product:
+            movements.append({
+                "product_id": product.id, "delta": -item.quantity, "kind": StockMovementKind.ORDER,
+                "reference": f"order:{db_order.id}", "user_id": current_user.id,
+            })
         db_item = OrderItem(
             order_id=db_order.id,
             product_id=item.product_id,
@@ -49,9 +58,11 @@ def create_order(
             unit_price=item.unit_price,
         )
         session.add(db_item)
+    stock_ledger.record(session, movements)
 
     session.commit()
     session.refresh(db_order)
+    catalogue_cache.bump()
     return db_order
 
 
@@ -169,6 +180,19 @@ def update_order_status(
     if current_user.role == "livreur" and order.livreur_id != current_user.id:
         raise HTTPException(status_code=403, detail="Vous ne pouvez modifier que vos commandes assignées")
 
+    # A rejected order gives its items back to stock; reopening it takes them again
+    was_rejected = order.status == OrderStatus.REJECTED
+    stock_changed = was_rejected != (order_update.status == OrderStatus.REJECTED)
+    if stock_changed:
+        sign, kind = (1, StockMovementKind.CANCELLATION) if not was_rejected else (-1, StockMovementKind.ORDER)
+        stock_ledger.record(session, [
+            {
+                "product_id": item.product_id, "delta": sign * item.quantity, "kind": kind,
+                "reference": f"order:{order.id}", "user_id": current_user.id,
+            }
+            for item in order.items
+        ])
+
     order.status = order_update.status
     order.updated_at = datetime.utcnow()
     if order_update.notes:
@@ -177,6 +201,8 @@ def update_order_status(
     session.add(order)
     session.commit()
     session.refresh(order)
+    if stock_changed:
+        catalogue_cache.bump()
     return order
 
 
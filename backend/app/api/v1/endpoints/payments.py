@@ -1,9 +1,13 @@
 from fastapi import APIRouter, Depends, HTTPException, Body
 from sqlmodel import Session, select
+from sqlalchemy.exc import IntegrityError
+from api import deps
 from core.db import get_session
 from models.order import Order
 from models.transaction import Transaction, TransactionStatus, TransactionPaymentMethod
+from models.user import User
 from services.payment_service import payment_service
+from services.payment_reconciliation_service import payment_reconciliation
 from typing import Any
 import logging
 
@@ -75,7 +79,12 @@ async def initiate_payment(
     
     session.add(transaction)
     session.add(order)
-    session.commit()
+    try:
+        session.commit()
+    except IntegrityError:
+        session.rollback()
+        logger.error(f"PayGate returned an already recorded tx_reference {tx_ref} for Order {order.order_number}")
+        raise HTTPException(status_code=409, detail="Référence de transaction déjà enregistrée")
     session.refresh(transaction)
 
     return {
@@ -84,3 +93,14 @@ async def initiate_payment(
         "transaction_id": transaction.id,
         "tx_reference": tx_ref
     }
+
+
+@router.post("/reconcile")
+async def reconcile_pending_payments(
+    current_user: User = Depends(deps.get_current_admin_or_gestionnaire),
+) -> Any:
+    """
+    Re-check stale PENDING transactions with PayGate right now. Admin/Gestionnaire only.
+    The same pass runs periodically in the background.
+    """
+    return await payment_reconciliation.reconcile_once()
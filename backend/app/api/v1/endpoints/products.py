@@ -1,99 +1,195 @@
+import asyncio
+import hashlib
+import json
 import logging
-from typing import Any, List, Optional
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+from typing import Any, List, Optional, Tuple, Union
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request, UploadFile, File
+from fastapi.responses import StreamingResponse
 from sqlmodel import Session, select
 from api import deps
+from core.config import settings
 from core.db import get_session
 from models.user import User
-from models.product import Product, ProductCreate, ProductRead, ProductUpdate
+from models.review import ProductRatingStats
+from models.product import Product, ProductCreate, ProductImageImport, ProductImportReport, ProductRead, ProductReadWithRating, ProductSearchResult, ProductSuggestion, ProductUpdate
 import os, uuid, shutil
-import httpx
-from services.supabase_storage_service import supabase_storage
+from services.storage import storage
+from services.image_library_service import ImageVariantUrls, image_library
+from services.image_processing_service import detect_image_type
+from services.image_import_service import image_import
+from services.product_search_service import product_search
+from services.product_suggest_service import product_suggest
+from services.catalogue_cache_service import catalogue_cache
+from services.review_stats_service import review_stats
+from services.category_tree_service import category_tree
+from services.catalogue_import_service import CatalogueImportError, catalogue_import
+from services.stock_ledger_service import stock_ledger
+from services.low_stock_service import low_stock
+from models.stock import StockMovementKind
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
-# Local upload directory (kept for fallback or temporary use if needed, but primary is Supabase)
+# Spool directory for incoming uploads (images themselves go to the storage backend)
 UPLOAD_DIR = "/tmp/manioc_agri_uploads"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
 
-async def download_image_from_url(url: str) -> str:
+async def _spool_upload(file: UploadFile, dest_path: str) -> str:
+    """
+    Streams an upload to disk in chunks, enforcing MAX_IMAGE_UPLOAD_BYTES and checking
+    the magic bytes of the first chunk. Returns the sha256 of the content.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    image_type = None
+    with open(dest_path, "wb") as out:
+        while chunk := await file.read(settings.UPLOAD_CHUNK_SIZE):
+            if image_type is None:
+                image_type = detect_image_type(chunk)
+                if image_type is None:
+                    raise HTTPException(status_code=400, detail="Format d'image non supporté (JPEG, PNG, GIF, WebP)")
+            size += len(chunk)
+            if size > settings.MAX_IMAGE_UPLOAD_BYTES:
+                raise HTTPException(
+                    status_code=413,
+                    detail=f"Image trop volumineuse (max {settings.MAX_IMAGE_UPLOAD_BYTES // (1024 * 1024)} Mo)",
+                )
+            digest.update(chunk)
+            await asyncio.to_thread(out.write, chunk)
+    if image_type is None:
+        raise HTTPException(status_code=400, detail="Fichier vide")
+    return digest.hexdigest()
+
+
+async def download_image_from_url(url: str, session: Session) -> Tuple[str, ImageVariantUrls]:
+    """Hosts a remote image and takes a reference on it in the image index."""
     if not url:
-        return ""
-    # Skip if already a hosted Supabase URL
-    if "supabase.co" in url:
-        return url
+        return "", None
+    # Already hosted by us: share it (and its variants) if it is indexed
+    if storage.owns(url):
+        _, variants = image_library.acquire(session, url)
+        return url, variants
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, timeout=10.0)
-            response.raise_for_status()
-            content_type = response.headers.get("content-type", "image/jpeg")
-            
-            # Upload to Supabase instead of saving locally
-            filename = url.split("/")[-1].split("?")[0]
-            if not filename:
-                filename = "image.jpg"
-                
-            public_url = await supabase_storage.upload_image(response.content, filename, content_type)
-            if not public_url:
-                raise Exception("Failed to upload to Supabase")
-            return public_url
+        content = await image_library.fetch_remote(url)
+
+        # Re-host in our storage backend
+        public_url, variants = await image_library.store(session, content)
+        if not public_url:
+            raise Exception("Failed to store image")
+        return public_url, variants
     except Exception as e:
         logger.error("Failed to download or upload image from %s: %s", url, e)
         # Fallback to original URL if remote download fails, or raise if it must be hosted
-        return url
+        return url, None
+
 
+def _product_listing(with_ratings: bool):
+    """
+    Base listing query. With ratings, the denormalized review aggregates are
+    LEFT JOINed by primary key, so a catalogue page needs no per-product stats requests.
+    """
+    if not with_ratings:
+        return select(Product)
+    return select(Product, ProductRatingStats).outerjoin(
+        ProductRatingStats, ProductRatingStats.product_id == Product.id
+    )
 
-@router.get("/search", response_model=List[ProductRead])
+
+def _listing_rows(session: Session, statement, with_ratings: bool) -> List[ProductRead]:
+    if not with_ratings:
+        return [ProductRead.from_orm(p) for p in session.exec(statement).all()]
+    return [
+        ProductReadWithRating(
+            **ProductRead.from_orm(product).dict(),
+            average_rating=stats.average_rating if stats else None,
+            review_count=stats.rating_count if stats else 0,
+        )
+        for product, stats in session.exec(statement).all()
+    ]
+
+
+@router.get("/search", response_model=Union[List[ProductReadWithRating], ProductSearchResult])
 def search_products(
     session: Session = Depends(get_session),
     q: Optional[str] = None,
     category_id: Optional[int] = None,
+    include_subcategories: bool = True,
     min_price: Optional[int] = None,
     max_price: Optional[int] = None,
     in_stock: bool = False,
+    with_ratings: bool = False,
+    facets: bool = False,
     skip: int = 0,
     limit: int = 50,
 ) -> Any:
-    """Full-text product search with filters — public."""
-    statement = select(Product).where(Product.is_active == True)
+    """
+    Full-text product search with filters — public. Results are ranked by relevance when q is given.
+    category_id also matches its subcategories unless include_subcategories=false.
+    with_ratings=true adds average_rating and review_count to each product.
+    facets=true returns {"items": [...], "facets": {...}} with result counts per category,
+    price band and stock state.
+    """
+    statement = _product_listing(with_ratings).where(Product.is_active == True)
     if q:
-        statement = statement.where(
-            Product.name.icontains(q) | Product.description.icontains(q)
-        )
+        statement = product_search.apply(statement, q)
+    category_ids = None
     if category_id is not None:
-        statement = statement.where(Product.category_id == category_id)
+        category_ids = category_tree.subtree(session, category_id) if include_subcategories else [category_id]
+        statement = statement.where(Product.category_id.in_(category_ids))
     if min_price is not None:
         statement = statement.where(Product.price >= min_price)
     if max_price is not None:
         statement = statement.where(Product.price <= max_price)
     if in_stock:
         statement = statement.where(Product.stock_quantity > 0)
-    return session.exec(statement.offset(skip).limit(limit)).all()
+    items = _listing_rows(session, statement.offset(skip).limit(limit), with_ratings)
+    if not facets:
+        return items
+    return ProductSearchResult(
+        items=items,
+        facets=product_search.facets(session, q, category_ids, min_price, max_price, in_stock),
+    )
+
 
+@router.get("/suggest", response_model=List[ProductSuggestion])
+def suggest_products(q: str = "", limit: int = Query(10, ge=1, le=50)) -> Any:
+    """Autocomplete on product and category names — public. Served from memory, no DB query."""
+    return product_suggest.suggest(q, limit)
 
-@router.get("/", response_model=List[ProductRead])
+
+@router.get("/", response_model=List[ProductReadWithRating])
 def read_products(
+    request: Request,
     session: Session = Depends(get_session),
     skip: int = 0,
     limit: int = 100,
     active_only: bool = True,
+    with_ratings: bool = False,
 ) -> Any:
-    """Retrieve products — public."""
-    statement = select(Product)
-    if active_only:
-        statement = statement.where(Product.is_active == True)
-    return session.exec(statement.offset(skip).limit(limit)).all()
+    """
+    Retrieve products — public. Cached; supports If-None-Match.
+    with_ratings=true adds average_rating and review_count to each product.
+    """
+    def build():
+        statement = _product_listing(with_ratings)
+        if active_only:
+            statement = statement.where(Product.is_active == True)
+        return _listing_rows(session, statement.offset(skip).limit(limit), with_ratings)
+
+    return catalogue_cache.respond(request, ("products", skip, limit, active_only, with_ratings), build)
 
 
 @router.get("/{id}", response_model=ProductRead)
-def read_product(*, session: Session = Depends(get_session), id: int) -> Any:
-    """Get product by ID — public."""
-    product = session.get(Product, id)
-    if not product:
-        raise HTTPException(status_code=404, detail="Produit non trouvé")
-    return product
+def read_product(*, request: Request, session: Session = Depends(get_session), id: int) -> Any:
+    """Get product by ID — public. Cached; supports If-None-Match."""
+    def build():
+        product = session.get(Product, id)
+        if not product:
+            raise HTTPException(status_code=404, detail="Produit non trouvé")
+        return ProductRead.from_orm(product)
+
+    return catalogue_cache.respond(request, ("product", id), build)
 
 
 @router.post("/", response_model=ProductRead)
@@ -113,20 +209,57 @@ async def create_product(
 
     db_obj = Product.from_orm(product_in)
     if db_obj.image_url and db_obj.image_url.startswith(("http://", "https://")):
-        db_obj.image_url = await download_image_from_url(db_obj.image_url)
+        db_obj.image_url, db_obj.image_variants = await download_image_from_url(db_obj.image_url, session)
     db_obj.producer_id = current_user.id
+    db_obj.is_low_stock = db_obj.stock_quantity < db_obj.low_stock_threshold
     session.add(db_obj)
+    session.flush()
+    stock_ledger.move(
+        session, db_obj.id, db_obj.stock_quantity, StockMovementKind.ADJUSTMENT,
+        reference="création", user_id=current_user.id, apply=False,
+    )
     session.commit()
     session.refresh(db_obj)
+    product_suggest.update_product(db_obj)
+    catalogue_cache.bump()
     return db_obj
 
 
+@router.post("/import", response_model=ProductImportReport)
+def import_products(
+    *,
+    session: Session = Depends(get_session),
+    file: UploadFile = File(...),
+    current_user: User = Depends(deps.get_current_user),
+) -> Any:
+    """
+    Bulk create/update products from a price list (CSV with a header line, JSON array
+    or NDJSON), matched by product name. Producers or admins; producers can only
+    update their own products. Returns a per-row report.
+    """
+    if current_user.role not in ["producteur", "admin"]:
+        raise HTTPException(status_code=403, detail="Permissions insuffisantes")
+    try:
+        report = catalogue_import.import_rows(
+            session, catalogue_import.parse(file.file, file.filename), current_user
+        )
+    except CatalogueImportError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="Le fichier doit être encodé en UTF-8")
+    if report.created or report.updated:
+        catalogue_cache.bump()
+        product_suggest.invalidate()
+    return report
+
+
 @router.patch("/{id}", response_model=ProductRead)
 async def update_product(
     *,
     session: Session = Depends(get_session),
     id: int,
     product_in: ProductUpdate,
+    background_tasks: BackgroundTasks,
     current_user: User = Depends(deps.get_current_user),
 ) -> Any:
     """Update a product. Admin or owning producer."""
@@ -137,16 +270,39 @@ async def update_product(
         raise HTTPException(status_code=403, detail="Permissions insuffisantes")
 
     product_data = product_in.dict(exclude_unset=True)
-    if "image_url" in product_data and product_data["image_url"] and product_data["image_url"].startswith(("http://", "https://")):
-        if product.image_url and "supabase.co" in product.image_url:
-            supabase_storage.delete_image(product.image_url)
-        product_data["image_url"] = await download_image_from_url(product_data["image_url"])
+    if product_data.get("image_url") == product.image_url:
+        product_data.pop("image_url", None)
+    unused_images: List[str] = []
+    if "image_url" in product_data:
+        unused_images = image_library.release(session, product.image_url, product.image_variants)
+        product_data["image_variants"] = None
+        if product_data["image_url"] and product_data["image_url"].startswith(("http://", "https://")):
+            product_data["image_url"], product_data["image_variants"] = await download_image_from_url(
+                product_data["image_url"], session
+            )
 
+    # Stock changes go through the ledger as an adjustment, applied as a delta so
+    # concurrent orders are not overwritten
+    stock_quantity = product_data.pop("stock_quantity", None)
     for key, value in product_data.items():
         setattr(product, key, value)
     session.add(product)
+    if stock_quantity is not None and stock_quantity != product.stock_quantity:
+        session.flush()
+        stock_ledger.move(
+            session, product.id, stock_quantity - product.stock_quantity, StockMovementKind.ADJUSTMENT,
+            reference="modification", user_id=current_user.id,
+        )
+    elif "low_stock_threshold" in product_data:
+        low_stock.check(session, [product.id])
     session.commit()
     session.refresh(product)
+    product_suggest.update_product(product)
+    catalogue_cache.bump()
+
+    # Images no other product uses are removed after the response, once committed
+    if unused_images:
+        background_tasks.add_task(storage.delete_images, unused_images)
     return product
 
 
@@ -155,6 +311,7 @@ def delete_product(
     *,
     session: Session = Depends(get_session),
     id: int,
+    background_tasks: BackgroundTasks,
     current_user: User = Depends(deps.get_current_user),
 ) -> Any:
     """Delete a product. Admin or owning producer."""
@@ -164,12 +321,18 @@ def delete_product(
         raise HTTPException(status_code=404, detail="Produit non trouvé")
     if current_user.role != "admin" and product.producer_id != current_user.id:
         raise HTTPException(status_code=403, detail="Permissions insuffisantes")
+    unused_images = image_library.release(session, product.image_url, product.image_variants)
+    review_stats.forget(session, id)
     session.delete(product)
     try:
         session.commit()
     except IntegrityError:
         session.rollback()
         raise HTTPException(status_code=400, detail="Impossible de supprimer ce produit car il est lié à des commandes")
+    product_suggest.remove_product(id)
+    catalogue_cache.bump()
+    if unused_images:
+        background_tasks.add_task(storage.delete_images, unused_images)
     return product
 
 
@@ -179,6 +342,7 @@ async def upload_product_image(
     session: Session = Depends(get_session),
     id: int,
     file: UploadFile = File(...),
+    background_tasks: BackgroundTasks,
     current_user: User = Depends(deps.get_current_user),
 ) -> Any:
     """Upload an image for a product. Admin, producteur, gestionnaire."""
@@ -189,27 +353,57 @@ async def upload_product_image(
         raise HTTPException(status_code=404, detail="Produit non trouvé")
     if not file:
         raise HTTPException(status_code=400, detail="Fichier requis")
-    allowed = ["jpg", "jpeg", "png", "gif", "webp"]
-    ext = file.filename.split(".")[-1].lower() if file.filename else ""
-    if ext not in allowed:
-        raise HTTPException(status_code=400, detail=f"Extensions acceptées: {', '.join(allowed)}")
-    filename = f"{uuid.uuid4().hex}.{ext}"
+    # The type is taken from the content, not the extension; the payload is never held in memory
+    spool_path = os.path.join(UPLOAD_DIR, f"{uuid.uuid4().hex}.part")
     try:
-        content = await file.read()
-        public_url = await supabase_storage.upload_image(content, file.filename, file.content_type)
-        if not public_url:
-            raise Exception("Supabase upload failed")
-            
-        if product.image_url and "supabase.co" in product.image_url:
-            supabase_storage.delete_image(product.image_url)
-            
+        content_hash = await _spool_upload(file, spool_path)
+        try:
+            public_url, variants = await image_library.store(session, spool_path, content_hash=content_hash)
+            if not public_url:
+                raise Exception("Storage upload failed")
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Erreur d'enregistrement de l'image: {e}")
+
+        unused_images = image_library.release(session, product.image_url, product.image_variants)
         product.image_url = public_url
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Erreur d'enregistrement sur Supabase: {e}")
+        product.image_variants = variants
     finally:
         await file.close()
-    
+        if os.path.exists(spool_path):
+            os.remove(spool_path)
+
     session.add(product)
     session.commit()
     session.refresh(product)
+    catalogue_cache.bump()
+
+    if unused_images:
+        background_tasks.add_task(storage.delete_images, unused_images)
     return product
+
+
+@router.post("/images/bulk-import")
+async def bulk_import_product_images(
+    *,
+    items: List[ProductImageImport],
+    current_user: User = Depends(deps.get_current_user),
+) -> Any:
+    """
+    Import images for many products from URLs in one request.
+    Admin, gestionnaire, or producteur (own products only).
+    Downloads run concurrently; results are streamed as NDJSON, one line per item
+    as soon as it completes, with per-item errors.
+    """
+    if current_user.role not in ["admin", "gestionnaire", "producteur"]:
+        raise HTTPException(status_code=403, detail="Permissions insuffisantes")
+    if len(items) > settings.BULK_IMAGE_IMPORT_MAX_ITEMS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Trop d'éléments (max {settings.BULK_IMAGE_IMPORT_MAX_ITEMS} par requête)",
+        )
+
+    results = image_import.import_images(items, current_user.id, current_user.role)
+    return StreamingResponse(
+        (json.dumps(result, ensure_ascii=False) + "\n" async for result in results),
+        media_type="application/x-ndjson",
+    )
@@ -1,11 +1,13 @@
 from typing import Any, List, Optional
 from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import Session, select, func
+from sqlmodel import Session, select
 from api import deps
 from core.db import get_session
 from models.user import User
 from models.review import ProductReview, ProductReviewCreate, ProductReviewRead
 from models.product import Product
+from services.catalogue_cache_service import catalogue_cache
+from services.review_stats_service import review_stats
 
 router = APIRouter()
 
@@ -31,19 +33,27 @@ def get_product_review_stats(
     session: Session = Depends(get_session),
 ) -> Any:
     """Get average rating and count for a product — public."""
-    count = session.exec(
-        select(func.count(ProductReview.id)).where(ProductReview.product_id == product_id)
-    ).one()
-    avg = session.exec(
-        select(func.avg(ProductReview.rating)).where(ProductReview.product_id == product_id)
-    ).one()
+    count, average = review_stats.get(session, product_id)
     return {
         "product_id": product_id,
         "review_count": count,
-        "average_rating": round(float(avg), 1) if avg else None,
+        "average_rating": average,
     }
 
 
+@router.post("/stats/rebuild")
+def rebuild_review_stats(
+    session: Session = Depends(get_session),
+    product_id: Optional[int] = None,
+    current_user: User = Depends(deps.get_current_active_admin),
+) -> Any:
+    """Recompute rating aggregates from the reviews (all products, or one). Admin only."""
+    corrected = review_stats.rebuild(session, product_id)
+    if corrected:
+        catalogue_cache.bump()
+    return {"corrected": corrected}
+
+
 @router.post("/", response_model=ProductReviewRead)
 def create_review(
     *,
@@ -76,8 +86,10 @@ def create_review(
         comment=review_in.comment,
     )
     session.add(db_review)
+    review_stats.record(session, db_review)
     session.commit()
     session.refresh(db_review)
+    catalogue_cache.bump()  # listings embed rating aggregates
     return db_review
 
 
@@ -95,5 +107,7 @@ def delete_review(
     if review.client_id != current_user.id and current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Permission insuffisante")
     session.delete(review)
+    review_stats.unrecord(session, review)
     session.commit()
+    catalogue_cache.bump()
     return {"deleted": True}
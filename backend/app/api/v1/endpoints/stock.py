@@ -0,0 +1,221 @@
+from datetime import datetime
+from typing import Any, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlmodel import Session, func, select
+from api import deps
+from core.db import get_session
+from models.user import User
+from models.product import Product, ProductRead
+from models.stock import (
+    HarvestIntakeReport, StockAdjustment, StockBalance, StockCompactionReport, StockConversion,
+    StockConversionCreate, StockConversionRead, StockConversionUpdate, StockHistory, StockMovementKind,
+)
+from services.harvest_intake_service import harvest_intake
+from services.catalogue_cache_service import catalogue_cache
+from services.stock_ledger_service import StockHistoryUnavailable, stock_ledger
+
+router = APIRouter()
+
+
+def _check_shares(session: Session, conversion: StockConversion) -> None:
+    """Active conversions cannot process more than 100% of a harvest."""
+    if not conversion.is_active:
+        return
+    statement = select(func.coalesce(func.sum(StockConversion.share), 0)).where(StockConversion.is_active == True)
+    if conversion.id is not None:
+        statement = statement.where(StockConversion.id != conversion.id)
+    if session.exec(statement).one() + conversion.share > 1 + 1e-9:
+        raise HTTPException(status_code=400, detail="La somme des parts des conversions actives dépasse 100 %")
+
+
+@router.get("/conversions", response_model=List[StockConversionRead])
+def read_conversions(
+    session: Session = Depends(get_session),
+    current_user: User = Depends(deps.get_current_admin_or_gestionnaire),
+) -> Any:
+    """List harvest-to-stock conversions. Admin/Gestionnaire only."""
+    return session.exec(select(StockConversion)).all()
+
+
+@router.post("/conversions", response_model=StockConversionRead)
+def create_conversion(
+    *,
+    session: Session = Depends(get_session),
+    conversion_in: StockConversionCreate,
+    current_user: User = Depends(deps.get_current_active_admin),
+) -> Any:
+    """
+    Declare that a share of every verified harvest is processed into a product,
+    at `ratio` product kg per raw kg. Admin only.
+    """
+    if not session.get(Product, conversion_in.product_id):
+        raise HTTPException(status_code=404, detail="Produit non trouvé")
+    conversion = StockConversion(**conversion_in.dict())
+    _check_shares(session, conversion)
+    session.add(conversion)
+    session.commit()
+    session.refresh(conversion)
+    return conversion
+
+
+@router.patch("/conversions/{id}", response_model=StockConversionRead)
+def update_conversion(
+    *,
+    session: Session = Depends(get_session),
+    id: int,
+    conversion_in: StockConversionUpdate,
+    current_user: User = Depends(deps.get_current_active_admin),
+) -> Any:
+    """Update a conversion. Admin only. Harvests already taken into stock are not recomputed."""
+    conversion = session.get(StockConversion, id)
+    if not conversion:
+        raise HTTPException(status_code=404, detail="Conversion non trouvée")
+    for key, value in conversion_in.dict(exclude_unset=True).items():
+        setattr(conversion, key, value)
+    _check_shares(session, conversion)
+    session.add(conversion)
+    session.commit()
+    session.refresh(conversion)
+    return conversion
+
+
+@router.delete("/conversions/{id}")
+def delete_conversion(
+    *,
+    session: Session = Depends(get_session),
+    id: int,
+    current_user: User = Depends(deps.get_current_active_admin),
+) -> Any:
+    """Delete a conversion. Admin only."""
+    conversion = session.get(StockConversion, id)
+    if not conversion:
+        raise HTTPException(status_code=404, detail="Conversion non trouvée")
+    session.delete(conversion)
+    session.commit()
+    return {"deleted": True}
+
+
+@router.post("/harvest-intake", response_model=HarvestIntakeReport)
+def run_harvest_intake(
+    historical: bool = False,
+    current_user: User = Depends(deps.get_current_admin_or_gestionnaire),
+) -> Any:
+    """
+    Takes every verified harvest not yet in stock into product stock now, instead of
+    waiting for the periodic run. Admin/Gestionnaire only. `historical` (admin only)
+    also takes harvests verified before their conversion was created, which are
+    otherwise assumed to be in the manual stock already.
+    """
+    if historical and current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Seul un administrateur peut intégrer l'historique des récoltes")
+    return harvest_intake.process(historical=historical)
+
+
+@router.get("/low-stock", response_model=List[ProductRead])
+def read_low_stock(
+    *,
+    session: Session = Depends(get_session),
+    producer_id: Optional[int] = None,
+    skip: int = 0,
+    limit: int = Query(100, ge=1, le=1000),
+    current_user: User = Depends(deps.get_current_user),
+) -> Any:
+    """Products below their stock threshold. Staff see every producer; producers their own."""
+    if current_user.role not in ["admin", "gestionnaire"]:
+        if current_user.role != "producteur":
+            raise HTTPException(status_code=403, detail="Permissions insuffisantes")
+        producer_id = current_user.id
+    statement = select(Product).where(Product.is_low_stock == True)
+    if producer_id is not None:
+        statement = statement.where(Product.producer_id == producer_id)
+    return session.exec(statement.order_by(Product.id).offset(skip).limit(limit)).all()
+
+
+def _get_product(session: Session, id: int, current_user: User) -> Product:
+    """Stock of a product is visible to staff and to its producer."""
+    product = session.get(Product, id)
+    if not product:
+        raise HTTPException(status_code=404, detail="Produit non trouvé")
+    if current_user.role not in ["admin", "gestionnaire"] and product.producer_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Permissions insuffisantes")
+    return product
+
+
+def _unavailable(e: StockHistoryUnavailable) -> HTTPException:
+    return HTTPException(
+        status_code=400, detail=f"Historique de stock compacté : disponible à partir du {e.args[0].isoformat()}"
+    )
+
+
+@router.get("/products/{id}/balance", response_model=StockBalance)
+def read_stock_balance(
+    *,
+    session: Session = Depends(get_session),
+    id: int,
+    current_user: User = Depends(deps.get_current_user),
+) -> Any:
+    """Ledger balance (latest snapshot + movements since) next to the product's stock_quantity."""
+    product = _get_product(session, id, current_user)
+    return stock_ledger.read_balance(session, product)
+
+
+@router.get("/products/{id}/movements", response_model=StockHistory)
+def read_stock_movements(
+    *,
+    session: Session = Depends(get_session),
+    id: int,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    skip: int = 0,
+    limit: int = Query(100, ge=1, le=1000),
+    current_user: User = Depends(deps.get_current_user),
+) -> Any:
+    """Stock movements of a product between start (included) and end (excluded), oldest first."""
+    _get_product(session, id, current_user)
+    try:
+        return stock_ledger.history(session, id, start, end, skip, limit)
+    except StockHistoryUnavailable as e:
+        raise _unavailable(e)
+
+
+@router.post("/products/{id}/adjustments", response_model=StockBalance)
+def adjust_stock(
+    *,
+    session: Session = Depends(get_session),
+    id: int,
+    adjustment: StockAdjustment,
+    current_user: User = Depends(deps.get_current_user),
+) -> Any:
+    """Manual stock correction (inventory count, losses). Staff or owning producer."""
+    product = _get_product(session, id, current_user)
+    if not adjustment.delta:
+        raise HTTPException(status_code=400, detail="La variation de stock ne peut pas être nulle")
+    stock_ledger.move(
+        session, product.id, adjustment.delta, StockMovementKind.ADJUSTMENT,
+        reference=adjustment.reason, user_id=current_user.id,
+    )
+    session.commit()
+    session.refresh(product)
+    catalogue_cache.bump()
+    return stock_ledger.read_balance(session, product)
+
+
+@router.post("/snapshots")
+def take_stock_snapshots(
+    current_user: User = Depends(deps.get_current_active_admin),
+) -> Any:
+    """Snapshots the balance of every product that moved since its last snapshot. Admin only."""
+    return {"snapshots": stock_ledger.snapshot()}
+
+
+@router.post("/compact", response_model=StockCompactionReport)
+def compact_stock_ledger(
+    before: Optional[datetime] = None,
+    current_user: User = Depends(deps.get_current_active_admin),
+) -> Any:
+    """
+    Folds stock movements older than `before` (default: the retention period) into
+    snapshots and deletes them. Admin only.
+    """
+    stock_ledger.snapshot()
+    return stock_ledger.compact(before)
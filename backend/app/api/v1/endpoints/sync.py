@@ -0,0 +1,53 @@
+from typing import Any, Optional
+from fastapi import APIRouter, Depends, HTTPException
+from sqlmodel import Session
+from api import deps
+from core.config import settings
+from core.db import get_session
+from models.user import User
+from models.sync_change import SyncChangesRead, SyncUpload, SyncUploadReport
+from services.sync_service import sync_changes
+from services.sync_upload_service import sync_upload
+
+router = APIRouter()
+
+
+@router.get("/changes", response_model=SyncChangesRead)
+def read_changes(
+    session: Session = Depends(get_session),
+    since: Optional[str] = None,
+    current_user: User = Depends(deps.get_current_user),
+) -> Any:
+    """
+    Delta sync for offline clients: field data, harvests, fields, crops and orders
+    created, updated or deleted since `since` (the token of the previous call), grouped
+    per entity as upserts and deleted ids. Agents get their own rows, livreurs their
+    assigned orders, admins/gestionnaires everything.
+    Without a token, or with an expired one, returns a full snapshot (full=true).
+    Call again immediately while has_more is true.
+    """
+    return sync_changes.changes(session, current_user, since)
+
+
+@router.post("/upload", response_model=SyncUploadReport)
+def upload_records(
+    *,
+    session: Session = Depends(get_session),
+    payload: SyncUpload,
+    current_user: User = Depends(deps.get_current_user),
+) -> Any:
+    """
+    Uploads field data and harvests recorded offline in one transaction. Each record
+    has a client-generated `key`; records whose key was already applied are returned
+    as duplicates with their id, so a batch can be replayed safely after a network
+    failure. Harvests may reference field data of the same batch via `field_data_key`.
+    Agents and admins only. Returns a per-record report.
+    """
+    if current_user.role not in ["agent", "admin"]:
+        raise HTTPException(status_code=403, detail="Accès refusé — agent requis")
+    if len(payload.field_data) + len(payload.harvests) > settings.SYNC_UPLOAD_MAX_RECORDS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Lot trop volumineux (maximum {settings.SYNC_UPLOAD_MAX_RECORDS} enregistrements)",
+        )
+    return sync_upload.upload(session, current_user, payload)
@@ -1,6 +1,7 @@
 from typing import Any, List
 from fastapi import APIRouter, Depends, HTTPException
 from sqlmodel import Session, select
+from sqlalchemy.exc import IntegrityError
 from api import deps
 from core.db import get_session
 from models.user import User
@@ -68,7 +69,11 @@ def create_transaction(
     """Record a new payment transaction. Admin/Gestionnaire only."""
     db_tx = Transaction.from_orm(tx_in)
     session.add(db_tx)
-    session.commit()
+    try:
+        session.commit()
+    except IntegrityError:
+        session.rollback()
+        raise HTTPException(status_code=400, detail="Une transaction avec cette référence existe déjà")
     session.refresh(db_tx)
     return db_tx
 
@@ -88,6 +93,10 @@ def update_transaction(
     for key, value in tx_in.dict(exclude_unset=True).items():
         setattr(tx, key, value)
     session.add(tx)
-    session.commit()
+    try:
+        session.commit()
+    except IntegrityError:
+        session.rollback()
+        raise HTTPException(status_code=400, detail="Une transaction avec cette référence existe déjà")
     session.refresh(tx)
     return tx
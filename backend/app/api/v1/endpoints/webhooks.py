@@ -1,4 +1,5 @@
 from fastapi import APIRouter, Depends, Request
+from typing import Optional, Tuple
 from sqlmodel import Session, select
 from core.db import get_session
 from models.order import Order
@@ -10,6 +11,30 @@ import logging
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+
+def _resolve_transaction(
+    session: Session, tx_reference: str, order_number: Optional[str]
+) -> Tuple[Optional[Transaction], Optional[Order]]:
+    """
+    Finds the transaction (and its order) with at most two indexed lookups: by the
+    unique tx_reference first, otherwise the pending transaction of the order
+    identifier (unique order_number, then the (order_id, status) index).
+    """
+    row = session.exec(
+        select(Transaction, Order)
+        .join(Order, Order.id == Transaction.order_id)
+        .where(Transaction.reference == tx_reference)
+    ).first()
+    if row is None and order_number:
+        row = session.exec(
+            select(Transaction, Order)
+            .join(Order, Order.id == Transaction.order_id)
+            .where(Order.order_number == order_number)
+            .where(Transaction.status == TransactionStatus.PENDING)
+            .limit(1)
+        ).first()
+    return row if row else (None, None)
+
 @router.post("/paygate")
 async def paygate_webhook(
     request: Request,
@@ -40,22 +65,8 @@ async def paygate_webhook(
         logger.warning(f"Webhook received for TX {tx_reference} but status is {status_check.get('status')} (Not Success)")
         return {"status": "ignored", "reason": "Not a successful transaction"}
 
-    # 2. Find Transaction
-    statement = select(Transaction).where(Transaction.reference == tx_reference)
-    transaction = session.exec(statement).first()
-
-    if not transaction and order_number:
-        # Fallback search by order number
-        statement = select(Order).where(Order.order_number == order_number)
-        order = session.exec(statement).first()
-        if order:
-            # Look for a pending transaction for this order
-            transaction = session.exec(
-                select(Transaction).where(
-                    Transaction.order_id == order.id, 
-                    Transaction.status == TransactionStatus.PENDING
-                )
-            ).first()
+    # 2. Find Transaction (falls back to the order number when the reference is unknown)
+    transaction, order = _resolve_transaction(session, tx_reference, order_number)
 
     if transaction:
         if transaction.status == TransactionStatus.SUCCESS:
@@ -67,7 +78,6 @@ async def paygate_webhook(
         session.add(transaction)
         
         # 3. Update Order to 'Paid'
-        order = session.get(Order, transaction.order_id)
         if order:
             order.paid = True
             session.add(order)
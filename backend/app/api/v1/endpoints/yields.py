@@ -0,0 +1,84 @@
+from typing import Any, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlmodel import Session
+from api import deps
+from core.db import get_session
+from models.user import User
+from models.field_data import YieldAnalytics, YieldDimension
+from models.yield_prediction import YieldBacktest, YieldForecast, YieldModelInfo
+from services.yield_analytics_service import yield_analytics
+from services.yield_prediction_service import yield_predictions
+
+router = APIRouter()
+
+
+@router.get("/analytics", response_model=YieldAnalytics)
+def read_yield_analytics(
+    session: Session = Depends(get_session),
+    group_by: List[YieldDimension] = Query([YieldDimension.SEASON]),
+    season: Optional[str] = None,
+    soil_type: Optional[str] = None,
+    agent_id: Optional[int] = None,
+    location: Optional[str] = None,
+    current_user: User = Depends(deps.get_current_user),
+) -> Any:
+    """
+    Yield per hectare and expected-vs-actual harvest gaps of field data plots,
+    grouped by any of season, soil_type, agent and location (repeat group_by).
+    - Admins/Gestionnaire: all plots.
+    - Agents: own plots only.
+    """
+    if current_user.role == "agent":
+        agent_id = current_user.id
+    elif current_user.role not in ["admin", "gestionnaire"]:
+        raise HTTPException(status_code=403, detail="Accès refusé")
+    return yield_analytics.analytics(
+        session, group_by, season=season, soil_type=soil_type, agent_id=agent_id, location=location
+    )
+
+
+@router.get("/predictions", response_model=YieldForecast)
+def read_yield_predictions(
+    session: Session = Depends(get_session),
+    season: Optional[str] = None,
+    soil_type: Optional[str] = None,
+    agent_id: Optional[int] = None,
+    location: Optional[str] = None,
+    skip: int = 0,
+    limit: int = Query(100, le=1000),
+    current_user: User = Depends(deps.get_current_user),
+) -> Any:
+    """
+    Predicted harvest of active plots for stock planning: totals, remaining kg per
+    predicted harvest month and per-plot predictions (soonest harvest first).
+    - Admins/Gestionnaire: all plots.
+    - Agents: own plots only.
+    """
+    if current_user.role == "agent":
+        agent_id = current_user.id
+    elif current_user.role not in ["admin", "gestionnaire"]:
+        raise HTTPException(status_code=403, detail="Accès refusé")
+    return yield_predictions.forecast(
+        session, season=season, soil_type=soil_type, agent_id=agent_id, location=location, skip=skip, limit=limit
+    )
+
+
+@router.post("/predictions/refresh", response_model=YieldModelInfo)
+def refresh_yield_predictions(
+    current_user: User = Depends(deps.get_current_active_admin),
+) -> Any:
+    """Refits the yield model on all harvested plots and re-predicts every active plot. Admin only."""
+    return yield_predictions.refresh()
+
+
+@router.get("/predictions/backtest", response_model=YieldBacktest)
+def backtest_yield_predictions(
+    session: Session = Depends(get_session),
+    folds: Optional[int] = Query(None, ge=1, le=20),
+    current_user: User = Depends(deps.get_current_active_admin),
+) -> Any:
+    """
+    Walk-forward backtest of the yield model on the last `folds` seasons, compared
+    with the agents' expected_harvest_kg. Admin only.
+    """
+    return yield_predictions.backtest(session, folds)
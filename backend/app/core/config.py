@@ -42,12 +42,73 @@ class Settings:
     PAYGATE_CALLBACK_URL: str = os.getenv("PAYGATE_CALLBACK_URL", "")
     PAYGATE_PAY_URL: str = os.getenv("PAYGATE_PAY_URL", "https://paygateglobal.com/api/v1/pay")
     PAYGATE_STATUS_URL: str = os.getenv("PAYGATE_STATUS_URL", "https://paygateglobal.com/api/v1/status")
+    # Background reconciliation of PENDING transactions whose callback never arrived
+    PAYGATE_RECONCILE_ENABLED: bool = os.getenv("PAYGATE_RECONCILE_ENABLED", "True").lower() == "true"
+    PAYGATE_RECONCILE_INTERVAL_SECONDS: int = int(os.getenv("PAYGATE_RECONCILE_INTERVAL_SECONDS", 60))
+    PAYGATE_RECONCILE_STALE_MINUTES: int = int(os.getenv("PAYGATE_RECONCILE_STALE_MINUTES", 5))
+    PAYGATE_RECONCILE_CONCURRENCY: int = int(os.getenv("PAYGATE_RECONCILE_CONCURRENCY", 5))
+    PAYGATE_RECONCILE_BATCH_SIZE: int = int(os.getenv("PAYGATE_RECONCILE_BATCH_SIZE", 100))
+    PAYGATE_RECONCILE_MAX_BACKOFF_SECONDS: int = int(os.getenv("PAYGATE_RECONCILE_MAX_BACKOFF_SECONDS", 3600))
 
     # Supabase
     SUPABASE_URL: str = os.getenv("SUPABASE_URL", "")
     SUPABASE_KEY: str = os.getenv("SUPABASE_KEY", "")
     SUPABASE_SERVICE_KEY: str = os.getenv("SUPABASE_SERVICE_KEY", "")
     SUPABASE_BUCKET: str = os.getenv("SUPABASE_BUCKET", "produits-images")
+    # Image storage backend: "auto" (Supabase if configured, else local disk), "supabase" or "local"
+    STORAGE_BACKEND: str = os.getenv("STORAGE_BACKEND", "auto")
+    LOCAL_STORAGE_DIR: str = os.getenv("LOCAL_STORAGE_DIR", "./media")
+    LOCAL_STORAGE_BASE_URL: str = os.getenv("LOCAL_STORAGE_BASE_URL", "/api/v1/media")
+    STORAGE_MAX_WORKERS: int = int(os.getenv("STORAGE_MAX_WORKERS", 4))
+    MAX_IMAGE_UPLOAD_BYTES: int = int(os.getenv("MAX_IMAGE_UPLOAD_BYTES", 10 * 1024 * 1024))
+    UPLOAD_CHUNK_SIZE: int = int(os.getenv("UPLOAD_CHUNK_SIZE", 1024 * 1024))
+    BULK_IMAGE_IMPORT_MAX_ITEMS: int = int(os.getenv("BULK_IMAGE_IMPORT_MAX_ITEMS", 500))
+    BULK_IMAGE_IMPORT_CONCURRENCY: int = int(os.getenv("BULK_IMAGE_IMPORT_CONCURRENCY", 8))
+    BULK_IMAGE_IMPORT_PER_HOST: int = int(os.getenv("BULK_IMAGE_IMPORT_PER_HOST", 2))
+    IMAGE_PROCESS_WORKERS: int = int(os.getenv("IMAGE_PROCESS_WORKERS", 2))
+    IMAGE_VARIANT_QUALITY: int = int(os.getenv("IMAGE_VARIANT_QUALITY", 80))
+    SUGGEST_INDEX_TTL_SECONDS: int = int(os.getenv("SUGGEST_INDEX_TTL_SECONDS", 300))
+    CATALOGUE_CACHE_TTL_SECONDS: int = int(os.getenv("CATALOGUE_CACHE_TTL_SECONDS", 60))
+    CATALOGUE_CACHE_MAX_ENTRIES: int = int(os.getenv("CATALOGUE_CACHE_MAX_ENTRIES", 512))
+    CATALOGUE_IMPORT_MAX_ROWS: int = int(os.getenv("CATALOGUE_IMPORT_MAX_ROWS", 20000))
+    CATALOGUE_IMPORT_BATCH_SIZE: int = int(os.getenv("CATALOGUE_IMPORT_BATCH_SIZE", 500))
+    CATEGORY_TREE_TTL_SECONDS: int = int(os.getenv("CATEGORY_TREE_TTL_SECONDS", 300))
+    # Delta sync for offline clients (/sync/changes)
+    SYNC_PAGE_SIZE: int = int(os.getenv("SYNC_PAGE_SIZE", 1000))
+    SYNC_RETENTION_DAYS: int = int(os.getenv("SYNC_RETENTION_DAYS", 30))
+    SYNC_PRUNE_INTERVAL_SECONDS: int = int(os.getenv("SYNC_PRUNE_INTERVAL_SECONDS", 3600))
+    SYNC_UPLOAD_MAX_RECORDS: int = int(os.getenv("SYNC_UPLOAD_MAX_RECORDS", 1000))
+    # Yield analytics: aggregates of closed seasons are cached
+    YIELD_CACHE_TTL_SECONDS: int = int(os.getenv("YIELD_CACHE_TTL_SECONDS", 3600))
+    YIELD_CACHE_MAX_ENTRIES: int = int(os.getenv("YIELD_CACHE_MAX_ENTRIES", 512))
+    # Yield prediction (ridge regression on closed plots)
+    YIELD_MODEL_MIN_SAMPLES: int = int(os.getenv("YIELD_MODEL_MIN_SAMPLES", 30))
+    YIELD_MODEL_RIDGE: float = float(os.getenv("YIELD_MODEL_RIDGE", 1.0))
+    YIELD_PREDICTION_REFRESH_SECONDS: int = int(os.getenv("YIELD_PREDICTION_REFRESH_SECONDS", 6 * 3600))
+    YIELD_BACKTEST_FOLDS: int = int(os.getenv("YIELD_BACKTEST_FOLDS", 4))
+    HARVEST_INTAKE_BATCH_SIZE: int = int(os.getenv("HARVEST_INTAKE_BATCH_SIZE", 500))
+    HARVEST_INTAKE_INTERVAL_SECONDS: int = int(os.getenv("HARVEST_INTAKE_INTERVAL_SECONDS", 300))
+    # Stock ledger: balances are snapshotted periodically; compaction drops older movements
+    STOCK_SNAPSHOT_INTERVAL_SECONDS: int = int(os.getenv("STOCK_SNAPSHOT_INTERVAL_SECONDS", 24 * 3600))
+    STOCK_LEDGER_RETENTION_DAYS: int = int(os.getenv("STOCK_LEDGER_RETENTION_DAYS", 365))
+    STOCK_SETTLE_SECONDS: int = int(os.getenv("STOCK_SETTLE_SECONDS", 60))
+    # Field geo queries: grid cells (index ranges) used to cover a search area, and the largest radius
+    GEO_MAX_COVER_CELLS: int = int(os.getenv("GEO_MAX_COVER_CELLS", 16))
+    GEO_MAX_RADIUS_KM: float = float(os.getenv("GEO_MAX_RADIUS_KM", 200))
+    # Upper bounds (FCFA) of the price bands counted by search facets; the last band is open-ended
+    PRODUCT_PRICE_FACET_BOUNDS: list = [
+        int(b) for b in os.getenv("PRODUCT_PRICE_FACET_BOUNDS", "500,1000,2500,5000,10000").split(",")
+    ]
     OPENWEATHER_API_KEY: str = os.getenv("OPENWEATHER_API_KEY", "")
 
+    # Outbound HTTP (shared gateway for PayGate, OpenWeather, remote images)
+    HTTP_TIMEOUT_SECONDS: float = float(os.getenv("HTTP_TIMEOUT_SECONDS", 30))
+    HTTP_CONNECT_TIMEOUT_SECONDS: float = float(os.getenv("HTTP_CONNECT_TIMEOUT_SECONDS", 5))
+    HTTP_MAX_CONNECTIONS: int = int(os.getenv("HTTP_MAX_CONNECTIONS", 100))
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", 20))
+    HTTP_RETRIES: int = int(os.getenv("HTTP_RETRIES", 2))
+    HTTP_RETRY_BACKOFF_SECONDS: float = float(os.getenv("HTTP_RETRY_BACKOFF_SECONDS", 0.5))
+    HTTP_BREAKER_THRESHOLD: int = int(os.getenv("HTTP_BREAKER_THRESHOLD", 5))
+    HTTP_BREAKER_COOLDOWN_SECONDS: float = float(os.getenv("HTTP_BREAKER_COOLDOWN_SECONDS", 30))
+
 settings = Settings()
@@ -1,7 +1,11 @@
+import logging
 from sqlmodel import create_engine, Session, SQLModel
 from core.config import settings
+from sqlalchemy import func, inspect, literal, select, text, update
 from sqlalchemy.pool import NullPool
 
+logger = logging.getLogger(__name__)
+
 # Utilisation du Transaction Pooler (port 6543) : on gère déjà le pooling côté serveur (PgBouncer)
 # Il est fortement recommandé de désactiver le pool SQLAlchemy (NullPool) pour éviter les deadlocks
 engine = create_engine(
@@ -10,8 +14,81 @@ engine = create_engine(
     poolclass=NullPool
 )
 
+# Tables changed after databases were created: create_all only creates missing tables,
+# so init_db adds the listed columns, then the table's missing indexes (and rebuilds
+# those whose uniqueness changed), to databases created before them, and drops the
+# indexes that were replaced.
+ADDED_COLUMNS = {
+    "field": ["geo_cell"],
+    "fielddata": [],
+    "harvest": ["verified_at"],
+    "product": ["image_variants", "low_stock_threshold", "is_low_stock"],
+    "syncchange": ["seq"],
+    "transaction": [],
+}
+DROPPED_INDEXES = {
+    "syncchange": ["ix_syncchange_user_id_id"],
+}
+
+
+def _clear_duplicates(connection, table, column) -> None:
+    """Keeps `column` on the oldest row of each value and sets it to NULL on the others."""
+    keep = select(func.min(table.c.id)).where(column != None).group_by(column)
+    cleared = connection.execute(
+        update(table).where(column != None, table.c.id.not_in(keep)).values({column.name: None})
+    ).rowcount
+    if cleared:
+        logger.warning("%s.%s: duplicate value cleared on %d row(s)", table.name, column.name, cleared)
+
+
+def _sync_indexes(connection, inspector, table, existing_columns) -> None:
+    existing_indexes = {index["name"]: index for index in inspector.get_indexes(table.name)}
+    for name in DROPPED_INDEXES.get(table.name, []):
+        if name in existing_indexes:
+            connection.execute(text(f'DROP INDEX "{name}"'))
+    for index in table.indexes:
+        if not all(column.name in existing_columns for column in index.columns):
+            continue
+        current = existing_indexes.get(index.name)
+        if current is not None and bool(current["unique"]) == bool(index.unique):
+            continue
+        if index.unique:
+            columns = list(index.columns)
+            if len(columns) == 1 and columns[0].nullable:
+                _clear_duplicates(connection, table, columns[0])
+        if current is not None:
+            index.drop(connection)
+        index.create(connection)
+
+
+def _add_missing_columns():
+    inspector = inspect(engine)
+    with engine.begin() as connection:
+        for table_name, column_names in ADDED_COLUMNS.items():
+            if not inspector.has_table(table_name):
+                continue
+            table = SQLModel.metadata.tables[table_name]
+            existing = {column["name"] for column in inspector.get_columns(table_name)}
+            for name in column_names:
+                if name in existing:
+                    continue
+                column = table.c[name]
+                ddl = f'ALTER TABLE "{table_name}" ADD COLUMN "{name}" {column.type.compile(dialect=engine.dialect)}'
+                if column.default is not None and column.default.is_scalar:
+                    default = literal(column.default.arg, column.type).compile(
+                        dialect=engine.dialect, compile_kwargs={"literal_binds": True}
+                    )
+                    ddl += f" DEFAULT {default}"
+                if not column.nullable:
+                    ddl += " NOT NULL"
+                connection.execute(text(ddl))
+                existing.add(name)
+            _sync_indexes(connection, inspector, table, existing)
+
+
 def init_db():
     SQLModel.metadata.create_all(engine)
+    _add_missing_columns()
 
 def get_session():
     with Session(engine) as session:
@@ -0,0 +1,15 @@
+import hashlib
+from typing import Optional
+
+
+def strong_etag(body: bytes) -> str:
+    """Strong validator derived from the response bytes, stable across workers."""
+    return f'"{hashlib.sha256(body).hexdigest()}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header matches etag (handles `*`, lists and weak tags)."""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
@@ -0,0 +1,208 @@
+import asyncio
+import importlib.util
+import logging
+import random
+import time
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit
+import httpx
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Latency histogram bucket upper bounds, in milliseconds (last bucket is +inf)
+LATENCY_BUCKETS_MS = [50, 100, 250, 500, 1000, 2500, 5000, 10000]
+RETRYABLE_STATUS_CODES = {429, 502, 503, 504}
+
+
+class CircuitOpenError(Exception):
+    """Raised when an upstream's circuit breaker is open and the call is short-circuited."""
+
+
+class ResponseTooLarge(Exception):
+    """Raised when a response body exceeds the `max_bytes` of the request."""
+
+    def __init__(self, max_bytes: int):
+        super().__init__(f"Réponse trop volumineuse (plus de {max_bytes} octets)")
+        self.max_bytes = max_bytes
+
+
+class _UpstreamState:
+    """Circuit breaker and latency histogram for one upstream host."""
+
+    def __init__(self):
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.bucket_counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.count = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.short_circuited = 0
+
+    def observe(self, elapsed_ms: float) -> None:
+        self.count += 1
+        self.total_ms += elapsed_ms
+        for i, bound in enumerate(LATENCY_BUCKETS_MS):
+            if elapsed_ms <= bound:
+                self.bucket_counts[i] += 1
+                return
+        self.bucket_counts[-1] += 1
+
+    def record_success(self) -> None:
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+
+    def record_failure(self) -> None:
+        self.errors += 1
+        self.consecutive_failures += 1
+        if self.consecutive_failures >= settings.HTTP_BREAKER_THRESHOLD:
+            self.open_until = time.monotonic() + settings.HTTP_BREAKER_COOLDOWN_SECONDS
+
+    def is_open(self) -> bool:
+        # Once the cooldown has elapsed the next call goes through (half-open);
+        # a further failure re-opens the breaker immediately.
+        return time.monotonic() < self.open_until
+
+    def snapshot(self) -> Dict[str, Any]:
+        buckets = {f"le_{bound}ms": n for bound, n in zip(LATENCY_BUCKETS_MS, self.bucket_counts)}
+        buckets["le_inf"] = self.bucket_counts[-1]
+        return {
+            "requests": self.count,
+            "errors": self.errors,
+            "short_circuited": self.short_circuited,
+            "avg_ms": round(self.total_ms / self.count, 1) if self.count else None,
+            "latency_buckets": buckets,
+            "circuit_open": self.is_open(),
+        }
+
+
+class HttpGateway:
+    """
+    Application-lifetime outbound HTTP client shared by all services.
+    One pooled httpx client (keep-alive, HTTP/2 when `h2` is installed),
+    with jittered retries, a circuit breaker and latency metrics per upstream host.
+    """
+
+    def __init__(self):
+        self._client: Optional[httpx.AsyncClient] = None
+        self._upstreams: Dict[str, _UpstreamState] = {}
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                http2=importlib.util.find_spec("h2") is not None,
+                timeout=httpx.Timeout(settings.HTTP_TIMEOUT_SECONDS, connect=settings.HTTP_CONNECT_TIMEOUT_SECONDS),
+                limits=httpx.Limits(
+                    max_connections=settings.HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                ),
+                follow_redirects=True,
+            )
+        return self._client
+
+    def _upstream(self, url: str) -> _UpstreamState:
+        host = urlsplit(url).netloc or url
+        if host not in self._upstreams:
+            self._upstreams[host] = _UpstreamState()
+        return self._upstreams[host]
+
+    async def _send(self, method: str, url: str, max_bytes: Optional[int], **kwargs: Any) -> httpx.Response:
+        if max_bytes is None:
+            return await self.client.request(method, url, **kwargs)
+        response = await self.client.send(self.client.build_request(method, url, **kwargs), stream=True)
+        try:
+            declared = response.headers.get("content-length", "")
+            if declared.isdigit() and int(declared) > max_bytes:
+                raise ResponseTooLarge(max_bytes)
+            chunks: List[bytes] = []
+            size = 0
+            async for chunk in response.aiter_bytes():
+                size += len(chunk)
+                if size > max_bytes:
+                    raise ResponseTooLarge(max_bytes)
+                chunks.append(chunk)
+        finally:
+            await response.aclose()
+        # The body is already decoded: drop the headers describing its wire encoding
+        headers = [
+            (name, value) for name, value in response.headers.multi_items()
+            if name.lower() not in ("content-encoding", "content-length", "transfer-encoding")
+        ]
+        return httpx.Response(
+            response.status_code, headers=headers, content=b"".join(chunks), request=response.request
+        )
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        *,
+        retry: Optional[bool] = None,
+        max_bytes: Optional[int] = None,
+        **kwargs: Any,
+    ) -> httpx.Response:
+        """
+        Sends a request through the shared client.
+        :param retry: Retry transport errors and 429/5xx gateway errors with jittered backoff.
+                      Defaults to True for GET only; pass True explicitly for idempotent POSTs.
+        :param max_bytes: Stream the body and abandon it past this size, instead of reading
+                          it whole (e.g. remote images).
+        :raises CircuitOpenError: if the upstream has failed repeatedly and is cooling down
+        :raises ResponseTooLarge: if the body exceeds `max_bytes`
+        """
+        upstream = self._upstream(url)
+        if retry is None:
+            retry = method.upper() == "GET"
+        attempts = 1 + (settings.HTTP_RETRIES if retry else 0)
+
+        for attempt in range(attempts):
+            if upstream.is_open():
+                upstream.short_circuited += 1
+                raise CircuitOpenError(f"Circuit ouvert pour {urlsplit(url).netloc}")
+
+            start = time.perf_counter()
+            try:
+                response = await self._send(method, url, max_bytes, **kwargs)
+            except ResponseTooLarge:
+                # The upstream answered; it is the payload that is refused
+                upstream.observe((time.perf_counter() - start) * 1000)
+                upstream.record_success()
+                raise
+            except httpx.TransportError:
+                upstream.observe((time.perf_counter() - start) * 1000)
+                upstream.record_failure()
+                if attempt == attempts - 1:
+                    raise
+            else:
+                upstream.observe((time.perf_counter() - start) * 1000)
+                if response.status_code < 500 and response.status_code != 429:
+                    upstream.record_success()
+                    return response
+                upstream.record_failure()
+                if response.status_code not in RETRYABLE_STATUS_CODES or attempt == attempts - 1:
+                    return response
+                await response.aclose()
+
+            # Full jitter backoff: sleep U(0, base * 2^attempt)
+            await asyncio.sleep(random.uniform(0, settings.HTTP_RETRY_BACKOFF_SECONDS * 2 ** attempt))
+
+        raise RuntimeError("unreachable")  # pragma: no cover
+
+    async def get(self, url: str, **kwargs: Any) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs: Any) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
+
+    def metrics(self) -> Dict[str, Any]:
+        """Per-upstream request counts, errors, breaker state and latency histograms."""
+        return {host: state.snapshot() for host, state in self._upstreams.items()}
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+http_gateway = HttpGateway()
@@ -7,6 +7,18 @@ from fastapi.responses import JSONResponse
 from api.v1.api import api_router
 from core.config import settings
 from core.db import init_db
+from core.http_gateway import http_gateway
+from services.payment_reconciliation_service import payment_reconciliation
+from services.storage import storage
+from services.image_processing_service import image_processing
+from services.product_search_service import product_search
+from services.review_stats_service import review_stats
+from services.sync_service import sync_changes
+from services.yield_prediction_service import yield_predictions
+from services.harvest_intake_service import harvest_intake
+from services.stock_ledger_service import stock_ledger
+from services.low_stock_service import low_stock
+from services.field_geo_service import field_geo
 
 logging.basicConfig(
     level=logging.INFO,
@@ -53,9 +65,36 @@ async def global_exception_handler(request: Request, exc: Exception):
 def on_startup():
     logger.info("🌱 ManiocAgri %s starting up...", settings.VERSION)
     init_db()
+    sync_changes.backfill()
+    product_search.ensure_index()
+    review_stats.backfill()
+    stock_ledger.backfill()
+    low_stock.backfill()
+    field_geo.backfill()
     logger.info("✅ Database initialized")
 
 
+@app.on_event("startup")
+async def start_background_workers():
+    payment_reconciliation.start()
+    sync_changes.start()
+    yield_predictions.start()
+    harvest_intake.start()
+    stock_ledger.start()
+
+
+@app.on_event("shutdown")
+async def stop_background_workers():
+    await payment_reconciliation.stop()
+    await sync_changes.stop()
+    await yield_predictions.stop()
+    await harvest_intake.stop()
+    await stock_ledger.stop()
+    await http_gateway.aclose()
+    storage.shutdown()
+    image_processing.shutdown()
+
+
 # ── API routes (registered BEFORE StaticFiles) ──────────────────────────────
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
@@ -1,5 +1,6 @@
 from datetime import datetime
 from typing import Optional, List, TYPE_CHECKING
+from sqlalchemy import BigInteger, Column
 from sqlmodel import Field, SQLModel, Relationship
 
 if TYPE_CHECKING:
@@ -12,25 +13,33 @@ class FieldBase(SQLModel):
     longitude: Optional[float] = None
     area_size_hectares: float
 
+# Write schemas come before the table model, whose name shadows sqlmodel.Field.
+# Coordinate bounds apply to writes only, so rows stored before them still read back.
+class FieldCreate(FieldBase):
+    latitude: Optional[float] = Field(default=None, ge=-90, le=90)
+    longitude: Optional[float] = Field(default=None, ge=-180, le=180)
+
+class FieldUpdate(SQLModel):
+    name: Optional[str] = None
+    location_name: Optional[str] = None
+    latitude: Optional[float] = Field(default=None, ge=-90, le=90)
+    longitude: Optional[float] = Field(default=None, ge=-180, le=180)
+    area_size_hectares: Optional[float] = None
+
 class Field(FieldBase, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     owner_id: int = Field(foreign_key="user.id", index=True)
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: Optional[datetime] = Field(default=None)
+    # Z-order grid cell of (latitude, longitude), see services.field_geo_service
+    geo_cell: Optional[int] = Field(default=None, sa_column=Column(BigInteger, index=True))
     
     crops: List["Crop"] = Relationship(back_populates="field")
 
-class FieldCreate(FieldBase):
-    pass
-
 class FieldRead(FieldBase):
     id: int
     owner_id: int
     created_at: datetime
 
-class FieldUpdate(SQLModel):
-    name: Optional[str] = None
-    location_name: Optional[str] = None
-    latitude: Optional[float] = None
-    longitude: Optional[float] = None
-    area_size_hectares: Optional[float] = None
+class FieldNearby(FieldRead):
+    distance_km: Optional[float] = None  # from the query point (radius search only)
@@ -1,6 +1,7 @@
 from datetime import date, datetime
 from enum import Enum
-from typing import Optional
+from typing import List, Optional
+from sqlalchemy import Index
 from sqlmodel import Field, SQLModel
 
 
@@ -20,12 +21,15 @@ class FieldDataBase(SQLModel):
     actual_harvest_kg: Optional[int] = Field(default=None)
     notes: Optional[str] = Field(default=None)
     status: FieldDataStatus = Field(default=FieldDataStatus.ACTIVE)
-    agent_id: int = Field(foreign_key="user.id")
+    agent_id: int = Field(foreign_key="user.id", index=True)
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: Optional[datetime] = Field(default=None)
 
 
 class FieldData(FieldDataBase, table=True):
+    # Covers the per-season status scan of yield analytics (closed seasons)
+    __table_args__ = (Index("ix_fielddata_season_status", "season", "status"),)
+
     id: Optional[int] = Field(default=None, primary_key=True)
 
 
@@ -53,3 +57,35 @@ class FieldDataUpdate(SQLModel):
     actual_harvest_kg: Optional[int] = None
     notes: Optional[str] = None
     status: Optional[FieldDataStatus] = None
+
+
+class YieldDimension(str, Enum):
+    SEASON = "season"
+    SOIL_TYPE = "soil_type"
+    AGENT = "agent"
+    LOCATION = "location"
+
+
+class YieldGroup(SQLModel):
+    """Yield aggregates of a group of plots; a plot counts as harvested once its actual harvest is known."""
+    season: Optional[str] = None
+    soil_type: Optional[str] = None
+    agent_id: Optional[int] = None
+    location: Optional[str] = None
+    plots: int = 0
+    harvested_plots: int = 0
+    hectares: float = 0
+    harvested_hectares: float = 0
+    expected_kg: int = 0
+    harvested_expected_kg: int = 0  # expected harvest of the harvested plots only
+    actual_kg: int = 0
+    expected_kg_per_ha: Optional[float] = None
+    yield_kg_per_ha: Optional[float] = None  # actual kg per harvested hectare
+    gap_kg: int = 0  # actual - expected, over harvested plots
+    gap_pct: Optional[float] = None
+
+
+class YieldAnalytics(SQLModel):
+    group_by: List[YieldDimension]
+    total: YieldGroup
+    groups: List[YieldGroup] = []
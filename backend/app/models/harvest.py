@@ -18,6 +18,7 @@ class HarvestBase(SQLModel):
     notes: Optional[str] = None
     status: HarvestStatus = Field(default=HarvestStatus.DECLARED)
     created_at: datetime = Field(default_factory=datetime.utcnow)
+    verified_at: Optional[datetime] = None  # when the status last became verified/processed
 
 
 class Harvest(HarvestBase, table=True):
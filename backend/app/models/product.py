@@ -1,4 +1,5 @@
-from typing import Optional
+from typing import Dict, List, Optional
+from sqlalchemy import JSON, Column, Index
 from sqlmodel import Field, SQLModel
 
 
@@ -7,15 +8,22 @@ class ProductBase(SQLModel):
     description: Optional[str] = None
     price: int = Field(default=0)
     stock_quantity: int = Field(default=0)
+    low_stock_threshold: int = Field(default=50, ge=0)  # alert when stock_quantity falls below
     image_url: Optional[str] = None
     unit: str = Field(default="kg")  # kg, sachet, litre, tonne
     is_active: bool = Field(default=True)
-    category_id: Optional[int] = Field(default=None, foreign_key="category.id")
+    category_id: Optional[int] = Field(default=None, foreign_key="category.id", index=True)
     producer_id: Optional[int] = Field(default=None, foreign_key="user.id")
 
 
 class Product(ProductBase, table=True):
+    __table_args__ = (Index("ix_product_is_low_stock_producer_id", "is_low_stock", "producer_id"),)
+
     id: Optional[int] = Field(default=None, primary_key=True)
+    # stock_quantity < low_stock_threshold, maintained by stock writes (low_stock service)
+    is_low_stock: bool = Field(default=False)
+    # Resized copies of the photo: {"thumb"|"card"|"full": {"webp": url, "jpeg": url}}
+    image_variants: Optional[Dict[str, Dict[str, str]]] = Field(default=None, sa_column=Column(JSON))
 
 
 class ProductCreate(ProductBase):
@@ -24,6 +32,14 @@ class ProductCreate(ProductBase):
 
 class ProductRead(ProductBase):
     id: int
+    is_low_stock: bool = False
+    image_variants: Optional[Dict[str, Dict[str, str]]] = None
+
+
+class ProductReadWithRating(ProductRead):
+    # Only filled when the listing is requested with with_ratings=true
+    average_rating: Optional[float] = None
+    review_count: Optional[int] = None
 
 
 class ProductUpdate(SQLModel):
@@ -31,7 +47,85 @@ class ProductUpdate(SQLModel):
     description: Optional[str] = None
     price: Optional[int] = None
     stock_quantity: Optional[int] = None
+    low_stock_threshold: Optional[int] = Field(default=None, ge=0)
     image_url: Optional[str] = None
     unit: Optional[str] = None
     is_active: Optional[bool] = None
     category_id: Optional[int] = None
+
+
+class ProductImageImport(SQLModel):
+    product_id: int
+    image_url: str
+
+
+class ProductImportRow(SQLModel):
+    """One row of a bulk catalogue import; fields left out are not changed on update."""
+    name: str = Field(min_length=1)
+    description: Optional[str] = None
+    price: int = Field(default=0, ge=0)
+    stock_quantity: int = Field(default=0, ge=0)
+    low_stock_threshold: int = Field(default=50, ge=0)
+    unit: str = Field(default="kg")
+    is_active: bool = Field(default=True)
+    category_id: Optional[int] = None
+
+
+class ProductImportRowResult(SQLModel):
+    row: int
+    name: Optional[str] = None
+    status: str  # created | updated | error
+    id: Optional[int] = None
+    error: Optional[str] = None
+
+
+class ProductImportReport(SQLModel):
+    created: int = 0
+    updated: int = 0
+    errors: int = 0
+    rows: List[ProductImportRowResult] = []
+
+    def add(self, results: List[ProductImportRowResult]) -> None:
+        for result in results:
+            if result.status == "created":
+                self.created += 1
+            elif result.status == "updated":
+                self.updated += 1
+            else:
+                self.errors += 1
+        self.rows.extend(results)
+
+
+class ProductSuggestion(SQLModel):
+    type: str  # "product" | "category"
+    id: int
+    label: str
+
+
+class CategoryFacet(SQLModel):
+    category_id: Optional[int] = None
+    count: int
+
+
+class PriceRangeFacet(SQLModel):
+    min: int
+    max: Optional[int] = None  # None: open-ended last band
+    count: int
+
+
+class StockFacet(SQLModel):
+    in_stock: int = 0
+    out_of_stock: int = 0
+
+
+class ProductFacets(SQLModel):
+    # Each facet ignores its own filter, so the UI can show the alternatives
+    total: int
+    categories: List[CategoryFacet]
+    price_ranges: List[PriceRangeFacet]
+    stock: StockFacet
+
+
+class ProductSearchResult(SQLModel):
+    items: List[ProductReadWithRating]
+    facets: ProductFacets
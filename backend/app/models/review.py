@@ -15,6 +15,20 @@ class ProductReview(ProductReviewBase, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
 
 
+class ProductRatingStats(SQLModel, table=True):
+    """
+    Denormalized rating aggregates, one row per reviewed product, kept up to date
+    in the same transaction as review writes (rebuildable from ProductReview).
+    """
+    product_id: int = Field(foreign_key="product.id", primary_key=True)
+    rating_sum: int = Field(default=0)
+    rating_count: int = Field(default=0)
+
+    @property
+    def average_rating(self) -> Optional[float]:
+        return round(self.rating_sum / self.rating_count, 1) if self.rating_count else None
+
+
 class ProductReviewCreate(SQLModel):
     product_id: int
     rating: int
@@ -0,0 +1,134 @@
+from datetime import datetime
+from enum import Enum
+from typing import List, Optional
+from sqlalchemy import Index
+from sqlmodel import Field, SQLModel
+
+
+class StockConversionBase(SQLModel):
+    product_id: int = Field(foreign_key="product.id", index=True)
+    ratio: float = Field(gt=0)  # product kg obtained per kg of raw cassava (e.g. 0.25 for gari)
+    share: float = Field(default=1.0, gt=0, le=1)  # fraction of each verified harvest processed into this product
+    is_active: bool = Field(default=True)
+
+
+class StockConversion(StockConversionBase, table=True):
+    """How verified harvests turn into product stock."""
+    id: Optional[int] = Field(default=None, primary_key=True)
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class StockConversionCreate(StockConversionBase):
+    pass
+
+
+class StockConversionRead(StockConversionBase):
+    id: int
+    created_at: datetime
+
+
+class StockConversionUpdate(SQLModel):
+    ratio: Optional[float] = Field(default=None, gt=0)
+    share: Optional[float] = Field(default=None, gt=0, le=1)
+    is_active: Optional[bool] = None
+
+
+class HarvestIntake(SQLModel, table=True):
+    """
+    Stock added to a product from a verified harvest. The harvest_id part of the key
+    makes the intake idempotent per harvest; no foreign key so deleting a harvest
+    keeps the record of stock it produced.
+    """
+    harvest_id: int = Field(primary_key=True)
+    product_id: int = Field(foreign_key="product.id", primary_key=True)
+    raw_kg: float
+    quantity: int
+    processed_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class HarvestIntakeLine(SQLModel):
+    product_id: int
+    quantity: int
+
+
+class HarvestIntakeReport(SQLModel):
+    harvests: int = 0
+    products: List[HarvestIntakeLine] = []
+
+
+class StockMovementKind(str, Enum):
+    ORDER = "order"
+    CANCELLATION = "cancellation"
+    HARVEST = "harvest"
+    ADJUSTMENT = "adjustment"
+    IMPORT = "import"
+
+
+class StockMovement(SQLModel, table=True):
+    """
+    Append-only stock ledger: one row per change to a product's stock. No foreign key
+    on product_id so the history outlives the product.
+    """
+    __table_args__ = (
+        Index("ix_stockmovement_product_id_ts", "product_id", "ts"),
+        # Snapshots point at movement ids: SQLite must not reuse the ids of compacted rows
+        {"sqlite_autoincrement": True},
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    product_id: int
+    ts: datetime = Field(default_factory=datetime.utcnow)
+    delta: int
+    kind: StockMovementKind
+    reference: Optional[str] = None  # e.g. "order:12", "harvest:5"
+    user_id: Optional[int] = None
+
+
+class StockMovementRead(SQLModel):
+    id: int
+    product_id: int
+    ts: datetime
+    delta: int
+    kind: StockMovementKind
+    reference: Optional[str] = None
+    user_id: Optional[int] = None
+
+
+class StockSnapshot(SQLModel, table=True):
+    """
+    Balance of a product once every movement up to movement_id is applied. A base
+    snapshot (opening balance, or compaction boundary) has no movements before it.
+    """
+    __table_args__ = (Index("ix_stocksnapshot_product_id_ts", "product_id", "ts"),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    product_id: int
+    movement_id: int = 0
+    ts: datetime
+    balance: int
+    base: bool = Field(default=False)
+
+
+class StockAdjustment(SQLModel):
+    delta: int
+    reason: Optional[str] = None
+
+
+class StockBalance(SQLModel):
+    product_id: int
+    balance: int  # snapshot + movements since
+    stock_quantity: int  # balance kept on the product row
+    snapshot_at: Optional[datetime] = None
+    movements_since_snapshot: int = 0
+
+
+class StockHistory(SQLModel):
+    product_id: int
+    opening_balance: int  # balance just before the first movement listed
+    movements: List[StockMovementRead] = []
+
+
+class StockCompactionReport(SQLModel):
+    products: int = 0
+    movements_deleted: int = 0
+    snapshots_deleted: int = 0
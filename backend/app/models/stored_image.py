@@ -0,0 +1,17 @@
+from datetime import datetime
+from typing import Dict, Optional
+from sqlalchemy import JSON, Column
+from sqlmodel import Field, SQLModel
+
+
+class StoredImage(SQLModel, table=True):
+    """
+    Content-addressed index of uploaded images: one row per distinct file (SHA-256),
+    shared by every product that uses it.
+    """
+    id: Optional[int] = Field(default=None, primary_key=True)
+    content_hash: str = Field(index=True, unique=True)  # SHA-256 hex of the original bytes
+    url: str = Field(index=True)  # public URL stored on Product.image_url
+    variants: Optional[Dict[str, Dict[str, str]]] = Field(default=None, sa_column=Column(JSON))
+    ref_count: int = Field(default=0)  # number of products using this image
+    created_at: datetime = Field(default_factory=datetime.utcnow)
@@ -0,0 +1,94 @@
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional
+from sqlalchemy import Index
+from sqlmodel import Field, SQLModel
+from models.field_data import FieldDataCreate
+
+
+class SyncChange(SQLModel, table=True):
+    """
+    Append-only log of writes to the rows offline clients replicate
+    (field data, harvests, fields, crops, orders). `seq` is the sync watermark:
+    ids are taken at flush, so a later id can commit first, while seq is numbered
+    at commit, in commit order.
+    """
+    __table_args__ = (Index("ix_syncchange_user_id_seq", "user_id", "seq"),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    seq: Optional[int] = Field(default=None, unique=True, index=True)  # NULL until committed
+    entity: str  # field_data | harvest | field | crop | order
+    entity_id: int
+    deleted: bool = Field(default=False)
+    # User whose replica holds the row (agent, field owner, assigned livreur)
+    user_id: Optional[int] = Field(default=None)
+    changed_at: datetime = Field(default_factory=datetime.utcnow, index=True)
+
+
+class SyncSequence(SQLModel, table=True):
+    """Single row: last SyncChange.seq handed out. Its row lock, held until commit, orders the commits."""
+    id: int = Field(default=1, primary_key=True)
+    value: int = Field(default=0)
+
+
+class SyncEntityChanges(SQLModel):
+    upserts: List[Dict[str, Any]] = []
+    deletes: List[int] = []
+
+
+class SyncChangesRead(SQLModel):
+    token: str  # pass back as `since` on the next call
+    has_more: bool = False  # more changes are waiting: call again right away
+    full: bool = False  # snapshot: replace the local copy instead of merging
+    changes: Dict[str, SyncEntityChanges] = {}
+
+
+class SyncUploadKey(SQLModel, table=True):
+    """Client-generated idempotency keys of records created through /sync/upload."""
+    user_id: int = Field(foreign_key="user.id", primary_key=True)
+    key: str = Field(primary_key=True, max_length=64)
+    entity: str  # field_data | harvest
+    entity_id: int
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class FieldDataUpload(FieldDataCreate):
+    key: str = Field(min_length=1, max_length=64)
+
+
+class HarvestUpload(SQLModel):
+    key: str = Field(min_length=1, max_length=64)
+    # Either the server id, or the key of field data uploaded in this or an earlier batch
+    field_data_id: Optional[int] = None
+    field_data_key: Optional[str] = None
+    harvest_date: date
+    actual_kg: int
+    notes: Optional[str] = None
+
+
+class SyncUpload(SQLModel):
+    field_data: List[FieldDataUpload] = []
+    harvests: List[HarvestUpload] = []
+
+
+class SyncUploadResult(SQLModel):
+    entity: str  # field_data | harvest
+    key: str
+    status: str  # created | duplicate | error
+    id: Optional[int] = None
+    error: Optional[str] = None
+
+
+class SyncUploadReport(SQLModel):
+    created: int = 0
+    duplicates: int = 0
+    errors: int = 0
+    results: List[SyncUploadResult] = []
+
+    def add(self, result: SyncUploadResult) -> None:
+        if result.status == "created":
+            self.created += 1
+        elif result.status == "duplicate":
+            self.duplicates += 1
+        else:
+            self.errors += 1
+        self.results.append(result)
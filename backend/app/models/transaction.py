@@ -1,6 +1,7 @@
 from datetime import datetime
 from enum import Enum
 from typing import Optional
+from sqlalchemy import Index
 from sqlmodel import Field, SQLModel
 
 
@@ -25,12 +26,15 @@ class TransactionBase(SQLModel):
     amount: int  # FCFA
     payment_method: TransactionPaymentMethod
     status: TransactionStatus = Field(default=TransactionStatus.PENDING)
-    reference: Optional[str] = Field(default=None, index=True)  # external transaction ref
+    reference: Optional[str] = Field(default=None, index=True, unique=True)  # external transaction ref
     notes: Optional[str] = None
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
 
 class Transaction(TransactionBase, table=True):
+    # Webhook fallback and reconciliation look up "pending transaction of order X"
+    __table_args__ = (Index("ix_transaction_order_id_status", "order_id", "status"),)
+
     id: Optional[int] = Field(default=None, primary_key=True)
 
 
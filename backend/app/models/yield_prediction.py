@@ -0,0 +1,68 @@
+from datetime import date, datetime
+from typing import List, Optional
+from sqlmodel import Field, SQLModel
+
+
+class YieldPrediction(SQLModel, table=True):
+    """Predicted total harvest of an active field data plot."""
+    field_data_id: int = Field(foreign_key="fielddata.id", primary_key=True)
+    predicted_kg: int
+    harvested_kg: int = 0  # already declared through Harvest records
+    predicted_harvest_date: Optional[date] = None
+    source: str = "model"  # model | expected (agent estimate, no model trained yet)
+    predicted_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class YieldPredictionRead(SQLModel):
+    field_data_id: int
+    season: str
+    soil_type: str
+    location: str
+    agent_id: int
+    size_hectares: float
+    expected_harvest_kg: int
+    predicted_kg: int
+    harvested_kg: int
+    remaining_kg: int
+    predicted_harvest_date: Optional[date] = None
+    source: str
+
+
+class YieldModelInfo(SQLModel):
+    trained_at: Optional[datetime] = None
+    samples: int = 0
+    features: List[str] = []
+    median_harvest_age_days: Optional[int] = None
+
+
+class YieldForecastMonth(SQLModel):
+    month: str  # YYYY-MM of the predicted harvest date
+    plots: int
+    remaining_kg: int
+
+
+class YieldForecast(SQLModel):
+    model: YieldModelInfo
+    plots: int = 0
+    predicted_kg: int = 0
+    remaining_kg: int = 0
+    by_month: List[YieldForecastMonth] = []
+    predictions: List[YieldPredictionRead] = []
+
+
+class YieldBacktestFold(SQLModel):
+    season: str
+    train_samples: int
+    test_samples: int
+    model_mae_kg: float
+    model_mape_pct: Optional[float] = None
+    model_bias_kg: float  # mean of predicted - actual
+    expected_mae_kg: float  # agents' expected_harvest_kg, for comparison
+    expected_mape_pct: Optional[float] = None
+    expected_bias_kg: float
+
+
+class YieldBacktest(SQLModel):
+    folds: List[YieldBacktestFold] = []
+    model_mae_kg: Optional[float] = None
+    expected_mae_kg: Optional[float] = None
@@ -0,0 +1,75 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional, Tuple
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from core.config import settings
+from core.http_cache import etag_matches, strong_etag
+
+# Browsers and proxies may keep a copy but must revalidate it on every use (cheap 304)
+CACHE_CONTROL = "public, no-cache"
+
+
+class CatalogueCache:
+    """
+    Pre-serialized JSON of the public catalogue endpoints (products, categories,
+    delivery zones), keyed by query shape under a catalogue version.
+    Catalogue writes call bump(); entries also expire after CATALOGUE_CACHE_TTL_SECONDS
+    so writes handled by other worker processes show up.
+    """
+
+    def __init__(self):
+        self.version = 0
+        # key -> (version, expires_at, body, etag), least recently used first
+        self._entries: "OrderedDict[Hashable, Tuple[int, float, bytes, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def bump(self) -> None:
+        """Invalidates every cached response. Call after committing a catalogue change."""
+        with self._lock:
+            self.version += 1
+            self._entries.clear()
+
+    def _get(self, key: Hashable) -> Optional[Tuple[bytes, str]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            version, expires_at, body, etag = entry
+            if version != self.version or expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return body, etag
+
+    def _put(self, key: Hashable, version: int, body: bytes, etag: str) -> None:
+        with self._lock:
+            if version != self.version:
+                return  # the catalogue changed while this response was being built
+            self._entries[key] = (version, time.monotonic() + settings.CATALOGUE_CACHE_TTL_SECONDS, body, etag)
+            self._entries.move_to_end(key)
+            while len(self._entries) > settings.CATALOGUE_CACHE_MAX_ENTRIES:
+                self._entries.popitem(last=False)
+
+    def respond(self, request: Request, key: Hashable, build: Callable[[], Any]) -> Response:
+        """
+        Serves `key` from the cache, calling build() (which queries the DB and returns
+        the response data) on a miss. Answers 304 when If-None-Match matches.
+        """
+        cached = self._get(key)
+        if cached is None:
+            version = self.version
+            body = json.dumps(jsonable_encoder(build()), ensure_ascii=False, separators=(",", ":")).encode()
+            cached = body, strong_etag(body)
+            self._put(key, version, *cached)
+
+        body, etag = cached
+        headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type="application/json", headers=headers)
+
+
+catalogue_cache = CatalogueCache()
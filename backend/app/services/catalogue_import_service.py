@@ -0,0 +1,199 @@
+import codecs
+import csv
+import json
+import logging
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple
+from pydantic import ValidationError
+from sqlalchemy import insert, update
+from sqlmodel import Session, select
+from core.config import settings
+from models.product import Product, ProductImportReport, ProductImportRow, ProductImportRowResult
+from models.stock import StockMovementKind
+from models.user import User
+from services.low_stock_service import low_stock
+from services.stock_ledger_service import stock_ledger
+
+logger = logging.getLogger(__name__)
+
+ParsedRow = Tuple[int, Optional[Dict[str, Any]], Optional[str]]  # (row number, data, parse error)
+
+
+class CatalogueImportError(Exception):
+    """The file as a whole cannot be read (format, JSON syntax)."""
+
+
+class CatalogueImportService:
+    """
+    Bulk create/update of products from a CSV or JSON price list, matched by name.
+    Rows are validated one by one and written per batch: one lookup of the existing
+    names, then one executemany INSERT and one executemany UPDATE per batch.
+    """
+
+    def parse(self, file: BinaryIO, filename: str) -> Iterator[ParsedRow]:
+        """
+        Streams rows from a CSV (header line, `,` or `;` separated), a JSON array
+        or NDJSON file. Row numbers are 1-based data rows.
+        """
+        name = (filename or "").lower()
+        if name.endswith(".csv"):
+            return self._parse_csv(file)
+        if name.endswith((".json", ".ndjson", ".jsonl")):
+            return self._parse_json(file)
+        raise CatalogueImportError("Format non supporté (CSV ou JSON)")
+
+    def _parse_csv(self, file: BinaryIO) -> Iterator[ParsedRow]:
+        lines = codecs.iterdecode(file, "utf-8-sig")
+        header = next(lines, "")
+        # French spreadsheets export with ';'
+        delimiter = ";" if header.count(";") > header.count(",") else ","
+        fields = [f.strip() for f in next(csv.reader([header], delimiter=delimiter), [])]
+        for index, values in enumerate(csv.reader(lines, delimiter=delimiter), start=1):
+            if not any(v.strip() for v in values):
+                continue
+            row = {field: value.strip() for field, value in zip(fields, values) if value.strip() != ""}
+            yield index, row, None
+
+    def _parse_json(self, file: BinaryIO) -> Iterator[ParsedRow]:
+        first = file.read(1)
+        while first and first.isspace():
+            first = file.read(1)
+        if first == b"[":
+            file.seek(0)
+            try:
+                rows = json.load(file)
+            except ValueError as e:
+                raise CatalogueImportError(f"JSON invalide: {e}")
+            for index, row in enumerate(rows, start=1):
+                yield (index, row, None) if isinstance(row, dict) else (index, None, "Objet JSON attendu")
+            return
+        # NDJSON: one object per line, read incrementally
+        file.seek(0)
+        for index, line in enumerate(codecs.iterdecode(file, "utf-8-sig"), start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                yield index, None, f"JSON invalide: {e}"
+                continue
+            yield (index, row, None) if isinstance(row, dict) else (index, None, "Objet JSON attendu")
+
+    def _write_batch(
+        self, session: Session, batch: List[Tuple[int, ProductImportRow]], user: User
+    ) -> List[ProductImportRowResult]:
+        names = [row.name for _, row in batch]
+        existing = {
+            name: (id, producer_id, stock_quantity)
+            for id, name, producer_id, stock_quantity in session.exec(
+                select(Product.id, Product.name, Product.producer_id, Product.stock_quantity)
+                .where(Product.name.in_(names))
+            ).all()
+        }
+
+        results: List[ProductImportRowResult] = []
+        inserts: List[Dict[str, Any]] = []
+        insert_results: List[ProductImportRowResult] = []
+        # UPDATE parameter sets grouped by the columns they touch, one executemany per group
+        updates: Dict[Tuple[str, ...], List[Dict[str, Any]]] = {}
+        # Stock changes of existing products are applied as ledger deltas, not overwritten
+        movements: List[Dict[str, Any]] = []
+        for index, row in batch:
+            match = existing.get(row.name)
+            if match is None:
+                # Full rows (defaults included) so every INSERT shares one statement shape
+                values = {**row.dict(), "producer_id": user.id}
+                values["is_low_stock"] = values["stock_quantity"] < values["low_stock_threshold"]
+                inserts.append(values)
+                insert_results.append(ProductImportRowResult(row=index, name=row.name, status="created"))
+                continue
+            product_id, producer_id, stock_quantity = match
+            if user.role != "admin" and producer_id != user.id:
+                results.append(
+                    ProductImportRowResult(row=index, name=row.name, status="error", error="Permissions insuffisantes")
+                )
+                continue
+            values = row.dict(exclude_unset=True)
+            values.pop("name")
+            if "stock_quantity" in values:
+                movements.append({
+                    "product_id": product_id, "delta": values.pop("stock_quantity") - stock_quantity,
+                    "kind": StockMovementKind.IMPORT, "reference": "import", "user_id": user.id,
+                })
+            if values:
+                updates.setdefault(tuple(sorted(values)), []).append({"id": product_id, **values})
+            results.append(ProductImportRowResult(row=index, name=row.name, status="updated", id=product_id))
+
+        for params in updates.values():
+            session.execute(update(Product), params)
+        stock_ledger.record(session, movements)
+        if inserts:
+            session.execute(insert(Product), inserts)
+            new_names = [values["name"] for values in inserts]
+            created = dict(session.exec(select(Product.name, Product.id).where(Product.name.in_(new_names))).all())
+            for result in insert_results:
+                result.id = created.get(result.name)
+            results.extend(insert_results)
+            stock_ledger.record(session, [
+                {
+                    "product_id": created[values["name"]], "delta": values["stock_quantity"],
+                    "kind": StockMovementKind.IMPORT, "reference": "import", "user_id": user.id,
+                }
+                for values in inserts if values["name"] in created
+            ], apply=False)
+        # Threshold changes of existing products (stock changes were checked by the ledger;
+        # new products were inserted already flagged)
+        low_stock.check(session, [result.id for result in results if result.status == "updated"])
+        session.commit()
+        return results
+
+    def import_rows(self, session: Session, rows: Iterator[ParsedRow], user: User) -> ProductImportReport:
+        report = ProductImportReport()
+        batch: List[Tuple[int, ProductImportRow]] = []
+        seen_names = set()
+
+        def flush():
+            try:
+                report.add(self._write_batch(session, batch, user))
+            except Exception as e:
+                session.rollback()
+                logger.error("Catalogue import batch failed: %s", e)
+                report.add([
+                    ProductImportRowResult(row=index, name=row.name, status="error", error="Erreur d'enregistrement")
+                    for index, row in batch
+                ])
+            batch.clear()
+
+        for count, (index, data, error) in enumerate(rows, start=1):
+            if count > settings.CATALOGUE_IMPORT_MAX_ROWS:
+                report.add([ProductImportRowResult(
+                    row=index, status="error",
+                    error=f"Limite de {settings.CATALOGUE_IMPORT_MAX_ROWS} lignes atteinte, lignes suivantes ignorées",
+                )])
+                break
+            name = None
+            if data and isinstance(data.get("name"), str):
+                name = data["name"] = data["name"].strip()
+            if error is None:
+                try:
+                    row = ProductImportRow(**data)
+                except ValidationError as e:
+                    error = "; ".join(
+                        f"{'.'.join(str(loc) for loc in err['loc'])}: {err['msg']}" for err in e.errors()
+                    )
+                else:
+                    if row.name in seen_names:
+                        error = "Nom en double dans le fichier"
+            if error is not None:
+                report.add([ProductImportRowResult(row=index, name=name or None, status="error", error=error)])
+                continue
+            seen_names.add(row.name)
+            batch.append((index, row))
+            if len(batch) >= settings.CATALOGUE_IMPORT_BATCH_SIZE:
+                flush()
+        if batch:
+            flush()
+        report.rows.sort(key=lambda result: result.row)
+        return report
+
+
+catalogue_import = CatalogueImportService()
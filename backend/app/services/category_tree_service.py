@@ -0,0 +1,60 @@
+import logging
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+from sqlmodel import Session, select
+from core.config import settings
+from models.category import Category
+
+logger = logging.getLogger(__name__)
+
+
+class CategoryTreeService:
+    """
+    Cached expansion of the category hierarchy (Category.parent_id), so filtering
+    on a parent category covers all its descendants with one `category_id IN (...)`.
+    The tree is small: it is loaded with a single query, dropped on category writes
+    and reloaded after CATEGORY_TREE_TTL_SECONDS (writes made by other workers).
+    """
+
+    def __init__(self):
+        self._subtrees: Dict[int, List[int]] = {}
+        self._loaded_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._loaded_at = None
+
+    def _load(self, session: Session) -> None:
+        children: Dict[Optional[int], List[int]] = defaultdict(list)
+        ids = []
+        for id, parent_id in session.exec(select(Category.id, Category.parent_id)).all():
+            children[parent_id].append(id)
+            ids.append(id)
+
+        subtrees: Dict[int, List[int]] = {}
+        for root in ids:
+            # Iterative walk; `seen` also guards against parent_id cycles in bad data
+            seen = {root}
+            stack = [root]
+            while stack:
+                for child in children.get(stack.pop(), []):
+                    if child not in seen:
+                        seen.add(child)
+                        stack.append(child)
+            subtrees[root] = sorted(seen)
+        with self._lock:
+            self._subtrees = subtrees
+            self._loaded_at = time.monotonic()
+
+    def subtree(self, session: Session, category_id: int) -> List[int]:
+        """category_id and all its descendants (just [category_id] if unknown)."""
+        loaded_at = self._loaded_at
+        if loaded_at is None or time.monotonic() - loaded_at > settings.CATEGORY_TREE_TTL_SECONDS:
+            self._load(session)
+        return self._subtrees.get(category_id, [category_id])
+
+
+category_tree = CategoryTreeService()
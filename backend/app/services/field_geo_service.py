@@ -0,0 +1,235 @@
+import heapq
+import logging
+import math
+import sys
+from typing import List, Optional, Tuple
+from sqlalchemy import and_, bindparam, or_, update
+from sqlmodel import Session, select
+from core.config import settings
+from core.db import engine
+from models.field import Field, FieldNearby, FieldRead
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_KM = 6371.0088
+# Bits per axis of Field.geo_cell: 2^26 steps of 360/180 degrees, i.e. cells under a metre
+CELL_BITS = 26
+BACKFILL_BATCH_SIZE = 1000
+
+
+def _spread(value: int) -> int:
+    """Spaces out the bits of a CELL_BITS-bit integer (bit i moves to bit 2i)."""
+    value = (value | (value << 16)) & 0x0000FFFF0000FFFF
+    value = (value | (value << 8)) & 0x00FF00FF00FF00FF
+    value = (value | (value << 4)) & 0x0F0F0F0F0F0F0F0F
+    value = (value | (value << 2)) & 0x3333333333333333
+    return (value | (value << 1)) & 0x5555555555555555
+
+
+def _steps(latitude: float, longitude: float, bits: int) -> Tuple[int, int]:
+    """Grid coordinates of a point at `bits` per axis."""
+    size = 1 << bits
+    x = min(int((longitude + 180.0) / 360.0 * size), size - 1)
+    y = min(int((latitude + 90.0) / 180.0 * size), size - 1)
+    return x, y
+
+
+def cell(latitude: Optional[float], longitude: Optional[float]) -> Optional[int]:
+    """
+    Z-order cell of a point: longitude and latitude bits interleaved, the integer form
+    of a geohash. Every coarser cell is a contiguous range of these values, so an area
+    is a handful of range scans on the geo_cell index.
+    """
+    if latitude is None or longitude is None:
+        return None
+    x, y = _steps(latitude, longitude, CELL_BITS)
+    return (_spread(x) << 1) | _spread(y)
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = (
+        math.sin((phi2 - phi1) / 2) ** 2
+        + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def cover(min_lat: float, min_lon: float, max_lat: float, max_lon: float) -> List[Tuple[int, int]]:
+    """
+    geo_cell ranges [low, high) covering a bounding box: the finest grid level that
+    needs at most GEO_MAX_COVER_CELLS cells, adjacent cells merged into one range.
+    """
+    for bits in range(CELL_BITS, -1, -1):
+        x0, y0 = _steps(min_lat, min_lon, bits)
+        x1, y1 = _steps(max_lat, max_lon, bits)
+        if (x1 - x0 + 1) * (y1 - y0 + 1) <= settings.GEO_MAX_COVER_CELLS:
+            break
+    shift = 2 * (CELL_BITS - bits)
+    prefixes = sorted(_spread(x) << 1 | _spread(y) for x in range(x0, x1 + 1) for y in range(y0, y1 + 1))
+    ranges: List[Tuple[int, int]] = []
+    for prefix in prefixes:
+        low, high = prefix << shift, (prefix + 1) << shift
+        if ranges and ranges[-1][1] == low:
+            ranges[-1] = (ranges[-1][0], high)
+        else:
+            ranges.append((low, high))
+    return ranges
+
+
+class FieldGeoService:
+    """
+    Radius and bounding-box queries on fields. The area is covered with grid cells,
+    fetched through range scans of the Field.geo_cell index, then refined exactly
+    (bounding box, or haversine distance) on the candidates.
+    """
+
+    def _in_box(self, box: Tuple[float, float, float, float], owner_id: Optional[int], *columns):
+        """Fields (or `columns`) in the box: cell ranges for the index, then the exact coordinates."""
+        min_lat, min_lon, max_lat, max_lon = box
+        statement = select(*columns or (Field,)).where(
+            or_(*(and_(Field.geo_cell >= low, Field.geo_cell < high) for low, high in cover(*box))),
+            Field.latitude.between(min_lat, max_lat),
+            Field.longitude.between(min_lon, max_lon),
+        )
+        if owner_id is not None:
+            statement = statement.where(Field.owner_id == owner_id)
+        return statement
+
+    def within_box(
+        self,
+        session: Session,
+        min_lat: float,
+        min_lon: float,
+        max_lat: float,
+        max_lon: float,
+        owner_id: Optional[int] = None,
+        limit: int = 100,
+    ) -> List[FieldNearby]:
+        statement = self._in_box((min_lat, min_lon, max_lat, max_lon), owner_id)
+        fields = session.exec(statement.order_by(Field.id).limit(limit)).all()
+        return [FieldNearby.from_orm(field) for field in fields]
+
+    def within_radius(
+        self,
+        session: Session,
+        latitude: float,
+        longitude: float,
+        radius_km: float,
+        owner_id: Optional[int] = None,
+        limit: int = 100,
+    ) -> List[FieldNearby]:
+        """Fields within `radius_km` of the point, nearest first."""
+        dlat = math.degrees(radius_km / EARTH_RADIUS_KM)
+        cos_lat = math.cos(math.radians(latitude))
+        dlon = 180.0 if cos_lat < 1e-6 else min(180.0, dlat / cos_lat)
+        box = (
+            max(-90.0, latitude - dlat), max(-180.0, longitude - dlon),
+            min(90.0, latitude + dlat), min(180.0, longitude + dlon),
+        )
+        # Distances on coordinates only; full rows are loaded for the nearest `limit`
+        candidates = session.exec(self._in_box(box, owner_id, Field.id, Field.latitude, Field.longitude)).all()
+        nearest = heapq.nsmallest(limit, (
+            (distance, id)
+            for id, lat, lon in candidates
+            for distance in (haversine_km(latitude, longitude, lat, lon),)
+            if distance <= radius_km
+        ))
+        if not nearest:
+            return []
+        fields = {field.id: field for field in session.exec(select(Field).where(Field.id.in_([id for _, id in nearest]))).all()}
+        return [
+            FieldNearby(**FieldRead.from_orm(fields[id]).dict(), distance_km=round(distance, 3))
+            for distance, id in nearest
+        ]
+
+    def backfill(self) -> int:
+        """Fills geo_cell of located fields written before it existed."""
+        done = 0
+        with Session(engine) as session:
+            while True:
+                rows = session.exec(
+                    select(Field.id, Field.latitude, Field.longitude)
+                    .where(Field.geo_cell == None, Field.latitude != None, Field.longitude != None)
+                    .limit(BACKFILL_BATCH_SIZE)
+                ).all()
+                if not rows:
+                    break
+                fields = Field.__table__
+                session.connection().execute(
+                    update(fields).where(fields.c.id == bindparam("field_id")).values(geo_cell=bindparam("cell")),
+                    [{"field_id": id, "cell": cell(lat, lon)} for id, lat, lon in rows],
+                )
+                session.commit()
+                done += len(rows)
+        if done:
+            logger.info("Field geo cells computed for %d field(s)", done)
+        return done
+
+
+field_geo = FieldGeoService()
+
+
+def _bench(count: int, path: str) -> None:
+    """Synthetic fields spread over Togo and neighbours; cell queries vs scanning every field."""
+    import os
+    import random
+    import time
+    from sqlalchemy import create_engine, insert
+    from sqlmodel import SQLModel
+    import models.crop  # noqa: F401  (Field.crops relationship)
+    from models.user import User
+
+    if os.path.exists(path):
+        os.remove(path)
+    bench_engine = create_engine(f"sqlite:///{path}")
+    SQLModel.metadata.create_all(bench_engine, tables=[User.__table__, Field.__table__])
+    rng = random.Random(42)
+    started = time.perf_counter()
+    with Session(bench_engine) as session:
+        session.add(User(id=1, email="bench@example.com", username="bench", hashed_password="-", role="producteur"))
+        session.commit()
+        for offset in range(0, count, 50_000):
+            rows = []
+            for i in range(offset, min(count, offset + 50_000)):
+                lat, lon = rng.uniform(4.0, 12.0), rng.uniform(-2.0, 4.0)
+                rows.append({
+                    "name": f"Champ {i}", "location_name": "bench", "latitude": lat, "longitude": lon,
+                    "area_size_hectares": 1.0, "owner_id": 1, "geo_cell": cell(lat, lon),
+                })
+            session.execute(insert(Field), rows)
+        session.commit()
+    print(f"{count} fields written in {time.perf_counter() - started:.1f}s ({path})")
+
+    points = [(rng.uniform(5.0, 11.0), rng.uniform(-1.0, 3.0)) for _ in range(50)]
+    with Session(bench_engine) as session:
+        for radius in (1, 10, 50):
+            started = time.perf_counter()
+            found = sum(len(field_geo.within_radius(session, lat, lon, radius, limit=1000)) for lat, lon in points)
+            elapsed = (time.perf_counter() - started) / len(points)
+            print(f"radius {radius:>3} km: {elapsed * 1000:8.2f} ms/query, {found / len(points):8.1f} fields")
+        started = time.perf_counter()
+        found = sum(
+            len(field_geo.within_box(session, lat - 0.25, lon - 0.25, lat + 0.25, lon + 0.25, limit=1000))
+            for lat, lon in points
+        )
+        elapsed = (time.perf_counter() - started) / len(points)
+        print(f"box 0.5 deg : {elapsed * 1000:8.2f} ms/query, {found / len(points):8.1f} fields")
+        # Baseline: what a radius search costs without the index, loading every field
+        lat, lon = points[0]
+        started = time.perf_counter()
+        rows = session.exec(select(Field.id, Field.latitude, Field.longitude)).all()
+        found = sum(1 for _, flat, flon in rows if haversine_km(lat, lon, flat, flon) <= 10)
+        print(f"full scan   : {(time.perf_counter() - started) * 1000:8.2f} ms/query, {found:8.1f} fields (10 km)")
+
+
+if __name__ == "__main__":
+    # python -m services.field_geo_service backfill | bench [COUNT] [SQLITE_PATH]  (from backend/app)
+    logging.basicConfig(level=logging.INFO)
+    command = sys.argv[1] if len(sys.argv) > 1 else "backfill"
+    if command == "backfill":
+        print(f"{field_geo.backfill()} field(s) updated")
+    elif command == "bench":
+        _bench(int(sys.argv[2]) if len(sys.argv) > 2 else 1_000_000, sys.argv[3] if len(sys.argv) > 3 else "/tmp/field_geo_bench.db")
+    else:
+        sys.exit(f"Unknown command: {command} (expected backfill or bench)")
@@ -0,0 +1,153 @@
+import asyncio
+import logging
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, select
+from core.config import settings
+from core.db import engine
+from models.harvest import Harvest, HarvestStatus
+from models.stock import HarvestIntake, HarvestIntakeLine, HarvestIntakeReport, StockConversion, StockMovementKind
+from services.catalogue_cache_service import catalogue_cache
+from services.stock_ledger_service import stock_ledger
+
+logger = logging.getLogger(__name__)
+
+# Harvests whose kg are confirmed and can become stock
+INTAKE_STATUSES = [HarvestStatus.VERIFIED, HarvestStatus.PROCESSED]
+
+
+class HarvestIntakeService:
+    """
+    Turns verified harvests into product stock using the active StockConversion rules
+    (raw kg x share x ratio per product). Each batch is one transaction: HarvestIntake
+    rows, keyed by harvest, make it idempotent, and the stock is added through the
+    stock ledger (one movement per harvest and product). Runs after a harvest is verified and periodically for
+    anything missed. Later edits to an applied harvest are not re-applied; corrections
+    go through a manual stock update.
+
+    A conversion only takes harvests verified after it was created: older harvests are
+    assumed to be in the manual stock already. Taking them in anyway is an explicit
+    admin action (process(historical=True)).
+    """
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+
+    def _pending(
+        self, session: Session, harvest_ids: Optional[List[int]], verified_since: Optional[datetime]
+    ) -> List[Tuple[int, int, Optional[datetime]]]:
+        """
+        (id, actual_kg, verified_at) of verified harvests not yet taken into stock, oldest
+        first; only those verified since `verified_since` unless it is None.
+        """
+        statement = (
+            select(Harvest.id, Harvest.actual_kg, Harvest.verified_at)
+            .outerjoin(HarvestIntake, HarvestIntake.harvest_id == Harvest.id)
+            .where(Harvest.status.in_(INTAKE_STATUSES), HarvestIntake.harvest_id == None)
+            .order_by(Harvest.id)
+            .limit(settings.HARVEST_INTAKE_BATCH_SIZE)
+        )
+        if verified_since is not None:
+            statement = statement.where(Harvest.verified_at >= verified_since)
+        if harvest_ids is not None:
+            statement = statement.where(Harvest.id.in_(harvest_ids))
+        return session.exec(statement).all()
+
+    def _apply_batch(
+        self,
+        session: Session,
+        harvests: List[Tuple[int, int, Optional[datetime]]],
+        conversions: List[StockConversion],
+        historical: bool = False,
+    ) -> Dict[int, int]:
+        """Writes one batch; returns stock added per product."""
+        now = datetime.utcnow()
+        intake_rows = []
+        movements = []
+        added: Dict[int, int] = defaultdict(int)
+        for harvest_id, actual_kg, verified_at in harvests:
+            for conversion in conversions:
+                if not historical and verified_at < conversion.created_at:
+                    continue  # verified before this conversion existed
+                raw_kg = actual_kg * conversion.share
+                quantity = int(round(raw_kg * conversion.ratio))
+                intake_rows.append({
+                    "harvest_id": harvest_id, "product_id": conversion.product_id,
+                    "raw_kg": raw_kg, "quantity": quantity, "processed_at": now,
+                })
+                movements.append({
+                    "product_id": conversion.product_id, "delta": quantity,
+                    "kind": StockMovementKind.HARVEST, "reference": f"harvest:{harvest_id}",
+                })
+                added[conversion.product_id] += quantity
+        # Inserted first: a concurrent run on the same harvests fails here, before touching stock
+        session.execute(insert(HarvestIntake), intake_rows)
+        stock_ledger.record(session, movements)
+        session.commit()
+        return added
+
+    def process(self, harvest_ids: Optional[Iterable[int]] = None, historical: bool = False) -> HarvestIntakeReport:
+        """
+        Takes pending verified harvests (all, or only `harvest_ids`) into stock, batch by
+        batch. With `historical`, also harvests verified before the conversions were created.
+        """
+        harvest_ids = list(harvest_ids) if harvest_ids is not None else None
+        report = HarvestIntakeReport()
+        totals: Dict[int, int] = defaultdict(int)
+        with Session(engine) as session:
+            conversions = session.exec(select(StockConversion).where(StockConversion.is_active == True)).all()
+            if not conversions:
+                return report  # harvests stay pending until a conversion is configured
+            verified_since = None if historical else min(conversion.created_at for conversion in conversions)
+            conflicted = None
+            while True:
+                harvests = self._pending(session, harvest_ids, verified_since)
+                if not harvests:
+                    break
+                try:
+                    added = self._apply_batch(session, harvests, conversions, historical)
+                except IntegrityError:
+                    session.rollback()
+                    if harvests == conflicted:
+                        raise  # not a concurrent run: nothing changed since the last attempt
+                    # Another worker took (some of) these harvests in first; re-read what is still pending
+                    conflicted = harvests
+                    continue
+                report.harvests += len(harvests)
+                for product_id, quantity in added.items():
+                    totals[product_id] += quantity
+        if report.harvests:
+            catalogue_cache.bump()
+            logger.info("Harvest intake: %d harvest(s) taken into stock", report.harvests)
+        report.products = [HarvestIntakeLine(product_id=p, quantity=q) for p, q in sorted(totals.items())]
+        return report
+
+    async def _run_forever(self) -> None:
+        while True:
+            try:
+                await asyncio.to_thread(self.process)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Harvest intake failed: {e}", exc_info=True)
+            await asyncio.sleep(settings.HARVEST_INTAKE_INTERVAL_SECONDS)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run_forever())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+
+harvest_intake = HarvestIntakeService()
@@ -0,0 +1,137 @@
+import asyncio
+import hashlib
+import logging
+from collections import defaultdict
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+from sqlmodel import Session
+from core.config import settings
+from core.db import engine
+from models.product import Product, ProductImageImport
+from services.catalogue_cache_service import catalogue_cache
+from services.image_library_service import ImageVariantUrls, image_library
+from services.storage import storage
+
+logger = logging.getLogger(__name__)
+
+
+class ImageImportError(Exception):
+    """Per-item failure reported back to the client instead of aborting the batch."""
+
+
+class ImageImportService:
+    """
+    Bulk catalogue onboarding: fetches many product images concurrently,
+    with a global concurrency bound and a per-host limit so one slow site cannot
+    take every slot (nor be hammered). Database work runs in worker threads so the
+    event loop keeps serving the other downloads.
+    """
+
+    def _check_product(self, product_id: int, user_id: int, role: str) -> None:
+        with Session(engine) as session:
+            product = session.get(Product, product_id)
+            if not product:
+                raise ImageImportError("Produit non trouvé")
+            if role not in ["admin", "gestionnaire"] and product.producer_id != user_id:
+                raise ImageImportError("Permissions insuffisantes")
+
+    def _known_image(self, content_hash: str) -> Optional[Tuple[str, ImageVariantUrls]]:
+        with Session(engine) as session:
+            stored = image_library.find(session, content_hash)
+            return (stored.url, stored.variants) if stored else None
+
+    def _set_image(
+        self, session: Session, product: Product, public_url: str, variants: ImageVariantUrls
+    ) -> List[str]:
+        """Points the product at its new image, releasing the previous one; returns blobs to delete."""
+        unused_images = image_library.release(session, product.image_url, product.image_variants)
+        product.image_url = public_url
+        product.image_variants = variants
+        session.add(product)
+        session.commit()
+        return unused_images
+
+    def _assign_hosted(self, product_id: int, image_url: str) -> Tuple[str, List[str]]:
+        with Session(engine) as session:
+            product = session.get(Product, product_id)
+            if product.image_url == image_url:
+                return image_url, []
+            _, variants = image_library.acquire(session, image_url)
+            return image_url, self._set_image(session, product, image_url, variants)
+
+    def _assign_stored(
+        self, product_id: int, content_hash: str, public_url: str, variants: ImageVariantUrls
+    ) -> Tuple[str, List[str]]:
+        with Session(engine) as session:
+            product = session.get(Product, product_id)
+            public_url, variants = image_library.register(session, content_hash, public_url, variants)
+            return public_url, self._set_image(session, product, public_url, variants)
+
+    async def _import_one(
+        self,
+        index: int,
+        item: ProductImageImport,
+        user_id: int,
+        role: str,
+        semaphore: asyncio.Semaphore,
+        host_limit: asyncio.Semaphore,
+    ) -> Dict[str, Any]:
+        result: Dict[str, Any] = {"index": index, "product_id": item.product_id, "source_url": item.image_url}
+        try:
+            if not item.image_url.startswith(("http://", "https://")):
+                raise ImageImportError("URL invalide")
+            await asyncio.to_thread(self._check_product, item.product_id, user_id, role)
+
+            # No DB connection is held while downloading; host limit first so a
+            # saturated host does not sit on a global slot
+            if storage.owns(item.image_url):
+                # Already hosted: share it if indexed
+                public_url, unused_images = await asyncio.to_thread(self._assign_hosted, item.product_id, item.image_url)
+            else:
+                async with host_limit, semaphore:
+                    content = await image_library.fetch_remote(item.image_url)
+                content_hash = await asyncio.to_thread(lambda: hashlib.sha256(content).hexdigest())
+                known = await asyncio.to_thread(self._known_image, content_hash)
+                if known:
+                    public_url, variants = known
+                else:
+                    public_url, variants = await image_library.upload(content, content_hash)
+                    if not public_url:
+                        raise ImageImportError("Échec de l'enregistrement de l'image")
+                public_url, unused_images = await asyncio.to_thread(
+                    self._assign_stored, item.product_id, content_hash, public_url, variants
+                )
+            catalogue_cache.bump()
+
+            if unused_images:
+                await storage.delete_images(unused_images)
+            result.update(status="ok", image_url=public_url)
+        except Exception as e:
+            logger.warning("Bulk image import failed for product %s (%s): %s", item.product_id, item.image_url, e)
+            result.update(status="error", error=str(e) or type(e).__name__)
+        return result
+
+    async def import_images(
+        self, items: List[ProductImageImport], user_id: int, role: str
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Yields one result per item, in completion order."""
+        semaphore = asyncio.Semaphore(settings.BULK_IMAGE_IMPORT_CONCURRENCY)
+        host_limits: Dict[str, asyncio.Semaphore] = defaultdict(
+            lambda: asyncio.Semaphore(settings.BULK_IMAGE_IMPORT_PER_HOST)
+        )
+        tasks = [
+            asyncio.create_task(
+                self._import_one(i, item, user_id, role, semaphore, host_limits[urlsplit(item.image_url).netloc])
+            )
+            for i, item in enumerate(items)
+        ]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            # Client went away: stop the remaining downloads
+            for task in tasks:
+                task.cancel()
+
+
+image_import = ImageImportService()
@@ -0,0 +1,152 @@
+import asyncio
+import hashlib
+import logging
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, select
+from core.config import settings
+from core.http_gateway import ResponseTooLarge, http_gateway
+from models.stored_image import StoredImage
+from services.image_processing_service import ImageSource, detect_image_type, image_processing
+from services.storage import storage
+
+logger = logging.getLogger(__name__)
+
+ImageVariantUrls = Optional[Dict[str, Dict[str, str]]]
+
+
+def stored_image_urls(image_url: Optional[str], image_variants: ImageVariantUrls) -> List[str]:
+    """All stored objects backing a product photo."""
+    urls = [image_url] if image_url else []
+    for formats in (image_variants or {}).values():
+        urls.extend(formats.values())
+    return [u for u in set(urls) if storage.owns(u)]
+
+
+class ImageLibraryService:
+    """
+    Deduplicated, reference-counted product images.
+    Images are keyed by the SHA-256 of their content: a file already known is never
+    uploaded again, and its blobs are deleted only once no product uses them.
+    Reference counts are changed in the caller's session, so they commit with the product.
+    """
+
+    def _increment(self, session: Session, stored: StoredImage) -> None:
+        session.execute(
+            update(StoredImage)
+            .where(StoredImage.id == stored.id)
+            .values(ref_count=StoredImage.ref_count + 1)
+        )
+
+    async def fetch_remote(self, url: str) -> bytes:
+        """
+        Downloads a remote image through the HTTP gateway, streamed so that an oversized
+        file is abandoned at MAX_IMAGE_UPLOAD_BYTES instead of held in memory. Raises on
+        HTTP errors, oversized files and anything that is not a supported image (whatever
+        its URL or Content-Type claims).
+        """
+        limit = settings.MAX_IMAGE_UPLOAD_BYTES
+        try:
+            response = await http_gateway.get(url, timeout=10.0, max_bytes=limit)
+        except ResponseTooLarge as e:
+            raise ValueError(f"Image trop volumineuse (plus de {limit} octets)") from e
+        response.raise_for_status()
+        if detect_image_type(response.content) is None:
+            raise ValueError("Format d'image non supporté (JPEG, PNG, GIF, WebP)")
+        return response.content
+
+    def find(self, session: Session, content_hash: str) -> Optional[StoredImage]:
+        return session.exec(select(StoredImage).where(StoredImage.content_hash == content_hash)).first()
+
+    async def upload(self, content: ImageSource, content_hash: str) -> Tuple[Optional[str], ImageVariantUrls]:
+        """
+        Uploads thumb/card/full variants (WebP + JPEG fallback), or the file as-is when it
+        cannot be decoded (only if it is a supported image type). No database access.
+        Returns (image_url, image_variants).
+        """
+        urls: ImageVariantUrls = None
+        variants = await image_processing.generate_variants(content)
+        if variants:
+            urls = await storage.upload_variants(variants, content_hash)
+        if urls:
+            return urls["full"]["jpeg"], urls
+        public_url = await storage.upload_image(content, content_hash=content_hash)
+        return public_url, None
+
+    def register(
+        self, session: Session, content_hash: str, public_url: str, urls: ImageVariantUrls
+    ) -> Tuple[str, ImageVariantUrls]:
+        """
+        Takes one reference on an uploaded image, creating its row if needed; when the
+        same file was registered meanwhile, its row (and URLs) are shared instead.
+        """
+        stored = self.find(session, content_hash)
+        if stored is None:
+            try:
+                with session.begin_nested():
+                    session.add(StoredImage(content_hash=content_hash, url=public_url, variants=urls, ref_count=1))
+                return public_url, urls
+            except IntegrityError:
+                # Same file uploaded concurrently by another request: share its row
+                stored = session.exec(select(StoredImage).where(StoredImage.content_hash == content_hash)).one()
+        self._increment(session, stored)
+        return stored.url, stored.variants
+
+    async def store(
+        self, session: Session, content: ImageSource, content_hash: Optional[str] = None
+    ) -> Tuple[Optional[str], ImageVariantUrls]:
+        """
+        Stores a product photo as thumb/card/full variants (WebP + JPEG fallback),
+        or as-is when it cannot be decoded, and takes one reference on it.
+        :param content: Bytes, or path of a spooled upload (then content_hash is required)
+        Returns (image_url, image_variants); image_url is the full-size JPEG.
+        """
+        if content_hash is None:
+            content_hash = await asyncio.to_thread(lambda: hashlib.sha256(content).hexdigest())
+        stored = self.find(session, content_hash)
+        if stored:
+            self._increment(session, stored)
+            return stored.url, stored.variants
+
+        public_url, urls = await self.upload(content, content_hash)
+        if not public_url:
+            return None, None
+        return self.register(session, content_hash, public_url, urls)
+
+    def acquire(self, session: Session, image_url: str) -> Tuple[bool, ImageVariantUrls]:
+        """
+        Takes one reference on an already stored image given its public URL.
+        Returns (known, variants); unknown URLs (external or legacy) are left untouched.
+        """
+        stored = session.exec(select(StoredImage).where(StoredImage.url == image_url)).first()
+        if not stored:
+            return False, None
+        self._increment(session, stored)
+        return True, stored.variants
+
+    def release(self, session: Session, image_url: Optional[str], image_variants: ImageVariantUrls) -> List[str]:
+        """
+        Drops one reference on a product's image.
+        Returns the blob URLs that are no longer used and can be deleted from storage.
+        """
+        if not image_url:
+            return []
+        stored = session.exec(select(StoredImage).where(StoredImage.url == image_url)).first()
+        if not stored:
+            # Uploaded before deduplication: owned by this product only
+            return stored_image_urls(image_url, image_variants)
+
+        session.execute(
+            update(StoredImage)
+            .where(StoredImage.id == stored.id)
+            .values(ref_count=StoredImage.ref_count - 1)
+        )
+        session.refresh(stored)
+        if stored.ref_count > 0:
+            return []
+        session.delete(stored)
+        return stored_image_urls(stored.url, stored.variants)
+
+
+image_library = ImageLibraryService()
@@ -0,0 +1,127 @@
+import asyncio
+import io
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional, Tuple, Union
+from core.config import settings
+
+# Pillow is optional: without it, images are stored as uploaded (no variants)
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+# Variant name -> max width/height in pixels
+VARIANT_SIZES = {
+    "thumb": 200,
+    "card": 480,
+    "full": 1600,
+}
+# Output format -> (Pillow format, content type, file extension)
+VARIANT_FORMATS = {
+    "webp": ("WEBP", "image/webp", "webp"),
+    "jpeg": ("JPEG", "image/jpeg", "jpg"),
+}
+
+# {"thumb": {"webp": (bytes, content_type, ext), "jpeg": (...)}, ...}
+Variants = Dict[str, Dict[str, Tuple[bytes, str, str]]]
+# Image content in memory, or path of a local (spooled) file
+ImageSource = Union[bytes, str]
+
+# Leading bytes -> (extension, content type)
+_MAGIC_NUMBERS = [
+    (b"\xff\xd8\xff", ("jpg", "image/jpeg")),
+    (b"\x89PNG\r\n\x1a\n", ("png", "image/png")),
+    (b"GIF87a", ("gif", "image/gif")),
+    (b"GIF89a", ("gif", "image/gif")),
+]
+
+
+# Content types of the stored images, by file extension: the only files /media serves
+IMAGE_CONTENT_TYPES = {"jpg": "image/jpeg", "png": "image/png", "gif": "image/gif", "webp": "image/webp"}
+
+
+def detect_image_type(head: bytes) -> Optional[Tuple[str, str]]:
+    """
+    Identifies an image from its first bytes (magic numbers), regardless of its filename.
+    Returns (extension, content_type) or None if it is not a supported image.
+    """
+    for magic, image_type in _MAGIC_NUMBERS:
+        if head.startswith(magic):
+            return image_type
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp", "image/webp"
+    return None
+
+
+def detect_source_type(source: ImageSource) -> Optional[Tuple[str, str]]:
+    """detect_image_type of in-memory content or of a local file (reads its first bytes)."""
+    if isinstance(source, bytes):
+        return detect_image_type(source[:16])
+    with open(source, "rb") as f:
+        return detect_image_type(f.read(16))
+
+
+def _render_variants(source: ImageSource) -> Variants:
+    """CPU-bound resize/encode; runs in a worker process."""
+    with Image.open(io.BytesIO(source) if isinstance(source, bytes) else source) as src:
+        src = ImageOps.exif_transpose(src)
+        has_alpha = src.mode in ("RGBA", "LA") or (src.mode == "P" and "transparency" in src.info)
+        src = src.convert("RGBA" if has_alpha else "RGB")
+
+        variants: Variants = {}
+        for name, size in VARIANT_SIZES.items():
+            img = src.copy()
+            img.thumbnail((size, size), Image.LANCZOS)
+            variants[name] = {}
+            for fmt, (pil_format, content_type, ext) in VARIANT_FORMATS.items():
+                out = img
+                if pil_format == "JPEG" and img.mode == "RGBA":
+                    # JPEG has no alpha: flatten on a white background
+                    out = Image.new("RGB", img.size, (255, 255, 255))
+                    out.paste(img, mask=img.getchannel("A"))
+                buf = io.BytesIO()
+                out.save(buf, format=pil_format, quality=settings.IMAGE_VARIANT_QUALITY, optimize=True)
+                variants[name][fmt] = (buf.getvalue(), content_type, ext)
+        return variants
+
+
+class ImageProcessingService:
+    """Generates resized WebP/JPEG variants of product photos in a process pool."""
+
+    def __init__(self):
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    @property
+    def available(self) -> bool:
+        return Image is not None
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=settings.IMAGE_PROCESS_WORKERS)
+        return self._pool
+
+    async def generate_variants(self, source: ImageSource) -> Optional[Variants]:
+        """
+        Returns thumb/card/full variants in WebP and JPEG, or None if the
+        content is not a decodable image (or Pillow is not installed).
+        Passing a file path avoids copying the payload to the worker process.
+        """
+        if not self.available:
+            return None
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self._get_pool(), _render_variants, source)
+        except Exception as e:
+            logger.warning(f"Could not generate image variants: {e}")
+            return None
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+            self._pool = None
+
+
+image_processing = ImageProcessingService()
@@ -0,0 +1,98 @@
+import asyncio
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+from typing import Dict, List, Optional, Tuple
+from core.config import settings
+from services.image_processing_service import ImageSource
+from services.storage_backend import StorageBackend
+
+logger = logging.getLogger(__name__)
+
+
+class LocalStorageService(StorageBackend):
+    """
+    Stores images on the local disk (development, offline tests, load tests)
+    and serves them through the /media route.
+    """
+
+    name = "Local"
+
+    def __init__(self):
+        self.root = os.path.abspath(settings.LOCAL_STORAGE_DIR)
+        self.base_url = settings.LOCAL_STORAGE_BASE_URL.rstrip("/")
+        # path -> (mtime_ns, size, etag); objects are immutable once written
+        self._etags: Dict[str, Tuple[int, int, str]] = {}
+
+    @property
+    def available(self) -> bool:
+        return True
+
+    def resolve(self, path: str) -> Optional[str]:
+        """Absolute file path for an object path, or None if it escapes the storage root."""
+        full = os.path.abspath(os.path.join(self.root, path))
+        if not full.startswith(self.root + os.sep):
+            return None
+        return full
+
+    def _write_atomic(self, path: str, file_content: ImageSource) -> None:
+        target = self.resolve(path)
+        if target is None:
+            raise ValueError(f"Invalid storage path: {path}")
+        directory = os.path.dirname(target)
+        os.makedirs(directory, exist_ok=True)
+        # Write to a temp file in the same directory, then rename: readers never see a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".upload-")
+        try:
+            with os.fdopen(fd, "wb") as out:
+                if isinstance(file_content, bytes):
+                    out.write(file_content)
+                else:
+                    with open(file_content, "rb") as src:
+                        shutil.copyfileobj(src, out)
+                out.flush()
+                os.fsync(out.fileno())
+            os.replace(tmp_path, target)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    async def _put(self, path: str, file_content: ImageSource, content_type: str) -> str:
+        await asyncio.to_thread(self._write_atomic, path, file_content)
+        return f"{self.base_url}/{path}"
+
+    def _remove_files(self, paths: List[str]) -> None:
+        for path in paths:
+            target = self.resolve(path)
+            if target and os.path.exists(target):
+                os.remove(target)
+            self._etags.pop(path, None)
+
+    async def _remove(self, paths: List[str]) -> None:
+        await asyncio.to_thread(self._remove_files, paths)
+
+    def path_from_url(self, image_url: str) -> Optional[str]:
+        prefix = f"{self.base_url}/"
+        if not image_url.startswith(prefix):
+            return None
+        return image_url[len(prefix):].split("?")[0]
+
+    def etag(self, path: str, full_path: str) -> str:
+        """Strong ETag: SHA-256 of the file content, cached per (mtime, size)."""
+        stat = os.stat(full_path)
+        cached = self._etags.get(path)
+        if cached and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+            return cached[2]
+        digest = hashlib.sha256()
+        with open(full_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+        etag = f'"{digest.hexdigest()}"'
+        self._etags[path] = (stat.st_mtime_ns, stat.st_size, etag)
+        return etag
+
+
+local_storage = LocalStorageService()
@@ -0,0 +1,73 @@
+import logging
+from typing import Iterable
+from sqlalchemy import insert, update
+from sqlmodel import Session, select
+from core.db import engine
+from models.notification import Notification, NotificationType
+from models.product import Product
+
+logger = logging.getLogger(__name__)
+
+
+class LowStockService:
+    """
+    Keeps Product.is_low_stock (stock_quantity below low_stock_threshold) in step with
+    stock writes and notifies the producer once per crossing: the flag flips with a
+    conditional UPDATE, so of concurrent writers only the one that flips it notifies.
+    Going back above the threshold re-arms the alert. New products are written with
+    their flag already set, so starting below the threshold is not a crossing.
+    """
+
+    def check(self, session: Session, product_ids: Iterable[int], alert: bool = True) -> int:
+        """
+        Re-evaluates `product_ids` after a stock or threshold write; returns alerts created
+        (none without `alert`, flags only). Does not commit.
+        """
+        product_ids = list(set(product_ids))
+        if not product_ids:
+            return 0
+        rows = session.exec(
+            select(
+                Product.id, Product.name, Product.unit, Product.producer_id, Product.stock_quantity,
+                Product.low_stock_threshold, Product.is_low_stock,
+            ).where(Product.id.in_(product_ids))
+        ).all()
+        alerts = []
+        for product_id, name, unit, producer_id, stock, threshold, flagged in rows:
+            low = stock < threshold
+            if low == flagged:
+                continue
+            flipped = session.connection().execute(
+                update(Product.__table__)
+                .where(Product.__table__.c.id == product_id, Product.__table__.c.is_low_stock == flagged)
+                .values(is_low_stock=low)
+            ).rowcount
+            if flipped and low and alert and producer_id is not None:
+                alerts.append({
+                    "user_id": producer_id,
+                    "title": "Stock faible",
+                    "message": f"Le stock de « {name} » est de {stock} {unit}, sous le seuil de {threshold} {unit}.",
+                    "type": NotificationType.LOW_STOCK,
+                })
+        if alerts:
+            session.execute(insert(Notification), alerts)
+            logger.info("Low stock: %d alert(s) sent", len(alerts))
+        return len(alerts)
+
+    def backfill(self) -> int:
+        """
+        Fixes products whose flag is out of date, e.g. written before thresholds existed.
+        Flags only: these are not crossings, and an upgrade would alert every low product at once.
+        """
+        with Session(engine) as session:
+            stale = session.exec(
+                select(Product.id).where((Product.stock_quantity < Product.low_stock_threshold) != Product.is_low_stock)
+            ).all()
+            self.check(session, stale, alert=False)
+            session.commit()
+        if stale:
+            logger.info("Low stock: flag updated on %d product(s)", len(stale))
+        return len(stale)
+
+
+low_stock = LowStockService()
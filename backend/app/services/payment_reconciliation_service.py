@@ -0,0 +1,180 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import update
+from sqlmodel import Session, select
+from core.config import settings
+from core.db import engine
+from models.order import Order
+from models.transaction import Transaction, TransactionStatus
+from services.payment_service import payment_service
+from services.sync_service import sync_changes
+
+logger = logging.getLogger(__name__)
+
+# PayGate codes that settle a transaction; anything else (2 = en cours, -1 = erreur) is retried later
+SETTLED_STATUSES = {0, 4, 6}
+
+
+class PaymentReconciliationService:
+    """
+    Periodically re-checks stale PENDING transactions against PayGate,
+    for payments whose webhook callback never arrived.
+    """
+
+    def __init__(self):
+        # tx_id -> (failed attempts, next check time) ; kept in memory for the process lifetime
+        self._backoff: Dict[int, Tuple[int, datetime]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def _prune_backoff(self, session: Session) -> None:
+        """Forgets transactions settled elsewhere (webhook, manual update) so the map stays bounded."""
+        if not self._backoff:
+            return
+        still_pending = set(session.exec(
+            select(Transaction.id)
+            .where(Transaction.id.in_(list(self._backoff)))
+            .where(Transaction.status == TransactionStatus.PENDING)
+        ).all())
+        for tx_id in [tx_id for tx_id in self._backoff if tx_id not in still_pending]:
+            del self._backoff[tx_id]
+
+    def _select_stale(self, now: datetime) -> List[Tuple[int, int, str]]:
+        """Returns (id, order_id, reference) of pending transactions due for a check."""
+        cutoff = now - timedelta(minutes=settings.PAYGATE_RECONCILE_STALE_MINUTES)
+        with Session(engine) as session:
+            self._prune_backoff(session)
+            not_due = [tx_id for tx_id, (_, next_at) in self._backoff.items() if next_at > now]
+            statement = (
+                select(Transaction.id, Transaction.order_id, Transaction.reference)
+                .where(Transaction.status == TransactionStatus.PENDING)
+                .where(Transaction.reference != None)
+                .where(Transaction.created_at <= cutoff)
+            )
+            if not_due:
+                statement = statement.where(Transaction.id.not_in(not_due))
+            statement = statement.order_by(Transaction.created_at).limit(settings.PAYGATE_RECONCILE_BATCH_SIZE)
+            return [tuple(row) for row in session.exec(statement).all()]
+
+    def _apply_results(
+        self,
+        succeeded: List[Tuple[int, int]],
+        failed: List[int],
+        now: datetime,
+    ) -> None:
+        """Writes all settled transactions (and paid orders) in a single DB transaction."""
+        if not succeeded and not failed:
+            return
+        with Session(engine) as session:
+            if succeeded:
+                # Only orders whose transaction this pass settled: a webhook or another worker
+                # may have changed it since it was selected
+                paid_orders = set(session.execute(
+                    update(Transaction)
+                    .where(Transaction.id.in_([tx_id for tx_id, _ in succeeded]))
+                    .where(Transaction.status == TransactionStatus.PENDING)
+                    .values(
+                        status=TransactionStatus.SUCCESS,
+                        notes=f"Confirmé via réconciliation à {now.isoformat()}",
+                    )
+                    .returning(Transaction.order_id)
+                ).scalars())
+                if paid_orders:
+                    session.execute(
+                        update(Order)
+                        .where(Order.id.in_(paid_orders))
+                        .values(paid=True, updated_at=now)
+                    )
+                    sync_changes.record_bulk_write(session, Order, paid_orders)
+            if failed:
+                session.execute(
+                    update(Transaction)
+                    .where(Transaction.id.in_(failed))
+                    .where(Transaction.status == TransactionStatus.PENDING)
+                    .values(
+                        status=TransactionStatus.FAILED,
+                        notes=f"Expiré/annulé selon PayGate (réconciliation à {now.isoformat()})",
+                    )
+                )
+            session.commit()
+
+    def _schedule_retry(self, tx_id: int, now: datetime) -> None:
+        attempts = self._backoff.get(tx_id, (0, now))[0] + 1
+        delay = min(
+            settings.PAYGATE_RECONCILE_INTERVAL_SECONDS * 2 ** (attempts - 1),
+            settings.PAYGATE_RECONCILE_MAX_BACKOFF_SECONDS,
+        )
+        self._backoff[tx_id] = (attempts, now + timedelta(seconds=delay))
+
+    async def reconcile_once(self) -> Dict[str, Any]:
+        """
+        Runs one reconciliation pass and returns a summary.
+        Status checks run concurrently over the shared HTTP gateway, bounded by a semaphore.
+        """
+        now = datetime.utcnow()
+        candidates = await asyncio.to_thread(self._select_stale, now)
+        summary = {"checked": len(candidates), "succeeded": 0, "failed": 0, "still_pending": 0}
+        if not candidates:
+            return summary
+
+        semaphore = asyncio.Semaphore(settings.PAYGATE_RECONCILE_CONCURRENCY)
+
+        async def check(reference: str) -> Dict[str, Any]:
+            async with semaphore:
+                return await payment_service.check_payment_status(reference)
+
+        results = await asyncio.gather(*(check(ref) for _, _, ref in candidates))
+
+        succeeded: List[Tuple[int, int]] = []
+        failed: List[int] = []
+        for (tx_id, order_id, _), result in zip(candidates, results):
+            code = result.get("status")
+            if code not in SETTLED_STATUSES:
+                self._schedule_retry(tx_id, now)
+                continue
+            self._backoff.pop(tx_id, None)
+            if payment_service.map_paygate_status(code) == TransactionStatus.SUCCESS:
+                succeeded.append((tx_id, order_id))
+            else:
+                failed.append(tx_id)
+
+        await asyncio.to_thread(self._apply_results, succeeded, failed, now)
+        summary.update(
+            succeeded=len(succeeded),
+            failed=len(failed),
+            still_pending=len(candidates) - len(succeeded) - len(failed),
+        )
+        if succeeded or failed:
+            logger.info("PayGate reconciliation: %s", summary)
+        return summary
+
+    async def _run_forever(self) -> None:
+        while True:
+            try:
+                await self.reconcile_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"PayGate reconciliation pass failed: {e}", exc_info=True)
+            await asyncio.sleep(settings.PAYGATE_RECONCILE_INTERVAL_SECONDS)
+
+    def start(self) -> None:
+        if not settings.PAYGATE_RECONCILE_ENABLED or not settings.PAYGATE_API_KEY:
+            logger.info("PayGate reconciliation worker disabled")
+            return
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run_forever())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+
+payment_reconciliation = PaymentReconciliationService()
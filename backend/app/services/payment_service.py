@@ -1,7 +1,7 @@
-import httpx
 import logging
 from typing import Optional, Dict, Any
 from core.config import settings
+from core.http_gateway import http_gateway
 from models.transaction import TransactionStatus
 
 logger = logging.getLogger(__name__)
@@ -34,12 +34,12 @@ class PaymentService:
         }
 
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(settings.PAYGATE_PAY_URL, json=payload, timeout=30.0)
-                response.raise_for_status()
-                data = response.json()
-                logger.info(f"PayGate Initiation Response for {order_number}: {data}")
-                return data
+            # Not retried: a replayed initiation could register the payment twice
+            response = await http_gateway.post(settings.PAYGATE_PAY_URL, json=payload, retry=False)
+            response.raise_for_status()
+            data = response.json()
+            logger.info(f"PayGate Initiation Response for {order_number}: {data}")
+            return data
         except Exception as e:
             logger.error(f"Error initiating PayGate payment for {order_number}: {str(e)}")
             return {"status": -1, "error": str(e)}
@@ -55,12 +55,11 @@ class PaymentService:
         }
 
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(settings.PAYGATE_STATUS_URL, json=payload, timeout=30.0)
-                response.raise_for_status()
-                data = response.json()
-                logger.info(f"PayGate Status Check for {tx_reference}: {data}")
-                return data
+            response = await http_gateway.post(settings.PAYGATE_STATUS_URL, json=payload, retry=True)
+            response.raise_for_status()
+            data = response.json()
+            logger.info(f"PayGate Status Check for {tx_reference}: {data}")
+            return data
         except Exception as e:
             logger.error(f"Error checking PayGate status for {tx_reference}: {str(e)}")
             return {"status": -1, "error": str(e)}
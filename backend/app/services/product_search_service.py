@@ -0,0 +1,286 @@
+import logging
+import re
+import sys
+from collections import defaultdict
+from typing import Dict, List, Optional
+from sqlalchemy import and_, bindparam, case, column, func, literal, literal_column, table, text
+from sqlalchemy.engine import Engine
+from sqlmodel import Session, select
+from sqlmodel.sql.expression import SelectOfScalar
+from core.config import settings
+from core.db import engine
+from models.product import (
+    CategoryFacet, PriceRangeFacet, Product, ProductFacets, StockFacet,
+)
+
+logger = logging.getLogger(__name__)
+
+# Postgres: French stemming + accent folding. The configuration is a constant
+# regconfig so to_tsvector() is immutable and can back an expression index.
+PG_CONFIG = "fr_unaccent"
+PG_FALLBACK_CONFIG = "french"
+# Name matches weigh more than description matches (A > B)
+PG_VECTOR_SQL = (
+    "setweight(to_tsvector('{cfg}'::regconfig, coalesce(product.name, '')), 'A') || "
+    "setweight(to_tsvector('{cfg}'::regconfig, coalesce(product.description, '')), 'B')"
+)
+
+# SQLite: external-content FTS5 table kept in sync with `product` by triggers
+product_fts = table("product_fts", column("rowid"), column("rank"))
+SQLITE_FTS_DDL = [
+    "CREATE VIRTUAL TABLE product_fts USING fts5("
+    "name, description, content='product', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER product_fts_ai AFTER INSERT ON product BEGIN "
+    "INSERT INTO product_fts(rowid, name, description) VALUES (new.id, new.name, new.description); END",
+    "CREATE TRIGGER product_fts_ad AFTER DELETE ON product BEGIN "
+    "INSERT INTO product_fts(product_fts, rowid, name, description) "
+    "VALUES ('delete', old.id, old.name, old.description); END",
+    "CREATE TRIGGER product_fts_au AFTER UPDATE OF name, description ON product BEGIN "
+    "INSERT INTO product_fts(product_fts, rowid, name, description) "
+    "VALUES ('delete', old.id, old.name, old.description); "
+    "INSERT INTO product_fts(rowid, name, description) VALUES (new.id, new.name, new.description); END",
+    "INSERT INTO product_fts(product_fts) VALUES ('rebuild')",
+    # bm25 weights per column: name, description
+    "INSERT INTO product_fts(product_fts, rank) VALUES ('rank', 'bm25(10.0, 1.0)')",
+]
+
+
+def search_terms(q: str) -> List[str]:
+    """Words of a search box query; punctuation and FTS operators are dropped."""
+    return re.findall(r"\w+", q.lower())
+
+
+class ProductSearchService:
+    """
+    Ranked full-text search over product name and description.
+    Postgres uses a GIN expression index on a weighted French tsvector,
+    SQLite an FTS5 table; other databases fall back to ILIKE scans.
+    """
+
+    def __init__(self, db_engine: Engine):
+        self.engine = db_engine
+        self.mode: Optional[str] = None  # "postgres" | "sqlite" | None (ILIKE)
+        self._pg_config = PG_CONFIG
+
+    def ensure_index(self) -> None:
+        """Creates the search index if needed. Called once at startup, after create_all."""
+        dialect = self.engine.dialect.name
+        try:
+            if dialect == "postgresql":
+                self._ensure_postgres()
+                self.mode = "postgres"
+            elif dialect == "sqlite":
+                self._ensure_sqlite()
+                self.mode = "sqlite"
+        except Exception as e:
+            logger.warning("Full-text product search unavailable, falling back to ILIKE: %s", e)
+            self.mode = None
+
+    def _ensure_postgres(self) -> None:
+        try:
+            with self.engine.begin() as conn:
+                conn.execute(text("CREATE EXTENSION IF NOT EXISTS unaccent"))
+                exists = conn.execute(
+                    text("SELECT 1 FROM pg_ts_config WHERE cfgname = :name"), {"name": PG_CONFIG}
+                ).first()
+                if not exists:
+                    conn.execute(text(f"CREATE TEXT SEARCH CONFIGURATION {PG_CONFIG} (COPY = french)"))
+                    conn.execute(text(
+                        f"ALTER TEXT SEARCH CONFIGURATION {PG_CONFIG} "
+                        "ALTER MAPPING FOR hword, hword_part, word WITH unaccent, french_stem"
+                    ))
+            self._pg_config = PG_CONFIG
+        except Exception as e:
+            logger.warning("unaccent not available, product search will be accent-sensitive: %s", e)
+            self._pg_config = PG_FALLBACK_CONFIG
+
+        vector = PG_VECTOR_SQL.format(cfg=self._pg_config).replace("product.", "")
+        with self.engine.begin() as conn:
+            conn.execute(text(
+                f"CREATE INDEX IF NOT EXISTS ix_product_search_{self._pg_config} "
+                f"ON product USING GIN (({vector}))"
+            ))
+
+    def _ensure_sqlite(self) -> None:
+        with self.engine.begin() as conn:
+            exists = conn.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'product_fts'")
+            ).first()
+            if exists:
+                return
+            for statement in SQLITE_FTS_DDL:
+                conn.execute(text(statement))
+
+    def apply(self, statement: SelectOfScalar, q: str, ranked: bool = True) -> SelectOfScalar:
+        """
+        Filters `statement` (a select on Product) to matches of q, best matches first
+        unless ranked is False (e.g. for aggregates).
+        """
+        terms = search_terms(q)
+        if not terms:
+            return statement
+
+        if self.mode == "postgres":
+            # Every word must match; the last one is a prefix since the user may still be typing
+            tsquery = " & ".join(terms) + ":*"
+            vector = literal_column(f"({PG_VECTOR_SQL.format(cfg=self._pg_config)})")
+            query = func.to_tsquery(
+                literal_column(f"'{self._pg_config}'::regconfig"), bindparam("search_query", tsquery)
+            )
+            statement = statement.where(vector.op("@@")(query))
+            return statement.order_by(func.ts_rank(vector, query).desc(), Product.id) if ranked else statement
+
+        if self.mode == "sqlite":
+            match = " ".join(f'"{term}"*' for term in terms)
+            statement = statement.join(product_fts, product_fts.c.rowid == Product.id).where(
+                literal_column("product_fts").op("MATCH")(bindparam("search_match", match))
+            )
+            return statement.order_by(product_fts.c.rank, Product.id) if ranked else statement
+
+        for term in terms:
+            statement = statement.where(Product.name.icontains(term) | Product.description.icontains(term))
+        return statement.order_by(Product.id) if ranked else statement
+
+    def facets(
+        self,
+        session: Session,
+        q: Optional[str] = None,
+        category_ids: Optional[List[int]] = None,
+        min_price: Optional[int] = None,
+        max_price: Optional[int] = None,
+        in_stock: bool = False,
+    ) -> ProductFacets:
+        """
+        Result counts per category, price band and stock state for a search, in one
+        grouped statement. Rows are grouped by (category, band, stock, price filter
+        match), so each facet can be counted without its own filter (disjunctive
+        faceting) from the same small result.
+        """
+        bounds = settings.PRODUCT_PRICE_FACET_BOUNDS
+        band = case(*((Product.price < bound, i) for i, bound in enumerate(bounds)), else_=len(bounds))
+        stocked = case((Product.stock_quantity > 0, 1), else_=0)
+        price_conditions = []
+        if min_price is not None:
+            price_conditions.append(Product.price >= min_price)
+        if max_price is not None:
+            price_conditions.append(Product.price <= max_price)
+        price_match = case((and_(*price_conditions), 1), else_=0) if price_conditions else literal(1)
+
+        statement = select(Product.category_id, band, stocked, price_match, func.count(Product.id)).where(
+            Product.is_active == True
+        )
+        if q:
+            statement = self.apply(statement, q, ranked=False)
+        statement = statement.group_by(Product.category_id, band, stocked, price_match)
+
+        total = 0
+        categories: Dict[Optional[int], int] = defaultdict(int)
+        bands: Dict[int, int] = defaultdict(int)
+        stock = StockFacet()
+        for cat, band_index, is_stocked, price_ok, count in session.exec(statement):
+            category_ok = category_ids is None or cat in category_ids
+            stock_ok = not in_stock or is_stocked
+            if price_ok and stock_ok:
+                categories[cat] += count
+            if category_ok and stock_ok:
+                bands[band_index] += count
+            if category_ok and price_ok:
+                if is_stocked:
+                    stock.in_stock += count
+                else:
+                    stock.out_of_stock += count
+            if category_ok and price_ok and stock_ok:
+                total += count
+
+        lower_bounds = [0] + bounds
+        upper_bounds = bounds + [None]
+        return ProductFacets(
+            total=total,
+            categories=[
+                CategoryFacet(category_id=cat, count=count)
+                for cat, count in sorted(categories.items(), key=lambda item: -item[1])
+            ],
+            price_ranges=[
+                PriceRangeFacet(min=lower_bounds[i], max=upper_bounds[i], count=bands.get(i, 0))
+                for i in range(len(lower_bounds))
+            ],
+            stock=stock,
+        )
+
+
+product_search = ProductSearchService(engine)
+
+
+def _bench(count: int, path: str) -> None:
+    """Synthetic catalogue of `count` products; FTS5 ranked search vs the ILIKE fallback."""
+    import itertools
+    import os
+    import random
+    import time
+    from sqlalchemy import create_engine, insert
+    from sqlmodel import SQLModel
+    import models.category  # noqa: F401  (Product.category_id foreign key)
+    import models.user  # noqa: F401  (Product.producer_id foreign key)
+
+    if os.path.exists(path):
+        os.remove(path)
+    bench_engine = create_engine(f"sqlite:///{path}")
+    SQLModel.metadata.create_all(bench_engine, tables=[Product.__table__])
+    rng = random.Random(42)
+    kinds = ["Attiéké", "Gari", "Tapioca", "Farine de manioc", "Cossettes", "Amidon", "Chikwangue", "Foufou",
+             "Feuilles de manioc", "Pâte de manioc"]
+    qualities = ["blanc", "jaune", "extra-fin", "grossier", "bio", "séché", "fermenté", "torréfié", "sucré"]
+    regions = ["Lomé", "Kara", "Sokodé", "Atakpamé", "Kpalimé", "Dapaong", "Tsévié", "Aného"]
+    # Description vocabulary with a long tail: word i is drawn with weight 1/(i+1)
+    vocabulary = ["manioc", "récolte", "qualité", "coopérative", "sac", "frais"] + [f"mot{i}" for i in range(20_000)]
+    cum_weights = list(itertools.accumulate(1 / (i + 1) for i in range(len(vocabulary))))
+    started = time.perf_counter()
+    with Session(bench_engine) as session:
+        for offset in range(0, count, 50_000):
+            rows = []
+            for i in range(offset, min(count, offset + 50_000)):
+                words = rng.choices(vocabulary, cum_weights=cum_weights, k=rng.randint(8, 24))
+                rows.append({
+                    "name": f"{rng.choice(kinds)} {rng.choice(qualities)} de {rng.choice(regions)} {i}",
+                    "description": " ".join(words), "price": rng.randint(200, 20_000), "unit": "kg",
+                    "stock_quantity": rng.randint(0, 500), "is_active": True,
+                })
+            session.execute(insert(Product), rows)
+        session.commit()
+    print(f"{count} products written in {time.perf_counter() - started:.1f}s ({path})")
+
+    fts = ProductSearchService(bench_engine)
+    started = time.perf_counter()
+    fts.ensure_index()
+    print(f"FTS5 index built in {time.perf_counter() - started:.1f}s (mode: {fts.mode})")
+    scan = ProductSearchService(bench_engine)  # mode None: the ILIKE fallback
+
+    queries = ["mot15000", "attieke fermente", "kpalime bio", "gari", "coop", "manioc"]
+    repeats = 20
+    # ILIKE neither folds accents nor ranks: its matches differ, and it stops at the first 50 by id
+    print(f"{'query':<18} {'fts5 hits':>10} {'ms':>8} {'ilike hits':>10} {'ms':>8}")
+    with Session(bench_engine) as session:
+        for q in queries:
+            line = f"{q:<18}"
+            for service in (fts, scan):
+                matches = session.exec(
+                    service.apply(select(func.count(Product.id)).where(Product.is_active == True), q, ranked=False)
+                ).one()
+                statement = service.apply(select(Product).where(Product.is_active == True), q).limit(50)
+                session.exec(statement).all()  # warm-up
+                started = time.perf_counter()
+                for _ in range(repeats):
+                    session.exec(statement).all()
+                line += f" {matches:>10} {(time.perf_counter() - started) / repeats * 1000:>8.2f}"
+            print(line)
+
+
+if __name__ == "__main__":
+    # python -m services.product_search_service bench [COUNT] [SQLITE_PATH]  (from backend/app)
+    logging.basicConfig(level=logging.INFO)
+    command = sys.argv[1] if len(sys.argv) > 1 else "bench"
+    if command == "bench":
+        _bench(int(sys.argv[2]) if len(sys.argv) > 2 else 100_000, sys.argv[3] if len(sys.argv) > 3 else "/tmp/product_search_bench.db")
+    else:
+        sys.exit(f"Unknown command: {command} (expected bench)")
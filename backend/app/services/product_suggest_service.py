@@ -0,0 +1,127 @@
+import bisect
+import logging
+import threading
+import time
+import unicodedata
+from typing import Dict, List, Optional, Tuple
+from sqlmodel import Session, select
+from core.config import settings
+from core.db import engine
+from models.category import Category
+from models.product import Product
+
+logger = logging.getLogger(__name__)
+
+# (normalized key, type, id), kept sorted so all keys with a given prefix are a contiguous slice
+Entry = Tuple[str, str, int]
+
+
+def normalize(text: str) -> str:
+    """Lower-case, accent-free form used for both indexing and lookups."""
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).lower().strip()
+
+
+def _keys(label: str) -> List[Tuple[int, str]]:
+    """(rank, key): rank 0 is the whole label, rank 1 each tail starting at a later word."""
+    words = normalize(label).split()
+    return [(0, " ".join(words))] + [(1, " ".join(words[i:])) for i in range(1, len(words))]
+
+
+class ProductSuggestService:
+    """
+    Typeahead over active product and category names, held in process memory:
+    one sorted array per match rank searched with bisect, updated incrementally on writes and
+    fully reloaded every SUGGEST_INDEX_TTL_SECONDS (writes made by other workers).
+    """
+
+    def __init__(self):
+        self._entries: Tuple[List[Entry], List[Entry]] = ([], [])
+        self._labels: Dict[Tuple[str, int], str] = {}
+        self._built_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def rebuild(self) -> None:
+        with Session(engine) as session:
+            products = session.exec(select(Product.id, Product.name).where(Product.is_active == True)).all()
+            categories = session.exec(select(Category.id, Category.name).where(Category.is_active == True)).all()
+        labels = {("product", id): name for id, name in products}
+        labels.update({("category", id): name for id, name in categories})
+        entries: Tuple[List[Entry], List[Entry]] = ([], [])
+        for (kind, id), name in labels.items():
+            for rank, key in _keys(name):
+                entries[rank].append((key, kind, id))
+        for ranked in entries:
+            ranked.sort()
+        with self._lock:
+            self._entries, self._labels = entries, labels
+            self._built_at = time.monotonic()
+        logger.info("Suggest index rebuilt: %d products, %d categories", len(products), len(categories))
+
+    def invalidate(self) -> None:
+        """Forces a reload on next lookup (after bulk writes)."""
+        self._built_at = None
+
+    def _ensure_fresh(self) -> None:
+        if self._built_at is None or time.monotonic() - self._built_at > settings.SUGGEST_INDEX_TTL_SECONDS:
+            self.rebuild()
+
+    def _remove_locked(self, kind: str, id: int) -> None:
+        label = self._labels.pop((kind, id), None)
+        if label is None:
+            return
+        for rank, key in _keys(label):
+            ranked, entry = self._entries[rank], (key, kind, id)
+            i = bisect.bisect_left(ranked, entry)
+            if i < len(ranked) and ranked[i] == entry:
+                del ranked[i]
+
+    def _upsert(self, kind: str, id: int, name: str, active: bool) -> None:
+        if self._built_at is None:
+            return  # not loaded yet: the first lookup reads the current state
+        with self._lock:
+            self._remove_locked(kind, id)
+            if active:
+                self._labels[(kind, id)] = name
+                for rank, key in _keys(name):
+                    bisect.insort(self._entries[rank], (key, kind, id))
+
+    def update_product(self, product: Product) -> None:
+        self._upsert("product", product.id, product.name, product.is_active)
+
+    def remove_product(self, product_id: int) -> None:
+        self._upsert("product", product_id, "", False)
+
+    def update_category(self, category: Category) -> None:
+        self._upsert("category", category.id, category.name, category.is_active)
+
+    def remove_category(self, category_id: int) -> None:
+        self._upsert("category", category_id, "", False)
+
+    def suggest(self, q: str, limit: int = 10) -> List[Dict[str, object]]:
+        """
+        Up to `limit` names matching the prefix q: names starting with it first,
+        then names with a later word starting with it, each in alphabetical order.
+        Cost is O(log n + limit).
+        """
+        prefix = " ".join(normalize(q).split())
+        if not prefix:
+            return []
+        self._ensure_fresh()
+        results: List[Dict[str, object]] = []
+        seen = set()
+        with self._lock:
+            for ranked in self._entries:
+                i = bisect.bisect_left(ranked, (prefix,))
+                while i < len(ranked) and len(results) < limit:
+                    key, kind, id = ranked[i]
+                    if not key.startswith(prefix):
+                        break
+                    if (kind, id) not in seen:
+                        seen.add((kind, id))
+                        results.append({"type": kind, "id": id, "label": self._labels[(kind, id)]})
+                    i += 1
+        return results
+
+
+product_suggest = ProductSuggestService()
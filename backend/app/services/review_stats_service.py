@@ -0,0 +1,111 @@
+import logging
+from typing import Dict, Optional, Tuple
+from sqlalchemy import delete, update
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, func, select
+from core.db import engine
+from models.review import ProductRatingStats, ProductReview
+
+logger = logging.getLogger(__name__)
+
+
+class ReviewStatsService:
+    """
+    Maintains ProductRatingStats (rating_sum, rating_count per product) so rating
+    reads are a primary-key lookup however many reviews a product has.
+    Writers call record/unrecord before committing their review change.
+    """
+
+    def _apply(self, session: Session, product_id: int, delta_sum: int, delta_count: int) -> None:
+        # Relative UPDATE: concurrent reviews of the same product cannot lose increments
+        increment = (
+            update(ProductRatingStats)
+            .where(ProductRatingStats.product_id == product_id)
+            .values(
+                rating_sum=ProductRatingStats.rating_sum + delta_sum,
+                rating_count=ProductRatingStats.rating_count + delta_count,
+            )
+        )
+        if session.execute(increment).rowcount:
+            return
+        try:
+            with session.begin_nested():
+                session.add(ProductRatingStats(product_id=product_id, rating_sum=delta_sum, rating_count=delta_count))
+        except IntegrityError:
+            # First review of this product written concurrently by another request
+            session.execute(increment)
+
+    def record(self, session: Session, review: ProductReview) -> None:
+        self._apply(session, review.product_id, review.rating, 1)
+
+    def unrecord(self, session: Session, review: ProductReview) -> None:
+        self._apply(session, review.product_id, -review.rating, -1)
+
+    def get(self, session: Session, product_id: int) -> Tuple[int, Optional[float]]:
+        """(review_count, average_rating) for one product."""
+        stats = session.get(ProductRatingStats, product_id)
+        if not stats:
+            return 0, None
+        return stats.rating_count, stats.average_rating
+
+    def forget(self, session: Session, product_id: int) -> None:
+        """Drops the stats row of a product being deleted."""
+        session.execute(delete(ProductRatingStats).where(ProductRatingStats.product_id == product_id))
+
+    def rebuild(self, session: Session, product_id: Optional[int] = None) -> int:
+        """
+        Recomputes aggregates from ProductReview (all products, or one) and fixes
+        rows that drifted. Returns the number of products corrected; commits.
+        """
+        actual = select(ProductReview.product_id, func.sum(ProductReview.rating), func.count(ProductReview.id))
+        stored = select(ProductRatingStats)
+        if product_id is not None:
+            actual = actual.where(ProductReview.product_id == product_id)
+            stored = stored.where(ProductRatingStats.product_id == product_id)
+        expected: Dict[int, Tuple[int, int]] = {
+            pid: (int(total), count) for pid, total, count in session.exec(actual.group_by(ProductReview.product_id))
+        }
+
+        corrected = 0
+        for stats in session.exec(stored).all():
+            rating_sum, rating_count = expected.pop(stats.product_id, (0, 0))
+            if rating_count == 0:
+                session.delete(stats)
+                if stats.rating_count == 0:
+                    continue  # last review deleted: empty row, not drift
+            elif (stats.rating_sum, stats.rating_count) != (rating_sum, rating_count):
+                stats.rating_sum, stats.rating_count = rating_sum, rating_count
+                session.add(stats)
+            else:
+                continue
+            corrected += 1
+        for pid, (rating_sum, rating_count) in expected.items():
+            session.add(ProductRatingStats(product_id=pid, rating_sum=rating_sum, rating_count=rating_count))
+            corrected += 1
+        session.commit()
+        if corrected:
+            logger.warning("Rating stats rebuilt: %d product(s) corrected", corrected)
+        return corrected
+
+    def backfill(self) -> None:
+        """At startup: fills the stats table the first time, when reviews predate it."""
+        with Session(engine) as session:
+            if session.exec(select(ProductRatingStats.product_id).limit(1)).first() is not None:
+                return
+            if session.exec(select(ProductReview.id).limit(1)).first() is None:
+                return
+            try:
+                self.rebuild(session)
+            except IntegrityError:
+                # Another worker backfilled at the same time
+                session.rollback()
+
+
+review_stats = ReviewStatsService()
+
+
+if __name__ == "__main__":
+    # Rebuild command: `python -m services.review_stats_service` from backend/app
+    logging.basicConfig(level=logging.INFO)
+    with Session(engine) as session:
+        print(f"{review_stats.rebuild(session)} product(s) corrected")
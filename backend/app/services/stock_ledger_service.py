@@ -0,0 +1,311 @@
+import asyncio
+import logging
+import sys
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import bindparam, delete, func, insert, update
+from sqlmodel import Session, select
+from core.config import settings
+from core.db import engine
+from models.product import Product
+from models.stock import (
+    StockBalance, StockCompactionReport, StockHistory, StockMovement, StockMovementKind,
+    StockMovementRead, StockSnapshot,
+)
+from services.low_stock_service import low_stock
+
+logger = logging.getLogger(__name__)
+
+
+class StockHistoryUnavailable(Exception):
+    """The requested point in time is before the oldest retained movement (compacted)."""
+
+
+class StockLedgerService:
+    """
+    Append-only ledger of stock movements (orders, cancellations, harvest intake,
+    manual adjustments, imports) with periodic snapshot balances.
+
+    Every stock write goes through record(), in the writer's transaction:
+    Product.stock_quantity stays the materialized balance for O(1) hot reads, while
+    the ledger balance is the latest snapshot plus the movements after it. History is
+    a range scan of the (product_id, ts) index. compact() folds old movements into a
+    base snapshot and deletes them.
+
+    Movement ids are allocated before commit, so a movement can become visible after
+    one with a higher id: snapshots and compaction only cover movements older than
+    STOCK_SETTLE_SECONDS, whose transactions are assumed committed.
+    """
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+
+    def record(self, session: Session, movements: List[dict], apply: bool = True) -> None:
+        """
+        Appends movements (dicts with product_id, delta, kind and optionally reference,
+        user_id) with one executemany INSERT. With `apply`, also adds the net delta to
+        each product's stock_quantity in one executemany UPDATE; pass apply=False when
+        the caller already wrote the new quantity. Low-stock alerts of the products
+        touched are evaluated in the same transaction. Does not commit.
+        """
+        now = datetime.utcnow()
+        rows = [
+            {"ts": now, "reference": None, "user_id": None, **movement}
+            for movement in movements if movement["delta"]
+        ]
+        if not rows:
+            return
+        session.execute(insert(StockMovement), rows)
+        net: Dict[int, int] = defaultdict(int)
+        for row in rows:
+            net[row["product_id"]] += row["delta"]
+        increments = [{"product_id": p, "delta": d} for p, d in net.items() if d]
+        if apply and increments:
+            products = Product.__table__
+            session.connection().execute(
+                update(products)
+                .where(products.c.id == bindparam("product_id"))
+                .values(stock_quantity=products.c.stock_quantity + bindparam("delta")),
+                increments,
+            )
+        low_stock.check(session, net)
+
+    def move(
+        self,
+        session: Session,
+        product_id: int,
+        delta: int,
+        kind: StockMovementKind,
+        reference: Optional[str] = None,
+        user_id: Optional[int] = None,
+        apply: bool = True,
+    ) -> None:
+        self.record(session, [{
+            "product_id": product_id, "delta": delta, "kind": kind,
+            "reference": reference, "user_id": user_id,
+        }], apply=apply)
+
+    def _snapshot_before(self, session: Session, product_id: int, at: Optional[datetime]) -> Optional[StockSnapshot]:
+        statement = select(StockSnapshot).where(StockSnapshot.product_id == product_id)
+        if at is not None:
+            statement = statement.where(StockSnapshot.ts <= at)
+        return session.exec(statement.order_by(StockSnapshot.ts.desc(), StockSnapshot.movement_id.desc()).limit(1)).first()
+
+    def _check_retained(self, session: Session, product_id: int, at: datetime) -> None:
+        oldest = session.exec(
+            select(func.max(StockSnapshot.ts)).where(StockSnapshot.product_id == product_id, StockSnapshot.base == True)
+        ).one()
+        if oldest is not None and at < oldest:
+            raise StockHistoryUnavailable(oldest)
+
+    def balance(self, session: Session, product_id: int, at: Optional[datetime] = None) -> Tuple[int, Optional[StockSnapshot], int]:
+        """(balance, snapshot used, movements applied after it) at `at` (now when None)."""
+        if at is not None:
+            self._check_retained(session, product_id, at)
+        snapshot = self._snapshot_before(session, product_id, at)
+        statement = select(func.coalesce(func.sum(StockMovement.delta), 0), func.count(StockMovement.id)).where(
+            StockMovement.product_id == product_id,
+            StockMovement.id > (snapshot.movement_id if snapshot else 0),
+        )
+        if at is not None:
+            statement = statement.where(StockMovement.ts <= at)
+        delta, count = session.exec(statement).one()
+        return (snapshot.balance if snapshot else 0) + delta, snapshot, count
+
+    def _balance_through(self, session: Session, product_id: int, movement_id: int) -> int:
+        """Balance once every movement of the product up to `movement_id` is applied."""
+        snapshot = session.exec(
+            select(StockSnapshot)
+            .where(StockSnapshot.product_id == product_id, StockSnapshot.movement_id <= movement_id)
+            .order_by(StockSnapshot.movement_id.desc())
+            .limit(1)
+        ).first()
+        delta = session.exec(
+            select(func.coalesce(func.sum(StockMovement.delta), 0)).where(
+                StockMovement.product_id == product_id,
+                StockMovement.id > (snapshot.movement_id if snapshot else 0),
+                StockMovement.id <= movement_id,
+            )
+        ).one()
+        return (snapshot.balance if snapshot else 0) + delta
+
+    def read_balance(self, session: Session, product: Product) -> StockBalance:
+        balance, snapshot, count = self.balance(session, product.id)
+        return StockBalance(
+            product_id=product.id,
+            balance=balance,
+            stock_quantity=product.stock_quantity,
+            snapshot_at=snapshot.ts if snapshot else None,
+            movements_since_snapshot=count,
+        )
+
+    def history(
+        self,
+        session: Session,
+        product_id: int,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        skip: int = 0,
+        limit: int = 100,
+    ) -> StockHistory:
+        """Movements of a product in [start, end), oldest first, with the balance before them."""
+        statement = select(StockMovement).where(StockMovement.product_id == product_id)
+        if start is not None:
+            statement = statement.where(StockMovement.ts >= start)
+        if end is not None:
+            statement = statement.where(StockMovement.ts < end)
+        movements = session.exec(
+            statement.order_by(StockMovement.ts, StockMovement.id).offset(skip).limit(limit)
+        ).all()
+        if start is not None:
+            self._check_retained(session, product_id, start)
+        if movements:
+            opening = self._balance_through(session, product_id, movements[0].id - 1)
+        else:
+            opening, _, _ = self.balance(session, product_id, start)
+        return StockHistory(
+            product_id=product_id,
+            opening_balance=opening,
+            movements=[StockMovementRead.from_orm(movement) for movement in movements],
+        )
+
+    def backfill(self) -> int:
+        """Opening base snapshots for products that predate the ledger (no snapshot, no movement)."""
+        with Session(engine) as session:
+            known = select(StockSnapshot.product_id).union(select(StockMovement.product_id))
+            products = session.exec(
+                select(Product.id, Product.stock_quantity).where(Product.id.not_in(known))
+            ).all()
+            if not products:
+                return 0
+            now = datetime.utcnow()
+            session.execute(insert(StockSnapshot), [
+                {"product_id": p, "movement_id": 0, "ts": now, "balance": q, "base": True}
+                for p, q in products
+            ])
+            session.commit()
+        logger.info("Stock ledger: opening balance recorded for %d product(s)", len(products))
+        return len(products)
+
+    def _settled(self) -> datetime:
+        return datetime.utcnow() - timedelta(seconds=settings.STOCK_SETTLE_SECONDS)
+
+    def snapshot(self) -> int:
+        """Snapshots the balance of every product that moved since its last snapshot (settled movements only)."""
+        with Session(engine) as session:
+            watermark = session.exec(select(func.max(StockMovement.id)).where(StockMovement.ts <= self._settled())).one()
+            if watermark is None:
+                return 0
+            latest_id = (
+                select(StockSnapshot.product_id, func.max(StockSnapshot.movement_id).label("movement_id"))
+                .group_by(StockSnapshot.product_id)
+                .subquery()
+            )
+            latest = (
+                select(StockSnapshot.product_id, StockSnapshot.movement_id, StockSnapshot.balance)
+                .join(latest_id, (latest_id.c.product_id == StockSnapshot.product_id)
+                      & (latest_id.c.movement_id == StockSnapshot.movement_id))
+                .subquery()
+            )
+            rows = session.exec(
+                select(
+                    StockMovement.product_id,
+                    func.max(StockMovement.id),
+                    func.max(StockMovement.ts),
+                    func.coalesce(func.max(latest.c.balance), 0) + func.sum(StockMovement.delta),
+                )
+                .outerjoin(latest, latest.c.product_id == StockMovement.product_id)
+                .where(StockMovement.id > func.coalesce(latest.c.movement_id, 0), StockMovement.id <= watermark)
+                .group_by(StockMovement.product_id)
+            ).all()
+            if rows:
+                session.execute(insert(StockSnapshot), [
+                    {"product_id": p, "movement_id": m, "ts": ts, "balance": balance, "base": False}
+                    for p, m, ts, balance in rows
+                ])
+                session.commit()
+        return len(rows)
+
+    def compact(self, before: Optional[datetime] = None) -> StockCompactionReport:
+        """
+        Folds movements older than `before` (default: STOCK_LEDGER_RETENTION_DAYS ago)
+        into a base snapshot per product, then deletes them and the snapshots they make
+        redundant. Balances are unchanged; history before the boundary is no longer available.
+        """
+        before = min(
+            before or datetime.utcnow() - timedelta(days=settings.STOCK_LEDGER_RETENTION_DAYS), self._settled()
+        )
+        report = StockCompactionReport()
+        with Session(engine) as session:
+            # The newest movement is kept: SQLite tables created without AUTOINCREMENT
+            # would otherwise hand its id out again
+            newest = session.exec(select(func.max(StockMovement.id))).one()
+            boundaries = session.exec(
+                select(StockMovement.product_id, func.max(StockMovement.id))
+                .where(StockMovement.ts < before, StockMovement.id < newest)
+                .group_by(StockMovement.product_id)
+            ).all()
+            for product_id, boundary_id in boundaries:
+                boundary = session.get(StockMovement, boundary_id)
+                balance = self._balance_through(session, product_id, boundary_id)
+                report.snapshots_deleted += session.execute(
+                    delete(StockSnapshot).where(
+                        StockSnapshot.product_id == product_id, StockSnapshot.movement_id <= boundary_id
+                    )
+                ).rowcount
+                report.movements_deleted += session.execute(
+                    delete(StockMovement).where(StockMovement.product_id == product_id, StockMovement.id <= boundary_id)
+                ).rowcount
+                session.add(StockSnapshot(
+                    product_id=product_id, movement_id=boundary_id, ts=boundary.ts, balance=balance, base=True,
+                ))
+                report.products += 1
+            session.commit()
+        if report.products:
+            logger.info(
+                "Stock ledger compacted: %d movement(s) of %d product(s) folded into snapshots",
+                report.movements_deleted, report.products,
+            )
+        return report
+
+    async def _run_forever(self) -> None:
+        while True:
+            try:
+                await asyncio.to_thread(self.snapshot)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Stock snapshot failed: {e}", exc_info=True)
+            await asyncio.sleep(settings.STOCK_SNAPSHOT_INTERVAL_SECONDS)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run_forever())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+
+stock_ledger = StockLedgerService()
+
+
+if __name__ == "__main__":
+    # python -m services.stock_ledger_service compact [YYYY-MM-DD] | snapshot
+    logging.basicConfig(level=logging.INFO)
+    command = sys.argv[1] if len(sys.argv) > 1 else "compact"
+    if command == "snapshot":
+        print(f"{stock_ledger.snapshot()} snapshot(s) taken")
+    elif command == "compact":
+        cutoff = datetime.fromisoformat(sys.argv[2]) if len(sys.argv) > 2 else None
+        stock_ledger.snapshot()
+        print(stock_ledger.compact(cutoff).json())
+    else:
+        sys.exit(f"Unknown command: {command} (expected compact or snapshot)")
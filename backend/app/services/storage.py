@@ -0,0 +1,26 @@
+import logging
+from core.config import settings
+from services.local_storage_service import local_storage
+from services.storage_backend import StorageBackend
+from services.supabase_storage_service import supabase_storage
+
+logger = logging.getLogger(__name__)
+
+
+def _select_backend() -> StorageBackend:
+    """
+    STORAGE_BACKEND=supabase|local forces a backend; "auto" (default) uses Supabase
+    when it is configured and falls back to local disk otherwise.
+    """
+    choice = settings.STORAGE_BACKEND.lower()
+    if choice == "local":
+        return local_storage
+    if choice == "supabase":
+        return supabase_storage
+    if supabase_storage.available:
+        return supabase_storage
+    logger.warning("Supabase storage not configured — product images are stored locally in %s", local_storage.root)
+    return local_storage
+
+
+storage: StorageBackend = _select_backend()
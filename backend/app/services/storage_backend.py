@@ -0,0 +1,116 @@
+import asyncio
+import hashlib
+import logging
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional
+from services.image_processing_service import ImageSource, Variants, detect_source_type
+
+logger = logging.getLogger(__name__)
+
+
+class StorageBackend(ABC):
+    """
+    Where product images live. Objects are content-addressed (keyed by SHA-256)
+    under `products/`; implementations only provide the raw put/remove primitives.
+    """
+
+    name: str = "storage"
+
+    @property
+    @abstractmethod
+    def available(self) -> bool:
+        """Whether the backend is configured and can accept uploads."""
+
+    @abstractmethod
+    async def _put(self, path: str, file_content: ImageSource, content_type: str) -> str:
+        """Stores one object (bytes or local file path) and returns its public URL."""
+
+    @abstractmethod
+    async def _remove(self, paths: List[str]) -> None:
+        """Removes objects by path."""
+
+    @abstractmethod
+    def path_from_url(self, image_url: str) -> Optional[str]:
+        """Object path for a public URL served by this backend, else None."""
+
+    def owns(self, image_url: Optional[str]) -> bool:
+        return bool(image_url) and self.path_from_url(image_url) is not None
+
+    async def upload_image(self, file_content: ImageSource, content_hash: Optional[str] = None) -> Optional[str]:
+        """
+        Uploads an image and returns the public URL.
+        The object is keyed by the SHA-256 of its content; its extension and content type
+        come from the content itself, never from a client-supplied filename or header.
+        :param file_content: Bytes, or path of a local file to stream
+        :param content_hash: Precomputed SHA-256 (required when file_content is a path)
+        :raises ValueError: if the content is not a supported image
+        """
+        if not self.available:
+            logger.error("%s backend not initialized", self.name)
+            return None
+
+        image_type = await asyncio.to_thread(detect_source_type, file_content)
+        if image_type is None:
+            raise ValueError("Format d'image non supporté (JPEG, PNG, GIF, WebP)")
+        ext, content_type = image_type
+        path = f"products/{content_hash or hashlib.sha256(file_content).hexdigest()}.{ext}"
+
+        try:
+            return await self._put(path, file_content, content_type)
+        except Exception as e:
+            logger.error(f"Error uploading to {self.name}: {e}")
+            return None
+
+    async def upload_variants(self, variants: Variants, content_hash: str) -> Optional[Dict[str, Dict[str, str]]]:
+        """
+        Uploads all resized variants of one image under a common prefix, concurrently.
+        :param content_hash: SHA-256 of the original image, used as the prefix
+        Returns {"thumb": {"webp": url, "jpeg": url}, "card": {...}, "full": {...}}.
+        """
+        if not self.available:
+            logger.error("%s backend not initialized", self.name)
+            return None
+
+        prefix = f"products/{content_hash}"
+        jobs = [
+            (name, fmt, f"{prefix}/{name}.{ext}", data, content_type)
+            for name, formats in variants.items()
+            for fmt, (data, content_type, ext) in formats.items()
+        ]
+        try:
+            urls = await asyncio.gather(*(self._put(path, data, ct) for _, _, path, data, ct in jobs))
+        except Exception as e:
+            logger.error(f"Error uploading image variants to {self.name}: {e}")
+            return None
+
+        result: Dict[str, Dict[str, str]] = {}
+        for (name, fmt, _, _, _), url in zip(jobs, urls):
+            result.setdefault(name, {})[fmt] = url
+        return result
+
+    async def delete_image(self, image_url: str):
+        """
+        Deletes an image given its public URL.
+        Meant to be scheduled as a background task, after the response is sent.
+        Callers must only pass URLs no product references any more
+        (see ImageLibraryService.release).
+        """
+        await self.delete_images([image_url])
+
+    async def delete_images(self, image_urls: List[str]):
+        """
+        Deletes several images (e.g. all variants of a product photo) in one storage call.
+        URLs not served by this backend are ignored.
+        """
+        if not self.available:
+            return
+        paths = [p for p in (self.path_from_url(url) for url in image_urls if url) if p]
+        if not paths:
+            return
+        try:
+            await self._remove(paths)
+        except Exception as e:
+            logger.error(f"Error deleting from {self.name}: {e}")
+
+    def shutdown(self):
+        pass
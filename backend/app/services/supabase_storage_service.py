@@ -1,69 +1,69 @@
+import asyncio
 import logging
-import uuid
 import os
-from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, List, Optional
 from supabase import create_client, Client
 from core.config import settings
+from services.image_processing_service import ImageSource
+from services.storage_backend import StorageBackend
 
 logger = logging.getLogger(__name__)
 
-class SupabaseStorageService:
+class SupabaseStorageService(StorageBackend):
+    name = "Supabase"
+
     def __init__(self):
         self.url = settings.SUPABASE_URL
         self.key = settings.SUPABASE_SERVICE_KEY  # Use service key for server-side uploads
         self.bucket_name = settings.SUPABASE_BUCKET
         self.client: Optional[Client] = None
-        
+        # storage3 is synchronous: run its calls on a dedicated pool so uploads
+        # never block the event loop nor starve FastAPI's default threadpool
+        self._executor = ThreadPoolExecutor(
+            max_workers=settings.STORAGE_MAX_WORKERS, thread_name_prefix="supabase-storage"
+        )
+
         if self.url and self.key:
             try:
                 self.client = create_client(self.url, self.key)
             except Exception as e:
                 logger.error(f"Failed to initialize Supabase client: {e}")
 
-    async def upload_image(self, file_content: bytes, filename: str, content_type: str = "image/jpeg") -> Optional[str]:
-        """
-        Uploads an image to Supabase Storage and returns the public URL.
-        """
-        if not self.client:
-            logger.error("Supabase client not initialized")
-            return None
+    @property
+    def available(self) -> bool:
+        return self.client is not None
 
-        # Generate a unique path for the image
-        ext = filename.split(".")[-1] if "." in filename else "jpg"
-        unique_filename = f"{uuid.uuid4().hex}.{ext}"
-        path = f"products/{unique_filename}"
+    async def _run(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(func, *args, **kwargs))
 
-        try:
-            # Upload the file
-            # Storage3 (used by supabase-py) upload is synchronous in current versions, 
-            # but we can wrap it if needed or just use it.
-            res = self.client.storage.from_(self.bucket_name).upload(
-                path=path,
-                file=file_content,
-                file_options={"content-type": content_type}
-            )
-            
-            # Get the public URL
-            public_url = self.client.storage.from_(self.bucket_name).get_public_url(path)
-            return public_url
-        except Exception as e:
-            logger.error(f"Error uploading to Supabase: {e}")
-            return None
+    async def _put(self, path: str, file_content: ImageSource, content_type: str) -> str:
+        bucket = self.client.storage.from_(self.bucket_name)
 
-    def delete_image(self, image_url: str):
-        """
-        Deletes an image from Supabase Storage given its public URL.
-        """
-        if not self.client or not image_url:
-            return
+        def upload():
+            # Paths are content-addressed: re-uploading the same bytes is a no-op overwrite
+            options = {"content-type": content_type, "upsert": "true"}
+            if isinstance(file_content, bytes):
+                return bucket.upload(path=path, file=file_content, file_options=options)
+            # Local file: streamed from disk by the HTTP client
+            with open(file_content, "rb") as f:
+                return bucket.upload(path=path, file=f, file_options=options)
+
+        await self._run(upload)
+        return await self._run(bucket.get_public_url, path)
+
+    async def _remove(self, paths: List[str]) -> None:
+        await self._run(self.client.storage.from_(self.bucket_name).remove, paths)
+
+    def path_from_url(self, image_url: str) -> Optional[str]:
+        # Example: https://.../storage/v1/object/public/produits-images/products/uuid.jpg
+        if "supabase.co" not in image_url or f"{self.bucket_name}/" not in image_url:
+            return None
+        return image_url.split(f"{self.bucket_name}/")[-1].split("?")[0]
 
-        try:
-            # Extract path from URL
-            # Example: https://.../storage/v1/object/public/produits-images/products/uuid.jpg
-            if self.bucket_name in image_url:
-                path = image_url.split(f"{self.bucket_name}/")[-1]
-                self.client.storage.from_(self.bucket_name).remove([path])
-        except Exception as e:
-            logger.error(f"Error deleting from Supabase: {e}")
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
 
 supabase_storage = SupabaseStorageService()
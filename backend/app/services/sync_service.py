@@ -0,0 +1,284 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from itertools import chain
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import bindparam, delete, event, insert, inspect, literal, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session as OrmSession, selectinload
+from sqlmodel import Session, func, select
+from core.config import settings
+from core.db import engine
+from models.crop import Crop, CropRead
+from models.field import Field as FarmField, FieldRead
+from models.field_data import FieldData, FieldDataRead
+from models.harvest import Harvest, HarvestRead
+from models.order import Order, OrderRead
+from models.sync_change import SyncChange, SyncChangesRead, SyncEntityChanges, SyncSequence
+from models.user import User
+
+logger = logging.getLogger(__name__)
+
+# entity name -> (table model, owner column, read schema). Crops are owned through their field.
+ENTITIES: Dict[str, Tuple[type, Optional[str], type]] = {
+    "field_data": (FieldData, "agent_id", FieldDataRead),
+    "harvest": (Harvest, "agent_id", HarvestRead),
+    "field": (FarmField, "owner_id", FieldRead),
+    "crop": (Crop, None, CropRead),
+    "order": (Order, "livreur_id", OrderRead),
+}
+_ENTITY_BY_MODEL = {model: name for name, (model, _, _) in ENTITIES.items()}
+
+
+def _attribute_values(obj: Any, attr: str) -> Set[Any]:
+    """Current and previous (pre-flush) values of an attribute."""
+    history = inspect(obj).attrs[attr].history
+    return {v for v in chain(history.added or (), history.deleted or (), history.unchanged or ()) if v is not None}
+
+
+class SyncService:
+    """
+    Delta sync for offline clients (agents, livreurs). Every flush touching a
+    replicated table appends SyncChange rows — one per user whose replica holds
+    the row, before and after the write, so reassignments reach both sides.
+    The rows are numbered (seq) when the transaction commits, in commit order, and
+    /sync/changes returns only what was numbered after the client's watermark.
+    """
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+
+    # ── Change capture ──────────────────────────────────────────────────────
+    def _before_flush(self, session: OrmSession, flush_context, instances) -> None:
+        now = datetime.utcnow()
+        for obj in session.dirty:
+            if (
+                type(obj) in _ENTITY_BY_MODEL
+                and hasattr(obj, "updated_at")
+                and session.is_modified(obj, include_collections=False)
+            ):
+                obj.updated_at = now
+
+    def _after_flush(self, session: OrmSession, flush_context) -> None:
+        now = datetime.utcnow()
+        changed: List[Tuple[str, int, bool, Set[Any]]] = []
+        crop_field_ids: Set[int] = set()
+        for obj, deleted in chain(
+            ((o, False) for o in session.new),
+            ((o, False) for o in session.dirty if session.is_modified(o, include_collections=False)),
+            ((o, True) for o in session.deleted),
+        ):
+            entity = _ENTITY_BY_MODEL.get(type(obj))
+            if entity is None:
+                continue
+            owner_attr = ENTITIES[entity][1] or "field_id"
+            owners = _attribute_values(obj, owner_attr)
+            if entity == "crop":
+                crop_field_ids |= owners
+            changed.append((entity, obj.id, deleted, owners))
+        if not changed:
+            return
+
+        connection = session.connection()
+        field_owners: Dict[int, int] = {}
+        if crop_field_ids:
+            field_owners = dict(connection.execute(
+                select(FarmField.id, FarmField.owner_id).where(FarmField.id.in_(crop_field_ids))
+            ).all())
+
+        rows = []
+        for entity, entity_id, deleted, owners in changed:
+            if entity == "crop":
+                owners = {field_owners[f] for f in owners if f in field_owners}
+            for user_id in owners or {None}:
+                rows.append({
+                    "entity": entity, "entity_id": entity_id, "deleted": deleted,
+                    "user_id": user_id, "changed_at": now,
+                })
+        connection.execute(insert(SyncChange.__table__), rows)
+        session.info["sync_pending"] = True
+
+    def record_bulk_write(self, session: Session, model: type, ids: Iterable[int]) -> None:
+        """
+        Logs rows written by a bulk INSERT or UPDATE statement, which bypasses flush
+        events. Call in the same transaction, after the statement.
+        """
+        entity = _ENTITY_BY_MODEL[model]
+        owner_attr = ENTITIES[entity][1]
+        if owner_attr is None:
+            raise ValueError(f"Bulk writes of {entity} are not tracked")
+        session.execute(insert(SyncChange.__table__).from_select(
+            ["entity", "entity_id", "deleted", "user_id", "changed_at"],
+            select(
+                literal(entity), model.id, literal(False), getattr(model, owner_attr), literal(datetime.utcnow())
+            ).where(model.id.in_(list(ids))),
+        ))
+        session.info["sync_pending"] = True
+
+    def _reserve(self, connection, count: int) -> int:
+        """
+        Takes `count` numbers from the counter; returns the last one. The counter
+        row stays locked until the transaction ends, so no later commit gets a
+        lower number.
+        """
+        sequence = SyncSequence.__table__
+        bump = update(sequence).where(sequence.c.id == 1).values(value=sequence.c.value + count)
+        if not connection.execute(bump).rowcount:
+            # First numbered commit: continue after the entries numbered by backfill
+            try:
+                with connection.begin_nested():
+                    start = select(func.coalesce(func.max(SyncChange.seq), 0) + count).scalar_subquery()
+                    connection.execute(insert(sequence).values(id=1, value=start))
+            except IntegrityError:
+                connection.execute(bump)  # created concurrently
+        return connection.execute(select(sequence.c.value).where(sequence.c.id == 1)).scalar_one()
+
+    def _before_commit(self, session: OrmSession) -> None:
+        """Numbers the transaction's log entries, right before they become visible."""
+        session.flush()  # log the pending writes first
+        if not session.info.pop("sync_pending", False):
+            return
+        connection = session.connection()
+        # Other transactions' entries are invisible until they commit: these are ours
+        ids = connection.execute(
+            select(SyncChange.id).where(SyncChange.seq == None).order_by(SyncChange.id)
+        ).scalars().all()
+        if not ids:
+            return
+        last = self._reserve(connection, len(ids))
+        first = last - len(ids) + 1
+        changes = SyncChange.__table__
+        connection.execute(
+            update(changes).where(changes.c.id == bindparam("change_id")).values(seq=bindparam("change_seq")),
+            [{"change_id": id, "change_seq": first + i} for i, id in enumerate(ids)],
+        )
+
+    def backfill(self) -> int:
+        """Numbers log entries written before seq existed: seq = id, so their tokens stay valid."""
+        with Session(engine) as session:
+            done = session.execute(
+                update(SyncChange).where(SyncChange.seq == None).values(seq=SyncChange.id)
+            ).rowcount
+            session.commit()
+        if done:
+            logger.info("Sync log: numbered %d legacy entries", done)
+        return done
+
+    # ── Reading changes ─────────────────────────────────────────────────────
+    def _owned(self, entity: str, statement, user_id: int):
+        model, owner_attr, _ = ENTITIES[entity]
+        if owner_attr:
+            return statement.where(getattr(model, owner_attr) == user_id)
+        return statement.join(FarmField, FarmField.id == Crop.field_id).where(FarmField.owner_id == user_id)
+
+    def _load(self, session: Session, entity: str, statement) -> List[Dict[str, Any]]:
+        model, _, read_schema = ENTITIES[entity]
+        if model is Order:
+            statement = statement.options(selectinload(Order.items))
+        return [jsonable_encoder(read_schema.from_orm(obj)) for obj in session.exec(statement).all()]
+
+    def _token_valid(self, session: Session, since: int) -> bool:
+        """False when the changes after `since` have been pruned from the log."""
+        oldest = session.exec(select(func.min(SyncChange.seq))).one()
+        return oldest is None or since >= oldest - 1
+
+    def _snapshot(self, session: Session, user: User, scoped: bool) -> SyncChangesRead:
+        # Read the watermark first: anything committed during the snapshot is re-sent next time
+        token = session.exec(select(func.max(SyncChange.seq))).one() or 0
+        changes = {}
+        for entity, (model, _, _) in ENTITIES.items():
+            statement = select(model)
+            if scoped:
+                statement = self._owned(entity, statement, user.id)
+            changes[entity] = SyncEntityChanges(upserts=self._load(session, entity, statement))
+        return SyncChangesRead(token=str(token), full=True, changes=changes)
+
+    def changes(self, session: Session, user: User, since: Optional[str]) -> SyncChangesRead:
+        """
+        Rows created, updated or deleted since the `since` token, coalesced per row.
+        Without a token (or with an expired one) returns a full snapshot instead.
+        Admins and gestionnaires see every row, other users the rows they own.
+        """
+        scoped = user.role not in ["admin", "gestionnaire"]
+        since_seq = int(since) if since and since.isdigit() else None
+        if since_seq is None or not self._token_valid(session, since_seq):
+            return self._snapshot(session, user, scoped)
+
+        statement = select(SyncChange.seq, SyncChange.entity, SyncChange.entity_id, SyncChange.deleted).where(
+            SyncChange.seq > since_seq
+        )
+        if scoped:
+            statement = statement.where(SyncChange.user_id == user.id)
+        log = session.exec(statement.order_by(SyncChange.seq).limit(settings.SYNC_PAGE_SIZE + 1)).all()
+        has_more = len(log) > settings.SYNC_PAGE_SIZE
+        log = log[:settings.SYNC_PAGE_SIZE]
+
+        # Last write wins per row
+        latest: Dict[str, Dict[int, bool]] = {}
+        for _, entity, entity_id, deleted in log:
+            latest.setdefault(entity, {})[entity_id] = deleted
+
+        changes: Dict[str, SyncEntityChanges] = {}
+        for entity, rows in latest.items():
+            model = ENTITIES[entity][0]
+            live_ids = [entity_id for entity_id, deleted in rows.items() if not deleted]
+            upserts: List[Dict[str, Any]] = []
+            if live_ids:
+                statement = select(model).where(model.id.in_(live_ids))
+                if scoped:
+                    statement = self._owned(entity, statement, user.id)
+                upserts = self._load(session, entity, statement)
+            # Deleted rows, and rows that left the user's scope (e.g. order reassigned)
+            visible = {row["id"] for row in upserts}
+            deletes = [entity_id for entity_id in rows if entity_id not in visible]
+            changes[entity] = SyncEntityChanges(upserts=upserts, deletes=deletes)
+
+        token = log[-1][0] if log else since_seq
+        return SyncChangesRead(token=str(token), has_more=has_more, changes=changes)
+
+    # ── Log retention ───────────────────────────────────────────────────────
+    def prune(self) -> int:
+        """Deletes log entries older than SYNC_RETENTION_DAYS (keeping the newest one)."""
+        cutoff = datetime.utcnow() - timedelta(days=settings.SYNC_RETENTION_DAYS)
+        with Session(engine) as session:
+            newest = session.exec(select(func.max(SyncChange.seq))).one()
+            if newest is None:
+                return 0
+            result = session.execute(
+                delete(SyncChange).where(SyncChange.changed_at < cutoff, SyncChange.seq < newest)
+            )
+            session.commit()
+            return result.rowcount
+
+    async def _run_forever(self) -> None:
+        while True:
+            try:
+                pruned = await asyncio.to_thread(self.prune)
+                if pruned:
+                    logger.info("Sync log: pruned %d entries", pruned)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Sync log pruning failed: {e}", exc_info=True)
+            await asyncio.sleep(settings.SYNC_PRUNE_INTERVAL_SECONDS)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run_forever())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+
+sync_changes = SyncService()
+event.listen(OrmSession, "before_flush", sync_changes._before_flush)
+event.listen(OrmSession, "after_flush", sync_changes._after_flush)
+event.listen(OrmSession, "before_commit", sync_changes._before_commit)
@@ -0,0 +1,145 @@
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, select
+from models.field_data import FieldData
+from models.harvest import Harvest
+from models.sync_change import SyncUpload, SyncUploadKey, SyncUploadReport, SyncUploadResult
+from models.user import User
+from services.sync_service import sync_changes
+from services.yield_analytics_service import yield_analytics
+from services.yield_prediction_service import yield_predictions
+
+logger = logging.getLogger(__name__)
+
+
+class SyncUploadService:
+    """
+    Batch upload of field data and harvests recorded offline. Every record carries a
+    client-generated key; keys already applied for the user are reported as duplicates
+    with the existing id, so a replayed batch never creates a row twice.
+    The whole batch is written in one transaction with one executemany INSERT per table.
+    """
+
+    def upload(self, session: Session, user: User, payload: SyncUpload) -> SyncUploadReport:
+        try:
+            return self._apply(session, user, payload)
+        except IntegrityError:
+            # A concurrent replay of the same batch committed first: its keys are now duplicates
+            session.rollback()
+            logger.info("Sync upload of user %s raced with another upload, retrying", user.id)
+            return self._apply(session, user, payload)
+
+    def _insert(self, session: Session, model: type, rows: List[Dict]) -> List[int]:
+        if not rows:
+            return []
+        ids = session.execute(
+            insert(model).returning(model.id, sort_by_parameter_order=True), rows
+        ).scalars().all()
+        sync_changes.record_bulk_write(session, model, ids)
+        return list(ids)
+
+    def _apply(self, session: Session, user: User, payload: SyncUpload) -> SyncUploadReport:
+        keys = {item.key for item in payload.field_data} | {item.key for item in payload.harvests}
+        keys |= {item.field_data_key for item in payload.harvests if item.field_data_key}
+        applied: Dict[str, Tuple[str, int]] = {
+            key: (entity, entity_id)
+            for key, entity, entity_id in session.exec(
+                select(SyncUploadKey.key, SyncUploadKey.entity, SyncUploadKey.entity_id).where(
+                    SyncUploadKey.user_id == user.id, SyncUploadKey.key.in_(keys)
+                )
+            ).all()
+        }
+        results: List[SyncUploadResult] = []
+        seen: Set[str] = set()
+
+        def check_key(entity: str, key: str) -> Optional[SyncUploadResult]:
+            """Result for a key that must not be written again, None for a new key."""
+            if key in seen:
+                return SyncUploadResult(entity=entity, key=key, status="error", error="Clé en double dans le lot")
+            seen.add(key)
+            if key not in applied:
+                return None
+            applied_entity, entity_id = applied[key]
+            if applied_entity != entity:
+                return SyncUploadResult(
+                    entity=entity, key=key, status="error", error="Clé déjà utilisée pour un autre type"
+                )
+            return SyncUploadResult(entity=entity, key=key, status="duplicate", id=entity_id)
+
+        # Field data first, so harvests can reference it by key
+        now = datetime.utcnow()
+        rows: List[Dict] = []
+        created: List[SyncUploadResult] = []
+        for item in payload.field_data:
+            result = check_key("field_data", item.key)
+            if result is None:
+                result = SyncUploadResult(entity="field_data", key=item.key, status="created")
+                row = FieldData(**item.dict(exclude={"key"}), agent_id=user.id, created_at=now).dict(exclude={"id"})
+                rows.append(row)
+                created.append(result)
+            results.append(result)
+        for result, id in zip(created, self._insert(session, FieldData, rows)):
+            result.id = id
+
+        field_data_by_key = {key: id for key, (entity, id) in applied.items() if entity == "field_data"}
+        field_data_by_key.update({r.key: r.id for r in created})
+        referenced_ids = {item.field_data_id for item in payload.harvests if item.field_data_id is not None}
+        allowed_ids = set(field_data_by_key.values())
+        if referenced_ids:
+            statement = select(FieldData.id).where(FieldData.id.in_(referenced_ids))
+            if user.role != "admin":
+                statement = statement.where(FieldData.agent_id == user.id)
+            allowed_ids |= set(session.exec(statement).all())
+
+        rows, harvest_created = [], []
+        for item in payload.harvests:
+            result = check_key("harvest", item.key)
+            if result is None:
+                field_data_id = field_data_by_key.get(item.field_data_key) if item.field_data_key else item.field_data_id
+                if field_data_id is None or field_data_id not in allowed_ids:
+                    result = SyncUploadResult(
+                        entity="harvest", key=item.key, status="error", error="Données terrain non trouvées"
+                    )
+                else:
+                    result = SyncUploadResult(entity="harvest", key=item.key, status="created")
+                    rows.append(Harvest(
+                        field_data_id=field_data_id,
+                        agent_id=user.id,
+                        harvest_date=item.harvest_date,
+                        actual_kg=item.actual_kg,
+                        notes=item.notes,
+                        created_at=now,
+                    ).dict(exclude={"id"}))
+                    harvest_created.append(result)
+            results.append(result)
+        for result, id in zip(harvest_created, self._insert(session, Harvest, rows)):
+            result.id = id
+        created.extend(harvest_created)
+
+        if created:
+            session.execute(insert(SyncUploadKey), [
+                {"user_id": user.id, "key": r.key, "entity": r.entity, "entity_id": r.id, "created_at": now}
+                for r in created
+            ])
+        session.commit()
+        if created:
+            seasons = {item.season for item in payload.field_data}
+            harvested_ids = [row["field_data_id"] for row in rows]
+            if harvested_ids:
+                seasons |= set(session.exec(
+                    select(FieldData.season).where(FieldData.id.in_(harvested_ids)).distinct()
+                ).all())
+            yield_analytics.invalidate(seasons)
+            field_data_ids = [r.id for r in created if r.entity == "field_data"]
+            yield_predictions.refresh_plots(field_data_ids + harvested_ids)
+
+        report = SyncUploadReport()
+        for result in results:
+            report.add(result)
+        return report
+
+
+sync_upload = SyncUploadService()
@@ -1,6 +1,6 @@
-import httpx
 from typing import Optional, Dict, Any
 from core.config import settings
+from core.http_gateway import http_gateway
 
 class WeatherService:
     def __init__(self):
@@ -16,19 +16,18 @@ class WeatherService:
             return self._get_mock_weather(location)
 
         try:
-            async with httpx.AsyncClient() as client:
-                params = {
-                    "q": location,
-                    "appid": self.api_key,
-                    "units": "metric",
-                    "lang": "fr"
-                }
-                response = await client.get(self.base_url, params=params)
-                if response.status_code == 200:
-                    data = response.json()
-                    return data
-                else:
-                    return self._get_mock_weather(location, error=f"API Error: {response.status_code}")
+            params = {
+                "q": location,
+                "appid": self.api_key,
+                "units": "metric",
+                "lang": "fr"
+            }
+            response = await http_gateway.get(self.base_url, params=params, timeout=10.0)
+            if response.status_code == 200:
+                data = response.json()
+                return data
+            else:
+                return self._get_mock_weather(location, error=f"API Error: {response.status_code}")
         except Exception as e:
             return self._get_mock_weather(location, error=str(e))
 
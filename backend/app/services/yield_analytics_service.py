@@ -0,0 +1,192 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, Iterable, List, Optional, Sequence, Set, Tuple
+from sqlalchemy import case, func
+from sqlmodel import Session, select
+from core.config import settings
+from models.field_data import FieldData, FieldDataStatus, YieldAnalytics, YieldDimension, YieldGroup
+from models.harvest import Harvest
+
+# Dimension -> (FieldData column, YieldGroup attribute)
+DIMENSIONS = {
+    YieldDimension.SEASON: (FieldData.season, "season"),
+    YieldDimension.SOIL_TYPE: (FieldData.soil_type, "soil_type"),
+    YieldDimension.AGENT: (FieldData.agent_id, "agent_id"),
+    YieldDimension.LOCATION: (FieldData.location, "location"),
+}
+# Additive sums of a group, in query column order; ratios are derived after merging
+SUMS = ("plots", "harvested_plots", "hectares", "harvested_hectares", "expected_kg", "harvested_expected_kg", "actual_kg")
+
+# (dimension values, sums)
+Row = Tuple[Tuple, Tuple]
+
+
+def _finish(group: YieldGroup) -> YieldGroup:
+    if group.hectares:
+        group.expected_kg_per_ha = round(group.expected_kg / group.hectares, 2)
+    if group.harvested_hectares:
+        group.yield_kg_per_ha = round(group.actual_kg / group.harvested_hectares, 2)
+    group.gap_kg = group.actual_kg - group.harvested_expected_kg
+    if group.harvested_expected_kg:
+        group.gap_pct = round(100 * group.gap_kg / group.harvested_expected_kg, 2)
+    return group
+
+
+class YieldAnalyticsService:
+    """
+    Yield per hectare and expected-vs-actual gaps of field data plots, aggregated in SQL
+    per season and the requested dimensions. A plot's actual harvest is the sum of its
+    Harvest records, or FieldData.actual_harvest_kg when none were recorded.
+
+    A season is closed once none of its plots is active; its aggregates are cached until
+    a write touches the season (invalidate) or YIELD_CACHE_TTL_SECONDS pass (writes
+    handled by other worker processes). Open seasons are always computed.
+    """
+
+    def __init__(self):
+        self._generation = 0
+        # (season, dimensions, filters, scope) -> (expires_at, rows), least recently used first
+        self._entries: "OrderedDict[Hashable, Tuple[float, List[Row]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def invalidate(self, seasons: Optional[Iterable[str]] = None) -> None:
+        """Drops cached aggregates of `seasons` (all when None). Call after writing plots or harvests."""
+        with self._lock:
+            self._generation += 1
+            if seasons is None:
+                self._entries.clear()
+                return
+            seasons = set(seasons)
+            for key in [key for key in self._entries if key[0] in seasons]:
+                del self._entries[key]
+
+    def _get(self, key: Hashable) -> Optional[List[Row]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def _put(self, key: Hashable, generation: int, rows: List[Row]) -> None:
+        with self._lock:
+            if generation != self._generation:
+                return  # plots changed while computing
+            self._entries[key] = (time.monotonic() + settings.YIELD_CACHE_TTL_SECONDS, rows)
+            self._entries.move_to_end(key)
+            while len(self._entries) > settings.YIELD_CACHE_MAX_ENTRIES:
+                self._entries.popitem(last=False)
+
+    def _seasons(self, session: Session, season: Optional[str]) -> Dict[str, bool]:
+        """season -> closed. Served by the (season, status) index."""
+        is_active = case((FieldData.status == FieldDataStatus.ACTIVE, 1), else_=0)
+        statement = select(FieldData.season, func.max(is_active)).group_by(FieldData.season)
+        if season is not None:
+            statement = statement.where(FieldData.season == season)
+        return {name: not active for name, active in session.exec(statement).all()}
+
+    def _aggregate(
+        self, session: Session, dimensions: Sequence[YieldDimension], filters: list, seasons: List[str]
+    ) -> Dict[str, List[Row]]:
+        """One grouped statement over the given seasons; rows split per season."""
+        # Harvest totals of the selected plots only (field_data_id index), one row per plot
+        harvested = (
+            select(Harvest.field_data_id, func.sum(Harvest.actual_kg).label("kg"))
+            .join(FieldData, FieldData.id == Harvest.field_data_id)
+            .where(FieldData.season.in_(seasons), *filters)
+            .group_by(Harvest.field_data_id)
+            .subquery()
+        )
+        actual = func.coalesce(harvested.c.kg, FieldData.actual_harvest_kg)
+        known = actual.is_not(None)
+        columns = [FieldData.season] + [DIMENSIONS[d][0] for d in dimensions if d != YieldDimension.SEASON]
+        statement = (
+            select(
+                *columns,
+                func.count(FieldData.id),
+                func.sum(case((known, 1), else_=0)),
+                func.sum(FieldData.size_hectares),
+                func.sum(case((known, FieldData.size_hectares), else_=0)),
+                func.sum(FieldData.expected_harvest_kg),
+                func.sum(case((known, FieldData.expected_harvest_kg), else_=0)),
+                func.coalesce(func.sum(actual), 0),
+            )
+            .outerjoin(harvested, harvested.c.field_data_id == FieldData.id)
+            .where(FieldData.season.in_(seasons), *filters)
+            .group_by(*columns)
+        )
+        rows: Dict[str, List[Row]] = {season: [] for season in seasons}
+        width = len(columns)
+        for row in session.exec(statement).all():
+            rows[row[0]].append((tuple(row[1:width]), tuple(row[width:])))
+        return rows
+
+    def analytics(
+        self,
+        session: Session,
+        group_by: Sequence[YieldDimension],
+        season: Optional[str] = None,
+        soil_type: Optional[str] = None,
+        agent_id: Optional[int] = None,
+        location: Optional[str] = None,
+    ) -> YieldAnalytics:
+        dimensions = tuple(dict.fromkeys(group_by))  # dedupe, keep order
+        filters = []
+        if soil_type is not None:
+            filters.append(FieldData.soil_type == soil_type)
+        if agent_id is not None:
+            filters.append(FieldData.agent_id == agent_id)
+        if location is not None:
+            filters.append(FieldData.location == location)
+        # Rows are always grouped by season first (the caching unit)
+        row_dimensions = [d for d in dimensions if d != YieldDimension.SEASON]
+        key_suffix = (tuple(row_dimensions), soil_type, agent_id, location)
+
+        generation = self._generation
+        per_season: Dict[str, List[Row]] = {}
+        to_compute: List[str] = []
+        closed_seasons: Set[str] = set()
+        for name, closed in self._seasons(session, season).items():
+            cached = self._get((name,) + key_suffix) if closed else None
+            if cached is not None:
+                per_season[name] = cached
+            else:
+                to_compute.append(name)
+                if closed:
+                    closed_seasons.add(name)
+        if to_compute:
+            computed = self._aggregate(session, row_dimensions, filters, to_compute)
+            for name in closed_seasons:
+                self._put((name,) + key_suffix, generation, computed[name])
+            per_season.update(computed)
+
+        # Merge seasons into the requested groups
+        attributes = [DIMENSIONS[d][1] for d in row_dimensions]
+        keep_season = YieldDimension.SEASON in dimensions
+        total = YieldGroup()
+        groups: Dict[Tuple, YieldGroup] = {}
+        for name, rows in per_season.items():
+            for values, sums in rows:
+                group_key = ((name,) if keep_season else ()) + values
+                group = groups.get(group_key)
+                if group is None:
+                    group = groups[group_key] = YieldGroup(**dict(zip(attributes, values)))
+                    if keep_season:
+                        group.season = name
+                for target in (group, total):
+                    for attribute, value in zip(SUMS, sums):
+                        setattr(target, attribute, getattr(target, attribute) + (value or 0))
+
+        ordered = sorted(groups.items(), key=lambda item: tuple((v is not None, v) for v in item[0]))
+        return YieldAnalytics(
+            group_by=list(dimensions),
+            total=_finish(total),
+            groups=[_finish(group) for _, group in ordered],
+        )
+
+
+yield_analytics = YieldAnalyticsService()
@@ -0,0 +1,423 @@
+import asyncio
+import logging
+import sys
+import threading
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import numpy as np
+from sqlalchemy import delete, extract, insert
+from sqlmodel import Session, func, select
+from core.config import settings
+from core.db import engine
+from models.field_data import FieldData, FieldDataStatus
+from models.harvest import Harvest
+from models.yield_prediction import (
+    YieldBacktest, YieldBacktestFold, YieldForecast, YieldForecastMonth, YieldModelInfo, YieldPrediction,
+    YieldPredictionRead,
+)
+
+logger = logging.getLogger(__name__)
+
+# Column arrays of field data plots with their declared harvests, see _load()
+Plots = Dict[str, np.ndarray]
+
+
+class YieldModel:
+    """
+    Ridge regression of yield (kg/ha) on area, crop age at harvest (linear and squared),
+    planting day of year (cyclic) and one-hot soil type and season. Kept as its normal
+    equations (XᵀX, Xᵀy) so samples can be added or withdrawn with rank-1 updates.
+    Soil types and seasons unseen at fit time contribute nothing until the next refit.
+    """
+
+    NUMERIC = ["intercept", "area_ha", "age_years", "age_years_sq", "planting_sin", "planting_cos"]
+
+    def __init__(self, soils: Iterable[str], seasons: Iterable[str], median_age_days: int, ridge: float):
+        self.soils = {name: i for i, name in enumerate(sorted(soils))}
+        self.seasons = {name: i for i, name in enumerate(sorted(seasons))}
+        self.median_age_days = median_age_days
+        size = len(self.NUMERIC) + len(self.soils) + len(self.seasons)
+        self.xtx = np.zeros((size, size))
+        self.xty = np.zeros(size)
+        self.coef = np.zeros(size)
+        self.samples = 0
+        self.penalty = np.full(size, ridge)
+        self.penalty[0] = 0.0  # intercept is not shrunk
+
+    @property
+    def feature_names(self) -> List[str]:
+        return (
+            self.NUMERIC
+            + [f"soil:{name}" for name in self.soils]
+            + [f"season:{name}" for name in self.seasons]
+        )
+
+    def features(
+        self, area: np.ndarray, age_days: np.ndarray, planting: np.ndarray, soils: np.ndarray, seasons: np.ndarray
+    ) -> np.ndarray:
+        X = np.zeros((len(area), len(self.coef)))
+        years = age_days / 365.25
+        day_of_year = (planting - planting.astype("datetime64[Y]")).astype(np.int64)
+        angle = 2 * np.pi * day_of_year / 365.25
+        X[:, 0] = 1.0
+        X[:, 1] = area
+        X[:, 2] = years
+        X[:, 3] = years ** 2
+        X[:, 4] = np.sin(angle)
+        X[:, 5] = np.cos(angle)
+        offset = len(self.NUMERIC)
+        for vocabulary, values in ((self.soils, soils), (self.seasons, seasons)):
+            codes = np.fromiter((vocabulary.get(v, -1) for v in values), dtype=np.int64, count=len(values))
+            rows = np.nonzero(codes >= 0)[0]
+            X[rows, offset + codes[rows]] = 1.0
+            offset += len(vocabulary)
+        return X
+
+    def update(self, X: np.ndarray, y: np.ndarray, weight: float = 1.0) -> None:
+        """Adds (weight=1) or withdraws (weight=-1) samples; call solve() afterwards."""
+        self.xtx += weight * (X.T @ X)
+        self.xty += weight * (X.T @ y)
+        self.samples += int(weight) * len(y)
+
+    def solve(self) -> None:
+        system = self.xtx + np.diag(self.penalty)
+        try:
+            self.coef = np.linalg.solve(system, self.xty)
+        except np.linalg.LinAlgError:
+            self.coef = np.linalg.lstsq(system, self.xty, rcond=None)[0]
+
+    def harvest_age(self, planting: np.ndarray, as_of) -> np.ndarray:
+        """Age at harvest assumed for unharvested plots: their age at as_of, at least the usual harvest age."""
+        age = (np.datetime64(as_of, "D") - planting).astype(np.int64)
+        return np.maximum(age, self.median_age_days)
+
+    def predict_kg(self, area: np.ndarray, age_days: np.ndarray, planting: np.ndarray, soils, seasons) -> np.ndarray:
+        per_hectare = self.features(area, age_days, planting, soils, seasons) @ self.coef
+        return np.maximum(per_hectare, 0.0) * area
+
+
+class YieldPredictionService:
+    """
+    Predicted harvest (kg) of active field data plots, stored in YieldPrediction for
+    stock planning. The model is trained on closed plots (status harvested) with their
+    Harvest records; the target is kg per hectare.
+
+    refresh() refits in batch and re-predicts every active plot (at startup and every
+    YIELD_PREDICTION_REFRESH_SECONDS). refresh_plots() is called when plots or harvests
+    are written: it moves the changed plots in or out of the training set with rank-1
+    updates and re-predicts only those plots.
+    """
+
+    def __init__(self):
+        self._model: Optional[YieldModel] = None
+        # field_data_id -> (feature row, kg/ha) of training samples, to withdraw them on change
+        self._samples: Dict[int, Tuple[np.ndarray, float]] = {}
+        self._trained_at: Optional[datetime] = None
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    # ── Data ────────────────────────────────────────────────────────────────
+    def _load(self, session: Session, ids: Optional[Set[int]] = None) -> Plots:
+        harvests = select(
+            Harvest.field_data_id,
+            func.sum(Harvest.actual_kg).label("kg"),
+            func.max(Harvest.harvest_date).label("last_date"),
+        ).group_by(Harvest.field_data_id)
+        statement = select(
+            FieldData.id, FieldData.status, FieldData.soil_type, FieldData.season, FieldData.size_hectares,
+            FieldData.planting_date, FieldData.expected_harvest_kg,
+        )
+        if ids is not None:
+            harvests = harvests.where(Harvest.field_data_id.in_(ids))
+            statement = statement.where(FieldData.id.in_(ids))
+        harvests = harvests.subquery()
+        statement = statement.add_columns(harvests.c.kg, harvests.c.last_date).outerjoin(
+            harvests, harvests.c.field_data_id == FieldData.id
+        )
+        rows = session.exec(statement).all()
+        id, status, soil, season, area, planting, expected, kg, last_date = (
+            zip(*rows) if rows else ([] for _ in range(9))
+        )
+        planting = np.array(planting, dtype="datetime64[D]")
+        has_harvest = np.array([d is not None for d in last_date], dtype=bool)
+        return {
+            "id": np.array(id, dtype=np.int64),
+            "active": np.array([s == FieldDataStatus.ACTIVE for s in status], dtype=bool),
+            "closed": np.array([s == FieldDataStatus.HARVESTED for s in status], dtype=bool),
+            "soil": np.array(soil, dtype=object),
+            "season": np.array(season, dtype=object),
+            "area": np.array(area, dtype=float),
+            "planting": planting,
+            "expected": np.array(expected, dtype=float),
+            "kg": np.array([k or 0 for k in kg], dtype=float),
+            "has_harvest": has_harvest,
+            # Plots without harvests get their planting date (age 0): never training samples
+            "last_date": np.where(has_harvest, np.array([d or date.min for d in last_date], dtype="datetime64[D]"), planting),
+        }
+
+    @staticmethod
+    def _training_mask(plots: Plots) -> np.ndarray:
+        return plots["closed"] & plots["has_harvest"] & (plots["area"] > 0) & (plots["last_date"] > plots["planting"])
+
+    @staticmethod
+    def _samples_of(model: YieldModel, plots: Plots, mask: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        age = (plots["last_date"][mask] - plots["planting"][mask]).astype(np.int64)
+        X = model.features(plots["area"][mask], age, plots["planting"][mask], plots["soil"][mask], plots["season"][mask])
+        return X, plots["kg"][mask] / plots["area"][mask]
+
+    def _fit(self, plots: Plots, mask: np.ndarray) -> Optional[Tuple[YieldModel, np.ndarray, np.ndarray]]:
+        """Batch fit on the plots selected by mask; None below YIELD_MODEL_MIN_SAMPLES."""
+        if mask.sum() < settings.YIELD_MODEL_MIN_SAMPLES:
+            return None
+        age = (plots["last_date"][mask] - plots["planting"][mask]).astype(np.int64)
+        model = YieldModel(
+            set(plots["soil"][mask]), set(plots["season"][mask]), int(np.median(age)), settings.YIELD_MODEL_RIDGE
+        )
+        X, y = self._samples_of(model, plots, mask)
+        model.update(X, y)
+        model.solve()
+        return model, X, y
+
+    def _prediction_rows(self, plots: Plots) -> List[Dict]:
+        index = np.nonzero(plots["active"])[0]
+        if not len(index):
+            return []
+        now = datetime.utcnow()
+        harvested = plots["kg"][index]
+        harvest_dates = [None] * len(index)
+        model = self._model
+        if model is None:
+            predicted, source = plots["expected"][index], "expected"
+        else:
+            planting = plots["planting"][index]
+            age = model.harvest_age(planting, now.date())
+            predicted = model.predict_kg(
+                plots["area"][index], age, planting, plots["soil"][index], plots["season"][index]
+            )
+            harvest_dates = (planting + age.astype("timedelta64[D]")).astype(object)
+            source = "model"
+        # Never below what has already been harvested
+        predicted = np.maximum(predicted, harvested)
+        return [
+            {
+                "field_data_id": int(plots["id"][i]),
+                "predicted_kg": int(round(p)),
+                "harvested_kg": int(h),
+                "predicted_harvest_date": d,
+                "source": source,
+                "predicted_at": now,
+            }
+            for i, p, h, d in zip(index, predicted, harvested, harvest_dates)
+        ]
+
+    # ── Refresh ─────────────────────────────────────────────────────────────
+    def refresh(self) -> YieldModelInfo:
+        """Refits the model on every closed plot and re-predicts all active plots."""
+        with Session(engine) as session:
+            plots = self._load(session)
+            mask = self._training_mask(plots)
+            fitted = self._fit(plots, mask)
+            with self._lock:
+                self._model, self._samples = None, {}
+                if fitted is not None:
+                    self._model, X, y = fitted
+                    self._samples = {int(id): (X[i], y[i]) for i, id in enumerate(plots["id"][mask])}
+                self._trained_at = datetime.utcnow()
+                rows = self._prediction_rows(plots)
+            session.execute(delete(YieldPrediction))
+            if rows:
+                session.execute(insert(YieldPrediction), rows)
+            session.commit()
+        logger.info("Yield model refit on %d plots, %d active plots predicted", int(mask.sum()), len(rows))
+        return self.info()
+
+    def refresh_plots(self, ids: Iterable[int]) -> None:
+        """Updates the model and the predictions after writes to these plots or their harvests."""
+        ids = {int(id) for id in ids}
+        if not ids:
+            return
+        with Session(engine) as session:
+            plots = self._load(session, ids)
+            mask = self._training_mask(plots)
+            with self._lock:
+                model = self._model
+                if model is not None:
+                    withdrawn = [self._samples.pop(id) for id in ids if id in self._samples]
+                    for x, y in withdrawn:
+                        model.update(x[None, :], np.array([y]), weight=-1.0)
+                    if mask.any():
+                        X, y = self._samples_of(model, plots, mask)
+                        model.update(X, y)
+                        for i, id in enumerate(plots["id"][mask]):
+                            self._samples[int(id)] = (X[i], y[i])
+                    if withdrawn or mask.any():
+                        model.solve()
+                rows = self._prediction_rows(plots)
+            session.execute(delete(YieldPrediction).where(YieldPrediction.field_data_id.in_(ids)))
+            if rows:
+                session.execute(insert(YieldPrediction), rows)
+            session.commit()
+
+    def info(self) -> YieldModelInfo:
+        model = self._model
+        if model is None:
+            return YieldModelInfo(trained_at=self._trained_at)
+        return YieldModelInfo(
+            trained_at=self._trained_at,
+            samples=model.samples,
+            features=model.feature_names,
+            median_harvest_age_days=model.median_age_days,
+        )
+
+    # ── Reading ─────────────────────────────────────────────────────────────
+    def forecast(
+        self,
+        session: Session,
+        season: Optional[str] = None,
+        soil_type: Optional[str] = None,
+        agent_id: Optional[int] = None,
+        location: Optional[str] = None,
+        skip: int = 0,
+        limit: int = 100,
+    ) -> YieldForecast:
+        """Totals and remaining kg per predicted harvest month, plus one page of plot predictions."""
+        filters = [FieldData.id == YieldPrediction.field_data_id]
+        if season is not None:
+            filters.append(FieldData.season == season)
+        if soil_type is not None:
+            filters.append(FieldData.soil_type == soil_type)
+        if agent_id is not None:
+            filters.append(FieldData.agent_id == agent_id)
+        if location is not None:
+            filters.append(FieldData.location == location)
+        remaining = YieldPrediction.predicted_kg - YieldPrediction.harvested_kg
+
+        plots, predicted_kg, remaining_kg = session.exec(
+            select(
+                func.count(YieldPrediction.field_data_id),
+                func.coalesce(func.sum(YieldPrediction.predicted_kg), 0),
+                func.coalesce(func.sum(remaining), 0),
+            ).where(*filters)
+        ).one()
+        year = extract("year", YieldPrediction.predicted_harvest_date)
+        month = extract("month", YieldPrediction.predicted_harvest_date)
+        by_month = session.exec(
+            select(year, month, func.count(YieldPrediction.field_data_id), func.sum(remaining))
+            .where(*filters, YieldPrediction.predicted_harvest_date.is_not(None))
+            .group_by(year, month)
+            .order_by(year, month)
+        ).all()
+        page = session.exec(
+            select(YieldPrediction, FieldData)
+            .where(*filters)
+            .order_by(YieldPrediction.predicted_harvest_date, YieldPrediction.field_data_id)
+            .offset(skip)
+            .limit(limit)
+        ).all()
+        return YieldForecast(
+            model=self.info(),
+            plots=plots,
+            predicted_kg=predicted_kg,
+            remaining_kg=remaining_kg,
+            by_month=[
+                YieldForecastMonth(month=f"{int(y):04d}-{int(m):02d}", plots=count, remaining_kg=kg)
+                for y, m, count, kg in by_month
+            ],
+            predictions=[
+                YieldPredictionRead(
+                    **prediction.dict(exclude={"predicted_at"}),
+                    season=fd.season,
+                    soil_type=fd.soil_type,
+                    location=fd.location,
+                    agent_id=fd.agent_id,
+                    size_hectares=fd.size_hectares,
+                    expected_harvest_kg=fd.expected_harvest_kg,
+                    remaining_kg=prediction.predicted_kg - prediction.harvested_kg,
+                )
+                for prediction, fd in page
+            ],
+        )
+
+    # ── Backtest ────────────────────────────────────────────────────────────
+    def backtest(self, session: Session, folds: Optional[int] = None) -> YieldBacktest:
+        """
+        Walk-forward evaluation on past seasons: for each of the last `folds` seasons, fits
+        on plots harvested before the season's first planting, predicts the season's plots
+        as the live model would at that date, and compares with the agents' expected_harvest_kg.
+        """
+        folds = folds or settings.YIELD_BACKTEST_FOLDS
+        plots = self._load(session)
+        samples = self._training_mask(plots)
+        starts: Dict[str, np.datetime64] = {}
+        for season, planting in zip(plots["season"][samples], plots["planting"][samples]):
+            if season not in starts or planting < starts[season]:
+                starts[season] = planting
+
+        report = YieldBacktest()
+        model_errors, expected_errors = [], []
+        for season in sorted(starts, key=starts.get)[-folds:]:
+            cutoff = starts[season]
+            test = samples & (plots["season"] == season)
+            fitted = self._fit(plots, samples & (plots["last_date"] < cutoff) & (plots["season"] != season))
+            if fitted is None:
+                continue
+            model = fitted[0]
+            planting = plots["planting"][test]
+            predicted = model.predict_kg(
+                plots["area"][test], model.harvest_age(planting, cutoff), planting,
+                plots["soil"][test], plots["season"][test],
+            )
+            actual, expected = plots["kg"][test], plots["expected"][test]
+            fold = {"season": season, "train_samples": model.samples, "test_samples": int(test.sum())}
+            for name, estimate, errors in (("model", predicted, model_errors), ("expected", expected, expected_errors)):
+                error = estimate - actual
+                errors.append(np.abs(error))
+                positive = actual > 0
+                fold[f"{name}_mae_kg"] = round(float(np.abs(error).mean()), 2)
+                fold[f"{name}_bias_kg"] = round(float(error.mean()), 2)
+                if positive.any():
+                    fold[f"{name}_mape_pct"] = round(float(100 * np.mean(np.abs(error[positive]) / actual[positive])), 2)
+            report.folds.append(YieldBacktestFold(**fold))
+
+        if model_errors:
+            report.model_mae_kg = round(float(np.concatenate(model_errors).mean()), 2)
+            report.expected_mae_kg = round(float(np.concatenate(expected_errors).mean()), 2)
+        return report
+
+    # ── Background refresh ──────────────────────────────────────────────────
+    async def _run_forever(self) -> None:
+        while True:
+            try:
+                await asyncio.to_thread(self.refresh)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Yield prediction refresh failed: {e}", exc_info=True)
+            await asyncio.sleep(settings.YIELD_PREDICTION_REFRESH_SECONDS)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run_forever())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+
+yield_predictions = YieldPredictionService()
+
+
+if __name__ == "__main__":
+    # `python -m services.yield_prediction_service [backtest]` from backend/app
+    logging.basicConfig(level=logging.INFO)
+    if sys.argv[1:] == ["backtest"]:
+        with Session(engine) as session:
+            print(yield_predictions.backtest(session).json(indent=2))
+    else:
+        print(yield_predictions.refresh().json(indent=2))
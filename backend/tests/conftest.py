@@ -0,0 +1,13 @@
+import os
+import sys
+import tempfile
+
+# The app imports its packages from backend/app (core, models, services...)
+APP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app")
+sys.path.insert(0, APP_DIR)
+
+# Settings are read at import time: point the app at a throwaway SQLite database first
+_db_dir = tempfile.mkdtemp(prefix="manioc_tests_")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_db_dir, 'test.db')}")
+os.environ.setdefault("STORAGE_BACKEND", "local")
+os.environ.setdefault("LOCAL_STORAGE_DIR", os.path.join(_db_dir, "media"))
@@ -0,0 +1,191 @@
+import asyncio
+import json
+import threading
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from sqlmodel import Session, select
+
+import main  # noqa: F401  (registers every table)
+from core.config import settings
+from core.db import engine, init_db
+from core.http_gateway import http_gateway
+from models.order import Order
+from models.transaction import Transaction, TransactionPaymentMethod, TransactionStatus
+from services.payment_reconciliation_service import PaymentReconciliationService
+
+# tx_reference prefix -> PayGate status code returned by the fake server
+FAKE_STATUSES = {"paid": 0, "pending": 2, "expired": 4, "cancelled": 6}
+
+
+class FakePayGate(BaseHTTPRequestHandler):
+    """Minimal PayGate status endpoint: the status depends on the tx_reference prefix."""
+
+    requests = []
+    # tx_reference -> callable run before answering, e.g. to settle it concurrently
+    hooks = {}
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        reference = payload["tx_reference"]
+        FakePayGate.requests.append(reference)
+        if reference in FakePayGate.hooks:
+            FakePayGate.hooks.pop(reference)()
+        if reference.startswith("down"):
+            self.send_response(500)
+            self.end_headers()
+            return
+        body = json.dumps({"tx_reference": reference, "status": FAKE_STATUSES[reference.split("-")[0]]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def paygate():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakePayGate)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    previous = settings.PAYGATE_STATUS_URL
+    settings.PAYGATE_STATUS_URL = f"http://127.0.0.1:{server.server_port}/api/v1/status"
+    yield server
+    settings.PAYGATE_STATUS_URL = previous
+    server.shutdown()
+
+
+@pytest.fixture
+def db():
+    init_db()
+    with Session(engine) as session:
+        for model in (Transaction, Order):
+            for row in session.exec(select(model)).all():
+                session.delete(row)
+        session.commit()
+    FakePayGate.requests.clear()
+    FakePayGate.hooks.clear()
+    return engine
+
+
+def _pending(reference: str, minutes_old: int = 60) -> int:
+    """Creates an order with a pending transaction; returns the transaction id."""
+    with Session(engine) as session:
+        order = Order(order_number=f"CMD-{reference}", client_name="Test", phone="90000000", delivery_address="Lomé")
+        session.add(order)
+        session.commit()
+        tx = Transaction(
+            order_id=order.id,
+            amount=1000,
+            payment_method=TransactionPaymentMethod.FLOOZ,
+            reference=reference,
+            created_at=datetime.utcnow() - timedelta(minutes=minutes_old),
+        )
+        session.add(tx)
+        session.commit()
+        return tx.id
+
+
+def _reconcile(service: PaymentReconciliationService) -> dict:
+    async def run():
+        try:
+            return await service.reconcile_once()
+        finally:
+            await http_gateway.aclose()  # the shared client is bound to this event loop
+
+    return asyncio.run(run())
+
+
+def _transaction(tx_id: int) -> Transaction:
+    with Session(engine) as session:
+        return session.get(Transaction, tx_id)
+
+
+def _order_paid(tx_id: int) -> bool:
+    with Session(engine) as session:
+        return session.get(Order, session.get(Transaction, tx_id).order_id).paid
+
+
+def test_success_settles_transaction_and_marks_order_paid(paygate, db):
+    tx_id = _pending("paid-1")
+    summary = _reconcile(PaymentReconciliationService())
+    assert summary == {"checked": 1, "succeeded": 1, "failed": 0, "still_pending": 0}
+    assert _transaction(tx_id).status == TransactionStatus.SUCCESS
+    assert _order_paid(tx_id)
+
+
+def test_expired_and_cancelled_fail_transaction(paygate, db):
+    expired, cancelled = _pending("expired-1"), _pending("cancelled-1")
+    summary = _reconcile(PaymentReconciliationService())
+    assert summary["failed"] == 2
+    assert _transaction(expired).status == TransactionStatus.FAILED
+    assert _transaction(cancelled).status == TransactionStatus.FAILED
+    assert not _order_paid(expired)
+
+
+def test_recent_transactions_are_left_to_the_webhook(paygate, db):
+    _pending("paid-recent", minutes_old=0)
+    assert _reconcile(PaymentReconciliationService())["checked"] == 0
+    assert FakePayGate.requests == []
+
+
+def test_pending_is_retried_with_backoff(paygate, db):
+    tx_id = _pending("pending-1")
+    service = PaymentReconciliationService()
+    assert _reconcile(service)["still_pending"] == 1
+    attempts, next_at = service._backoff[tx_id]
+    assert attempts == 1 and next_at > datetime.utcnow()
+    # Not due yet: skipped without calling PayGate
+    assert _reconcile(service)["checked"] == 0
+    assert FakePayGate.requests == ["pending-1"]
+    # Once due, each further attempt doubles the delay
+    service._backoff[tx_id] = (attempts, datetime.utcnow() - timedelta(seconds=1))
+    _reconcile(service)
+    attempts, next_at = service._backoff[tx_id]
+    delay = (next_at - datetime.utcnow()).total_seconds()
+    assert attempts == 2
+    assert settings.PAYGATE_RECONCILE_INTERVAL_SECONDS < delay <= 2 * settings.PAYGATE_RECONCILE_INTERVAL_SECONDS
+    assert _transaction(tx_id).status == TransactionStatus.PENDING
+
+
+def test_paygate_error_keeps_transaction_pending(paygate, db):
+    tx_id = _pending("down-1")
+    service = PaymentReconciliationService()
+    assert _reconcile(service)["still_pending"] == 1
+    assert _transaction(tx_id).status == TransactionStatus.PENDING
+    assert tx_id in service._backoff
+
+
+def test_backoff_forgets_transactions_settled_elsewhere(paygate, db):
+    tx_id = _pending("pending-2")
+    service = PaymentReconciliationService()
+    _reconcile(service)
+    assert tx_id in service._backoff
+    with Session(engine) as session:  # e.g. the webhook arrived meanwhile
+        tx = session.get(Transaction, tx_id)
+        tx.status = TransactionStatus.SUCCESS
+        session.add(tx)
+        session.commit()
+    _reconcile(service)
+    assert tx_id not in service._backoff
+
+
+def test_transaction_settled_during_the_check_leaves_order_alone(paygate, db):
+    tx_id = _pending("paid-2")
+
+    def webhook_fails_it():
+        with Session(engine) as session:
+            tx = session.get(Transaction, tx_id)
+            tx.status = TransactionStatus.FAILED
+            session.add(tx)
+            session.commit()
+
+    FakePayGate.hooks["paid-2"] = webhook_fails_it
+    summary = _reconcile(PaymentReconciliationService())
+    assert summary["succeeded"] == 1  # PayGate said paid...
+    assert _transaction(tx_id).status == TransactionStatus.FAILED  # ...but the webhook won
+    assert not _order_paid(tx_id)
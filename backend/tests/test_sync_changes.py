@@ -0,0 +1,75 @@
+import pytest
+from sqlmodel import Session, delete
+
+import main  # noqa: F401  (registers every table)
+from core.db import engine, init_db
+from models.order import Order, OrderItem
+from models.sync_change import SyncChange, SyncEntityChanges
+from models.transaction import Transaction
+from models.user import User, UserRole
+from services.sync_service import sync_changes
+
+ADMIN = User(id=1, username="admin", email="admin@example.com", hashed_password="-", role=UserRole.ADMIN)
+
+
+@pytest.fixture
+def db():
+    init_db()
+    with Session(engine) as session:
+        for model in (Transaction, OrderItem, Order, SyncChange):
+            session.execute(delete(model))
+        session.commit()
+    return engine
+
+
+def _add_order(session: Session, number: str) -> None:
+    session.add(Order(order_number=number, client_name="Test", phone="90000000", delivery_address="Lomé"))
+
+
+def _poll(since):
+    with Session(engine) as session:
+        return sync_changes.changes(session, ADMIN, since)
+
+
+def _order_numbers(result) -> set:
+    return {row["order_number"] for row in result.changes.get("order", SyncEntityChanges()).upserts}
+
+
+def test_changes_are_delivered_once(db):
+    token = _poll(None).token
+    with Session(engine) as session:
+        _add_order(session, "SYNC-1")
+        session.commit()
+    first = _poll(token)
+    assert _order_numbers(first) == {"SYNC-1"}
+    assert _order_numbers(_poll(first.token)) == set()
+
+
+def test_change_committed_after_a_poll_is_delivered_next_time(db):
+    token = _poll(None).token
+    slow = Session(engine)
+    _add_order(slow, "SYNC-SLOW")
+    slow.flush()  # logged, not committed yet
+    first = _poll(token)
+    assert _order_numbers(first) == set()
+    slow.commit()
+    slow.close()
+    assert _order_numbers(_poll(first.token)) == {"SYNC-SLOW"}
+
+
+@pytest.mark.skipif(engine.dialect.name == "sqlite", reason="SQLite serializes writers: no commit can overtake")
+def test_change_committed_after_a_newer_one_is_not_skipped(db):
+    token = _poll(None).token
+    slow, fast = Session(engine), Session(engine)
+    try:
+        _add_order(slow, "SYNC-SLOW")
+        slow.flush()  # logged first...
+        _add_order(fast, "SYNC-FAST")
+        fast.commit()  # ...but committed second
+        first = _poll(token)
+        assert _order_numbers(first) == {"SYNC-FAST"}
+        slow.commit()
+        assert _order_numbers(_poll(first.token)) == {"SYNC-SLOW"}
+    finally:
+        slow.close()
+        fast.close()